@@ -45,7 +45,15 @@ class VerificationCodeAdmin(admin.ModelAdmin):
 
 
 class UserDeviceAdmin(admin.ModelAdmin):
-    list_display = ["label", "id"]
+    list_display = [
+        "label",
+        "id",
+        "pushes_sent",
+        "pushes_failed",
+        "failure_streak",
+        "last_push_at",
+        "last_push_error",
+    ]
 
 
 class CategoryAdmin(admin.ModelAdmin):
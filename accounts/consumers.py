@@ -1,26 +1,38 @@
-from asgiref.sync import async_to_sync
-from channels.generic.websocket import AsyncJsonWebsocketConsumer, JsonWebsocketConsumer
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
+from notifications.realtime import auth_group, user_group
 
-class DeliveryConsumer(JsonWebsocketConsumer):
-    def connect(self):
-        return super().connect()
 
+class DeliveryConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Pushes events to the signed-in user as they happen, so that clients do
+    not have to poll: their completed transactions, incoming payments and
+    notifications, as `{"type": ..., "data": ...}` messages. Connections
+    without a valid JWT access token are refused.
+    """
+
+    @database_sync_to_async
+    def _auth_groups(self, user):
+        return list(user.groups.values_list("id", flat=True))
 
-class TestConsumer(AsyncJsonWebsocketConsumer):
     async def connect(self):
-        await super().connect()
-        await self.send_json("Connected", False)
+        user = self.scope.get("user")
 
-    async def send_json(self, content, close=False):
+        if user is None or not user.is_authenticated:
+            await self.close()
+            return
 
-        self.send(content)
+        # Left again by the base class on disconnect
+        self.groups = [
+            user_group(user.pk),
+            *(auth_group(group_id) for group_id in await self._auth_groups(user)),
+        ]
 
-        return await super().send_json(content, close)
+        for group in self.groups:
+            await self.channel_layer.group_add(group, self.channel_name)
 
-    async def receive_json(self, content, **kwargs):
-        print(content)
-        return await super().receive_json(content, **kwargs)
+        await self.accept()
 
-    async def listen_group(self, event):
-        await self.send_json(event["message"])
+    async def deliver(self, message):
+        await self.send_json({"type": message["event"], "data": message["data"]})
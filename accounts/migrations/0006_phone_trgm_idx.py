@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:22
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0005_alter_userdevice_id"),
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("files", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="business",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["contact_phone"],
+                name="business_phone_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="user",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["phone_number"],
+                name="user_phone_trgm_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
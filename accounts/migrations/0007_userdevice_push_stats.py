@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0006_phone_trgm_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userdevice",
+            name="failure_streak",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="userdevice",
+            name="last_push_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="userdevice",
+            name="last_push_error",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="userdevice",
+            name="pushes_failed",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="userdevice",
+            name="pushes_sent",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -2,6 +2,7 @@ import re
 from uuid import uuid4
 
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.contrib.postgres.indexes import GinIndex
 from django.core.validators import (
     EmailValidator,
     FileExtensionValidator,
@@ -118,6 +119,15 @@ class User(AbstractUser):
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            GinIndex(
+                fields=["phone_number"],
+                opclasses=["gin_trgm_ops"],
+                name="user_phone_trgm_idx",
+            )
+        ]
+
     @staticmethod
     def normalize_phone_number(phone_number):
         match = re.search(phone_regex, phone_number)
@@ -167,6 +177,15 @@ class Business(models.Model):
         default="low",
     )
 
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["contact_phone"],
+                opclasses=["gin_trgm_ops"],
+                name="business_phone_trgm_idx",
+            )
+        ]
+
     def __str__(self):
         return self.name
 
@@ -215,6 +234,13 @@ class UserDevice(BaseModel):
     label = models.CharField(max_length=255, null=True, blank=True)
     is_last_time_used_device = models.BooleanField(default=False)
 
+    # Push delivery stats, kept by `notifications.delivery.record_results`
+    pushes_sent = models.PositiveIntegerField(default=0)
+    pushes_failed = models.PositiveIntegerField(default=0)
+    failure_streak = models.PositiveIntegerField(default=0)
+    last_push_at = models.DateTimeField(null=True, blank=True)
+    last_push_error = models.CharField(max_length=255, null=True, blank=True)
+
 
 class Category(BaseModel):
     image = models.ImageField(null=True, blank=True)
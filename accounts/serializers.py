@@ -199,6 +199,13 @@ class UserDeviceSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserDevice
         exclude = ["is_last_time_used_device"]
+        read_only_fields = [
+            "pushes_sent",
+            "pushes_failed",
+            "failure_streak",
+            "last_push_at",
+            "last_push_error",
+        ]
 
 
 class CategoriesSerializer(serializers.ModelSerializer):
@@ -22,7 +22,7 @@ def create_user_wallet(sender, instance, **kwargs):
 @receiver(post_save, sender=Business)
 def create_business_wallet(sender, instance, created, **kwargs):
     if created:
-        wallet = Wallet.objects.create(business=instance)
+        wallet = Wallet.objects.create(business=instance, wallet_type="business")
         logger.info(f"Wallet created for business: {instance.name}")
     else:
         logger.info(f"Signal received for business update: {instance.name}")
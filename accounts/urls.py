@@ -24,3 +24,5 @@ router.register("users", UsersViewset, basename="users")
 router.register("login", LoginViewset, basename="login")
 # Register Viewsets here
 urlpatterns = router.urls + []
+
+auth_router = URLRouter([path("events/", DeliveryConsumer.as_asgi())])
@@ -5,7 +5,8 @@ from rest_framework.serializers import ModelSerializer
 from rest_framework.validators import ValidationError
 
 from bills.models import *
-from wallets.models import Transaction
+from wallets.settlement import settle
+from wallets.transfers import TransferError
 
 
 class PayUtilitySerializer(serializers.Serializer):
@@ -26,7 +27,7 @@ class PayUtilitySerializer(serializers.Serializer):
             raise ValidationError({"number": "no due bills"})
 
         user = self.context.get("request").user
-        if user.wallet.balance - user.wallet.frozen_amount < attrs.get("amount"):
+        if user.wallet.available_balance < attrs.get("amount"):
             raise ValidationError({"amount": "insufficient wallet balance"})
 
         total = bills.aggregate(total=Sum("amount")).get("total")
@@ -46,18 +47,30 @@ class PayUtilitySerializer(serializers.Serializer):
         bills = validated_data.pop("bills")
         wallet = validated_data.pop("wallet")
 
-        with transaction.atomic():
-
-            for bill in bills:
+        try:
+            with transaction.atomic():
+                locked = list(
+                    bills.select_related("utility").select_for_update(of=("self",))
+                )
 
-                bill.is_paid = True
-                bill.save()
+                settle(
+                    [
+                        (
+                            wallet.pk,
+                            None,
+                            bill.amount,
+                            f"Bills Payment for {bill.utility.name} for {bill.due_date}",
+                        )
+                        for bill in locked
+                    ],
+                    all_or_nothing=True,
+                )
 
-                Transaction.objects.create(
-                    from_wallet=wallet,
-                    amount=bill.amount,
-                    remarks=f"Bills Payment for {bill.utility.name} for {bill.due_date}",
+                Billing.objects.filter(id__in=[bill.id for bill in locked]).update(
+                    is_paid=True
                 )
+        except TransferError as e:
+            raise ValidationError({"amount": str(e)})
 
         return {"detail": "success"}
 
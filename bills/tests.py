@@ -1,3 +1,94 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from bills.models import Billing, Utility, UtilityUser
+from wallets.ledger import ledger_balance
+from wallets.models import LedgerEntry, Transaction, Wallet
+from wallets.stripes import enable_stripes
+from wallets.transfers import transfer
+
+User = get_user_model()
+
+
+class PayBillsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number="911111111", password="testpass", first_name="User"
+        )
+        self.wallet = Wallet.objects.create(
+            user=self.user, balance=1000, ledger_sequence=1
+        )
+        LedgerEntry.objects.create(wallet=self.wallet, amount=1000, sequence=1)
+        utility = Utility.objects.create(name="Power", image="power.png")
+        customer = UtilityUser.objects.create(number=1234, phone_number="911111111")
+        self.bills = [
+            Billing.objects.create(
+                amount=amount,
+                utility=utility,
+                user=customer,
+                due_date=timezone.now() - timedelta(days=1),
+            )
+            for amount in [300, 200]
+        ]
+        # Not due yet
+        Billing.objects.create(
+            amount=50,
+            utility=utility,
+            user=customer,
+            due_date=timezone.now() + timedelta(days=30),
+        )
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("pay-bills-list")
+
+    def test_due_bills_are_paid_out_of_the_platform(self):
+        response = self.client.post(self.url, {"number": "1234", "amount": 500})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Billing.objects.filter(is_paid=True).count(), 2)
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.balance, 500)
+        self.assertEqual(ledger_balance(self.wallet), 500)
+
+        transactions = Transaction.objects.all()
+        self.assertEqual(len(transactions), 2)
+        self.assertTrue(all(tr.to_wallet is None for tr in transactions))
+        self.assertEqual(LedgerEntry.objects.filter(wallet__isnull=True).count(), 2)
+
+    def test_credits_still_in_stripes_pay_bills(self):
+        Wallet.objects.filter(id=self.wallet.id).update(balance=0)
+        enable_stripes(self.wallet, 2)
+        payer = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="922222222", password="testpass", first_name="Payer"
+            ),
+            balance=600,
+        )
+        transfer(payer, self.wallet, 600)
+
+        response = self.client.post(self.url, {"number": "1234", "amount": 500})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.total_balance, 100)
+
+    def test_amount_below_the_due_total_is_rejected(self):
+        response = self.client.post(self.url, {"number": "1234", "amount": 400})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Billing.objects.filter(is_paid=True).exists())
+
+    def test_amount_over_the_available_balance_is_rejected(self):
+        self.wallet.frozen_amount = 600
+        self.wallet.save()
+
+        response = self.client.post(self.url, {"number": "1234", "amount": 500})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Billing.objects.filter(is_paid=True).exists())
+        self.assertFalse(Transaction.objects.exists())
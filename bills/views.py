@@ -1,11 +1,13 @@
 from django.db.models import Sum
 from django.shortcuts import get_list_or_404, get_object_or_404
+from drf_spectacular.utils import extend_schema
 from rest_framework.mixins import CreateModelMixin, ListModelMixin, RetrieveModelMixin
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet, ModelViewSet
 
 from bills.models import *
 from bills.serializers import *
+from wallets.idempotency import IDEMPOTENCY_KEY_PARAMETER, idempotent
 
 
 class UtilityViewset(ListModelMixin, GenericViewSet):
@@ -16,6 +18,11 @@ class UtilityViewset(ListModelMixin, GenericViewSet):
 class PaybillsViewset(CreateModelMixin, GenericViewSet):
     serializer_class = PayUtilitySerializer
 
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
 
 class BillsViewset(RetrieveModelMixin, GenericViewSet):
     serializer_class = None
@@ -1,6 +1,5 @@
 import os
 
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
@@ -10,28 +9,15 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
 
 asgi_app = get_asgi_application()
 from accounts.urls import auth_router
+from core.middlewares import JWTAuthMiddleware
 
 app = ProtocolTypeRouter(
     {
         # Django's ASGI application to handle traditional HTTP requests
         "http": asgi_app,
-        # WebSocket chat handler
+        # Real-time events of the signed-in user, at ws/events/
         "websocket": AllowedHostsOriginValidator(
-            URLRouter(
-                [
-                    path("test/", auth_router),
-                    path(
-                        "dev",
-                        AuthMiddlewareStack(
-                            URLRouter(
-                                [
-                                    path("auth/", auth_router),
-                                ]
-                            )
-                        ),
-                    ),
-                ]
-            )
+            JWTAuthMiddleware(URLRouter([path("ws/", auth_router)]))
         ),
     }
 )
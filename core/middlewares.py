@@ -0,0 +1,45 @@
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Set `scope["user"]` of WebSocket connections from the same JWT access
+    tokens the REST API accepts, passed as `?token=` (browsers cannot set
+    headers on WebSockets) or in an `Authorization: Bearer` header.
+    """
+
+    def _raw_token(self, scope):
+        token = parse_qs(scope.get("query_string", b"").decode()).get("token")
+
+        if token:
+            return token[0]
+
+        header = dict(scope.get("headers", [])).get(b"authorization", b"").split()
+
+        if len(header) == 2 and header[0].lower() == b"bearer":
+            return header[1].decode()
+
+        return None
+
+    @database_sync_to_async
+    def _user(self, raw_token):
+        authentication = JWTAuthentication()
+
+        try:
+            return authentication.get_user(
+                authentication.get_validated_token(raw_token)
+            )
+        except (InvalidToken, AuthenticationFailed):
+            return AnonymousUser()
+
+    async def __call__(self, scope, receive, send):
+        raw_token = self._raw_token(scope)
+        user = await self._user(raw_token) if raw_token else AnonymousUser()
+
+        return await super().__call__(dict(scope, user=user), receive, send)
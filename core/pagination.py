@@ -0,0 +1,125 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pages through results, newest first, by the position of the last row
+    returned rather than an offset, so every page costs the same however
+    deep it is. `ordering` names the fields of that position, ending with a
+    unique one.
+    """
+
+    ordering = ["created_at", "id"]
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+
+    def _ordering(self, queryset):
+        return self.ordering
+
+    def _decode(self, cursor):
+        try:
+            position = json.loads(urlsafe_b64decode(cursor.encode()))
+
+            if not isinstance(position, dict):
+                raise ValueError
+
+            if "created_at" in position:
+                position["created_at"] = parse_datetime(position["created_at"])
+        except (ValueError, TypeError):
+            raise NotFound("Invalid cursor")
+
+        return position
+
+    def _encode(self, row, ordering):
+        position = {field: getattr(row, field) for field in ordering}
+        position["created_at"] = position["created_at"].isoformat()
+        position["id"] = str(position["id"])
+
+        return urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def _after(self, position, ordering):
+        """Rows after `position` in descending (f1, f2, ...) order."""
+        after = Q()
+
+        for index, field in enumerate(ordering):
+            equal = {name: position[name] for name in ordering[:index]}
+            after |= Q(**equal, **{f"{field}__lt": position[field]})
+
+        return after
+
+    def _filter_after(self, queryset, position, ordering):
+        # A cursor that decodes but was not made by `_encode`
+        try:
+            return queryset.filter(self._after(position, ordering))
+        except (KeyError, TypeError, ValueError, ValidationError):
+            raise NotFound("Invalid cursor")
+
+    def _start(self, request):
+        """Read the page size and the decoded cursor, if any, of `request`."""
+        self.request = request
+
+        try:
+            self.page_size = max(
+                1,
+                min(
+                    int(request.query_params[self.page_size_query_param]),
+                    self.max_page_size,
+                ),
+            )
+        except (KeyError, ValueError):
+            pass
+
+        cursor = request.query_params.get(self.cursor_query_param)
+
+        return self._decode(cursor) if cursor else None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        position = self._start(request)
+        ordering = self._ordering(queryset)
+        queryset = queryset.order_by(*(f"-{field}" for field in ordering))
+
+        if position:
+            queryset = self._filter_after(queryset, position, ordering)
+
+        rows = list(queryset[: self.page_size + 1])
+        page = rows[: self.page_size]
+
+        self.next_cursor = (
+            self._encode(page[-1], ordering) if len(rows) > self.page_size else None
+        )
+
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.next_cursor,
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
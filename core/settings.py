@@ -29,6 +29,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "corsheaders",
     "rest_framework",
     "rest_framework_simplejwt",
@@ -44,6 +45,7 @@ INSTALLED_APPS = [
     "wallets",
     "subscriptions",
     "platform_admin",
+    "tasks_handler",
 ]
 
 MIDDLEWARE = [
@@ -224,6 +226,48 @@ SPECTACULAR_SETTINGS = {
 
 
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
+
+WALLET_BALANCE_STRIPES = int(env("WALLET_BALANCE_STRIPES", 8))
+TRANSFER_QUEUE_PARTITIONS = int(env("TRANSFER_QUEUE_PARTITIONS", 8))
+DISBURSEMENT_MAX_ROWS = int(env("DISBURSEMENT_MAX_ROWS", 10_000))
+TRANSACTION_TIMEOUT = timedelta(minutes=int(env("TRANSACTION_TIMEOUT_MINUTES", 15)))
+AUTHORIZATION_HOLD_TTL = timedelta(hours=int(env("AUTHORIZATION_HOLD_TTL_HOURS", 72)))
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(env("IDEMPOTENCY_KEY_TTL_HOURS", 24)))
+# How long a request holds its key before a retry may take over
+IDEMPOTENCY_CLAIM_LEASE = timedelta(
+    seconds=int(env("IDEMPOTENCY_CLAIM_LEASE_SECONDS", 60))
+)
+WALLET_CACHE_URL = f"{CELERY_BROKER_URL}/{env('WALLET_CACHE_REDIS_DB', 1)}"
+WALLET_CACHE_TTL = timedelta(hours=int(env("WALLET_CACHE_TTL_HOURS", 1)))
+# How long reads skip the wallet cache after it could not be reached
+WALLET_CACHE_RETRY_AFTER = timedelta(
+    seconds=int(env("WALLET_CACHE_RETRY_AFTER_SECONDS", 5))
+)
+# Rolling spending limits by wallet type, or `business:<trust level>`
+WALLET_VELOCITY_LIMITS = {
+    "user": {"hour": 100_000, "day": 500_000},
+    "enterprise": {"hour": 5_000_000, "day": 50_000_000},
+    "business:low": {"hour": 200_000, "day": 1_000_000},
+    "business:medium": {"hour": 1_000_000, "day": 10_000_000},
+    "business:high": {"hour": 10_000_000, "day": 100_000_000},
+}
+# Window over which an enterprise may spend up to a grant's `max_amount`
+GRANT_VELOCITY_WINDOW = env("GRANT_VELOCITY_WINDOW", "day")
+VELOCITY_CACHE_URL = f"{CELERY_BROKER_URL}/{env('VELOCITY_REDIS_DB', 2)}"
+CHANNEL_LAYERS = {
+    "default": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {
+            "hosts": [f"{CELERY_BROKER_URL}/{env('CHANNEL_LAYER_REDIS_DB', 3)}"]
+        },
+    }
+}
+PUSH_BACKEND = env("PUSH_BACKEND", "notifications.backends.FirebaseBackend")
+PUSH_MAX_RETRIES = int(env("PUSH_MAX_RETRIES", 5))
+PUSH_RETRY_BACKOFF = int(env("PUSH_RETRY_BACKOFF_SECONDS", 10))
+PUSH_RETRY_MAX_DELAY = int(env("PUSH_RETRY_MAX_DELAY_SECONDS", 600))
+# Devices are deleted after this many rejected pushes in a row
+PUSH_DEVICE_FAILURE_LIMIT = int(env("PUSH_DEVICE_FAILURE_LIMIT", 5))
 GOOGLE_APPLICATION_CREDENTIALS = {
     "type": "service_account",
     "project_id": env("GOOGLE_APPLICATION_CREDENTIALS_PROJECT_ID"),
@@ -0,0 +1,113 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+from firebase_admin import exceptions, messaging
+
+from .firebase import Firebase
+
+PushMessage = namedtuple("PushMessage", ["token", "title", "body"])
+PushResult = namedtuple("PushResult", ["status", "error"])
+
+# Outcome of each message of a batch
+SENT = "sent"
+RETRY = "retry"  # Transient failure, worth sending again later
+UNREGISTERED = "unregistered"  # The token no longer reaches a device
+FAILED = "failed"
+
+
+class BasePushBackend:
+    """
+    Sends batches of push messages. Subclasses implement `send_messages`,
+    returning a PushResult per message, in order, for batches of at most
+    `batch_limit` messages: one of SENT, RETRY, UNREGISTERED or FAILED and
+    the provider's error code for the failures.
+    """
+
+    batch_limit = 500
+
+    def send_messages(self, messages):
+        raise NotImplementedError
+
+
+class FirebaseBackend(BasePushBackend):
+    """Firebase Cloud Messaging, one `send_each` request per batch."""
+
+    # FCM rejects batches of more than 500 messages
+    batch_limit = 500
+
+    def _status(self, response):
+        if response.success:
+            return SENT
+
+        if isinstance(
+            response.exception,
+            (messaging.UnregisteredError, messaging.SenderIdMismatchError),
+        ):
+            return UNREGISTERED
+
+        if isinstance(
+            response.exception,
+            (
+                messaging.QuotaExceededError,
+                exceptions.UnavailableError,
+                exceptions.InternalError,
+                exceptions.DeadlineExceededError,
+            ),
+        ):
+            return RETRY
+
+        return FAILED
+
+    def send_messages(self, messages):
+        Firebase.initialize()
+
+        try:
+            batch = messaging.send_each(
+                [
+                    messaging.Message(
+                        notification=messaging.Notification(
+                            title=message.title, body=message.body
+                        ),
+                        token=message.token,
+                    )
+                    for message in messages
+                ]
+            )
+        except exceptions.FirebaseError as e:
+            return [PushResult(RETRY, e.code)] * len(messages)
+
+        return [
+            PushResult(
+                self._status(response),
+                None if response.success else type(response.exception).__name__,
+            )
+            for response in batch.responses
+        ]
+
+
+class LocMemBackend(BasePushBackend):
+    """
+    Keeps sent messages in `LocMemBackend.sent` instead of sending them, for
+    tests and local development. Tokens listed in `LocMemBackend.outcomes`
+    get that outcome, also used as the error code, instead of SENT.
+    """
+
+    sent = []
+    outcomes = {}
+
+    def send_messages(self, messages):
+        results = []
+
+        for message in messages:
+            status = self.outcomes.get(message.token, SENT)
+            results.append(PushResult(status, None if status == SENT else status))
+
+            if status == SENT:
+                LocMemBackend.sent.append(message)
+
+        return results
+
+
+def get_backend():
+    return import_string(settings.PUSH_BACKEND)()
@@ -0,0 +1,213 @@
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import UserDevice
+from tasks_handler import outbox
+
+from . import realtime
+from .backends import FAILED, RETRY, SENT, UNREGISTERED, PushMessage, get_backend
+from .models import Notification
+
+PUSH_TASK = "tasks_handler.tasks.push_notifications"
+
+
+def queue_push(notifications):
+    """
+    Schedule delivery of the push `notifications` for after the surrounding
+    transaction commits, so no provider call is made while it holds locks.
+    Call it for notifications saved with `bulk_create`, which sends no
+    `post_save`.
+    """
+    notification_ids = [
+        str(notification.pk)
+        for notification in notifications
+        if notification.delivery_method == "push"
+    ]
+
+    if notification_ids:
+        outbox.publish(PUSH_TASK, notification_ids=notification_ids)
+
+
+def deliver(notifications):
+    """
+    Hand just saved `notifications` to the delivery channels: push and
+    connected WebSocket clients, both once the surrounding transaction
+    commits. `post_save` does it for notifications saved one at a time.
+    Broadcasts reach their groups as of that commit, so create them and set
+    their groups in one transaction.
+    """
+    notifications = list(notifications)
+
+    queue_push(notifications)
+    realtime.announce_notifications(notifications)
+
+
+def _audiences(notification_ids):
+    """`(notification_id, token)` pairs of every push to make."""
+    notifications = Notification.objects.filter(
+        id__in=notification_ids, delivery_method="push"
+    )
+
+    yield from UserDevice.objects.filter(
+        user__notifications__in=notifications.filter(user__isnull=False)
+    ).order_by().values_list("user__notifications", "id").iterator(chunk_size=2000)
+
+    # Broadcasts without groups have no audience
+    for notification in notifications.filter(
+        user__isnull=True, groups__isnull=False
+    ).distinct():
+        devices = (
+            UserDevice.objects.filter(user__groups__in=notification.groups.all())
+            .distinct()
+            .order_by("id")
+        )
+
+        for token in devices.values_list("id", flat=True).iterator(chunk_size=2000):
+            yield notification.pk, token
+
+
+def push_batches(notification_ids, size):
+    """
+    Yield the pushes to make for the notifications `notification_ids` as
+    lists of at most `size` `[notification_id, token]` pairs.
+
+    Dedicated notifications go to every device of their user. Broadcasts go
+    to every device of the users in their groups, read through a server-side
+    cursor so that they do not have to fit in memory.
+    """
+    batch = []
+
+    for notification_id, token in _audiences(notification_ids):
+        batch.append([str(notification_id), token])
+
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def record_results(results, batch_size=1000):
+    """
+    Add `(token, PushResult)` outcomes to the delivery stats of the devices
+    with one UPDATE ... FROM (VALUES ...) statement per batch, then delete
+    the devices whose token is unregistered or that failed
+    `PUSH_DEVICE_FAILURE_LIMIT` times in a row. Returns the number of
+    devices deleted.
+    """
+    # token: [sent, failed, rejected, last error]
+    stats = defaultdict(lambda: [0, 0, 0, None])
+    unregistered = set()
+
+    for token, result in results:
+        counters = stats[token]
+
+        if result.status == SENT:
+            counters[0] += 1
+        else:
+            counters[1] += 1
+            counters[2] += result.status == FAILED
+
+        counters[3] = result.error
+
+        if result.status == UNREGISTERED:
+            unregistered.add(token)
+
+    table = connection.ops.quote_name(UserDevice._meta.db_table)
+    # In token order so that concurrent batches never wait on each other
+    items = sorted(stats.items())
+    now = timezone.now()
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start : start + batch_size]
+
+            values = ", ".join(
+                ["(%s::varchar, %s::integer, %s::integer, %s::integer, %s::varchar)"]
+                * len(batch)
+            )
+            params = [
+                param for token, counters in batch for param in (token, *counters)
+            ]
+
+            cursor.execute(
+                f"UPDATE {table} AS d"
+                " SET pushes_sent = d.pushes_sent + v.sent,"
+                " pushes_failed = d.pushes_failed + v.failed,"
+                " failure_streak = CASE WHEN v.sent > 0 THEN 0"
+                " ELSE d.failure_streak + v.rejected END,"
+                " last_push_at = %s,"
+                " last_push_error = v.error,"
+                " updated_at = %s"
+                f" FROM (VALUES {values}) AS v(id, sent, failed, rejected, error)"
+                " WHERE d.id = v.id",
+                [now, now, *params],
+            )
+
+    deleted, _ = UserDevice.objects.filter(
+        Q(id__in=unregistered)
+        | Q(id__in=list(stats), failure_streak__gte=settings.PUSH_DEVICE_FAILURE_LIMIT)
+    ).delete()
+
+    return deleted
+
+
+def send_batch(pushes, backend=None):
+    """
+    Send `[notification_id, token]` pairs in one provider request and record
+    the outcome of each on its device. Pushes to devices deleted since they
+    were queued are dropped. Returns the pairs that failed transiently and
+    are worth sending again.
+    """
+    backend = backend or get_backend()
+    notifications = {
+        str(pk): notification
+        for pk, notification in Notification.objects.in_bulk(
+            {notification_id for notification_id, _ in pushes}
+        ).items()
+    }
+    devices = set(
+        UserDevice.objects.filter(id__in={token for _, token in pushes}).values_list(
+            "id", flat=True
+        )
+    )
+    pushes = [
+        (notification_id, token)
+        for notification_id, token in pushes
+        if notification_id in notifications and token in devices
+    ]
+
+    if not pushes:
+        return []
+
+    results = backend.send_messages(
+        [
+            PushMessage(
+                token,
+                notifications[notification_id].title,
+                notifications[notification_id].content,
+            )
+            for notification_id, token in pushes
+        ]
+    )
+
+    record_results([(token, result) for (_, token), result in zip(pushes, results)])
+
+    return [
+        [notification_id, token]
+        for (notification_id, token), result in zip(pushes, results)
+        if result.status == RETRY
+    ]
+
+
+def retry_delay(retries):
+    """Seconds to wait before retry number `retries + 1`: exponential, jittered."""
+    delay = min(settings.PUSH_RETRY_BACKOFF * 2**retries, settings.PUSH_RETRY_MAX_DELAY)
+
+    return random.uniform(delay / 2, delay)
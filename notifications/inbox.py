@@ -0,0 +1,119 @@
+import heapq
+
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.utils import timezone
+
+from core.pagination import KeysetPagination
+
+from .models import InboxState, Notification
+
+NotificationGroup = Notification.groups.through
+
+
+def inbox(user):
+    """
+    The notifications of `user` as two querysets, each read from its own
+    index: their dedicated notifications, and the broadcasts to a group of
+    theirs. Broadcasts are stored once however many users they reach.
+    """
+    dedicated = Notification.objects.filter(user=user)
+
+    audience = NotificationGroup.objects.filter(
+        notification=OuterRef("pk"), group__in=Group.objects.filter(user=user)
+    )
+    broadcasts = Notification.objects.filter(user__isnull=True).filter(Exists(audience))
+
+    return [dedicated, broadcasts]
+
+
+def _count(user, after, until):
+    counted = 0
+
+    for notifications in inbox(user):
+        notifications = notifications.filter(created_at__lte=until)
+
+        if after:
+            notifications = notifications.filter(created_at__gt=after)
+
+        counted += notifications.count()
+
+    return counted
+
+
+def unread_count(user):
+    """
+    Number of notifications of `user` newer than their read cursor: the
+    count kept on their InboxState plus the notifications created since it
+    was last brought up to date.
+    """
+    now = timezone.now()
+    state, _ = InboxState.objects.get_or_create(user=user)
+    new = _count(user, state.counted_until or state.read_until, now)
+
+    # Only one of concurrent readers adds the same new notifications
+    InboxState.objects.filter(user=user, counted_until=state.counted_until).update(
+        unread_count=F("unread_count") + new, counted_until=now
+    )
+
+    return state.unread_count + new
+
+
+def mark_read(user, until=None):
+    """
+    Mark the notifications of `user` created up to `until` (by default now)
+    as read. The cursor never moves backwards. Returns the InboxState.
+    """
+    now = timezone.now()
+    until = min(until or now, now)
+
+    with transaction.atomic():
+        state, _ = InboxState.objects.select_for_update().get_or_create(user=user)
+
+        if state.read_until and state.read_until >= until:
+            return state
+
+        state.read_until = until
+        state.unread_count = _count(user, until, now)
+        state.counted_until = now
+        state.save()
+
+    return state
+
+
+class InboxPagination(KeysetPagination):
+    """
+    Keyset pages over several querysets at once, newest first. Each page
+    reads at most a page of rows from each queryset and merges them.
+    """
+
+    def paginate_queryset(self, querysets, request, view=None):
+        position = self._start(request)
+        order_by = [f"-{field}" for field in self.ordering]
+        sources = []
+
+        for queryset in querysets:
+            queryset = queryset.order_by(*order_by).prefetch_related("groups")
+
+            if position:
+                queryset = self._filter_after(queryset, position, self.ordering)
+
+            sources.append(queryset[: self.page_size + 1])
+
+        rows = list(
+            heapq.merge(
+                *sources,
+                key=lambda row: (row.created_at, row.id),
+                reverse=True,
+            )
+        )[: self.page_size + 1]
+        page = rows[: self.page_size]
+
+        self.next_cursor = (
+            self._encode(page[-1], self.ordering)
+            if len(rows) > self.page_size
+            else None
+        )
+
+        return page
@@ -29,3 +29,31 @@ class Notification(BaseModel):
     delivery_method = models.CharField(
         max_length=255, choices=[("inApp", "inApp"), ("push", "push")], default="inApp"
     )
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            # A user's dedicated notifications, newest first
+            models.Index(
+                fields=["user", "-created_at", "-id"], name="notification_inbox_idx"
+            ),
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="notification_broadcast_idx",
+                condition=models.Q(user__isnull=True),
+            ),
+        ]
+
+
+class InboxState(models.Model):
+    """
+    How far a user has read their inbox, and how many notifications after
+    that were unread as of `counted_until`, so that the unread count only
+    has to look at notifications newer than that.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="inbox_state"
+    )
+    read_until = models.DateTimeField(null=True, blank=True)
+    unread_count = models.PositiveIntegerField(default=0)
+    counted_until = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,158 @@
+import json
+import logging
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from rest_framework.utils.encoders import JSONEncoder
+
+from wallets.models import Wallet
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def user_group(user_id):
+    return f"user.{user_id}"
+
+
+def auth_group(group_id):
+    return f"group.{group_id}"
+
+
+def _document(data):
+    """`data` as plain JSON types, which is all the channel layer carries."""
+    return json.loads(json.dumps(data, cls=JSONEncoder))
+
+
+def send(events):
+    """
+    Send `(channel group, event type, data)` events to the WebSocket
+    connections in each group. Real-time events are best effort: clients
+    catch up through the REST API when they reconnect, so a channel layer
+    that cannot be reached only logs a warning.
+    """
+    layer = get_channel_layer()
+
+    if layer is None or not events:
+        return
+
+    async def send_all():
+        for group, event_type, data in events:
+            await layer.group_send(
+                group, {"type": "deliver", "event": event_type, "data": data}
+            )
+
+    try:
+        async_to_sync(send_all)()
+    except Exception as e:
+        logger.warning(f"Could not send {len(events)} real-time events: {e}")
+
+
+def announce_notifications(notifications):
+    """
+    Once the surrounding transaction commits, send `notifications` to their
+    user or to the members of their groups. Broadcasts without groups are
+    sent to no one.
+    """
+    documents = [
+        (
+            notification.pk,
+            notification.user_id,
+            _document(
+                {
+                    "id": notification.pk,
+                    "title": notification.title,
+                    "content": notification.content,
+                    "created_at": notification.created_at,
+                }
+            ),
+        )
+        for notification in notifications
+    ]
+
+    def send_documents():
+        # Read now, as groups are set after a notification is saved
+        audiences = defaultdict(list)
+
+        for notification_id, group_id in Notification.groups.through.objects.filter(
+            notification__in=[pk for pk, user_id, _ in documents if user_id is None]
+        ).values_list("notification", "group"):
+            audiences[notification_id].append(auth_group(group_id))
+
+        events = []
+
+        for pk, user_id, data in documents:
+            groups = [user_group(user_id)] if user_id else audiences[pk]
+
+            events += [(group, "notification", data) for group in groups]
+
+        send(events)
+
+    if documents:
+        transaction.on_commit(send_documents)
+
+
+def announce_transactions(transactions):
+    """
+    Once the surrounding transaction commits, send completed `transactions`
+    to the owners of both wallets: the payer as `transaction.completed`, the
+    payee as `payment.received`.
+    """
+    documents = [
+        (
+            tr.from_wallet_id,
+            tr.to_wallet_id,
+            _document(
+                {
+                    "id": tr.pk,
+                    "amount": tr.amount,
+                    "status": tr.status,
+                    "remarks": tr.remarks,
+                    "from_wallet": tr.from_wallet_id,
+                    "to_wallet": tr.to_wallet_id,
+                    "created_at": tr.created_at,
+                }
+            ),
+        )
+        for tr in transactions
+    ]
+
+    def send_documents():
+        owners = dict(
+            Wallet.objects.filter(
+                id__in={
+                    wallet for payer, payee, _ in documents for wallet in (payer, payee)
+                }
+            )
+            .annotate(owner=Coalesce("user", "business__owner"))
+            .values_list("id", "owner")
+        )
+        events = []
+
+        for payer, payee, data in documents:
+            if owners.get(payer):
+                events.append(
+                    (
+                        user_group(owners[payer]),
+                        "transaction.completed",
+                        {**data, "direction": "out"},
+                    )
+                )
+
+            if owners.get(payee):
+                events.append(
+                    (
+                        user_group(owners[payee]),
+                        "payment.received",
+                        {**data, "direction": "in"},
+                    )
+                )
+
+        send(events)
+
+    if documents:
+        transaction.on_commit(send_documents)
@@ -1,10 +1,27 @@
+from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
 
 from notifications.models import *
 
 
 class NotificationSerilizer(ModelSerializer):
+    is_read = serializers.SerializerMethodField()
 
     class Meta:
         exclude = []
         model = Notification
+
+    def get_is_read(self, notification) -> bool:
+        read_until = self.context.get("read_until")
+
+        return bool(read_until and notification.created_at <= read_until)
+
+
+class InboxStateSerializer(ModelSerializer):
+    class Meta:
+        model = InboxState
+        fields = ["read_until", "unread_count"]
+
+
+class MarkReadSerializer(serializers.Serializer):
+    until = serializers.DateTimeField(required=False)
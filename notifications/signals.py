@@ -1,18 +1,19 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
-from .firebase import *
+from wallets.dispatch import transactions_completed
+
+from .delivery import deliver
 from .models import Notification
+from .realtime import announce_transactions
 
 
 @receiver(post_save, sender=Notification)
 def on_notification_created(sender, instance: Notification, created, **kwargs):
-
     if created:
-        pass
-    for device in instance.user.devices.all():
-        if instance.delivery_method == "push":
-            tt = send_push_notification(
-                device.id, title=instance.title, body=instance.content
-            )
-            print(tt)
+        deliver([instance])
+
+
+@receiver(transactions_completed)
+def on_transactions_completed(sender, transactions, **kwargs):
+    announce_transactions(transactions)
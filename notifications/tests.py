@@ -1,3 +1,313 @@
-from django.test import TestCase
+from base64 import urlsafe_b64encode
 
-# Create your tests here.
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import UserDevice
+from notifications.backends import FAILED, RETRY, UNREGISTERED, LocMemBackend
+from notifications.delivery import PUSH_TASK, push_batches, send_batch
+from notifications.models import InboxState, Notification
+from tasks_handler.models import OutboxMessage
+from wallets.models import Wallet
+from wallets.transfers import transfer
+
+User = get_user_model()
+
+
+@override_settings(PUSH_BACKEND="notifications.backends.LocMemBackend")
+class PushDeliveryTests(TestCase):
+    def setUp(self):
+        LocMemBackend.sent = []
+        LocMemBackend.outcomes = {}
+
+        self.group = Group.objects.create(name="merchants")
+        self.users = [
+            User.objects.create_user(
+                phone_number=f"91111111{index}", password=None, first_name="User"
+            )
+            for index in range(3)
+        ]
+        self.users[0].groups.add(self.group)
+
+        for index, user in enumerate(self.users):
+            UserDevice.objects.create(id=f"token-{index}-a", user=user)
+            UserDevice.objects.create(id=f"token-{index}-b", user=user)
+
+    def _pushes(self, notification, size=500):
+        return [
+            token
+            for batch in push_batches([notification.pk], size)
+            for _, token in batch
+        ]
+
+    def test_dedicated_push_goes_to_the_users_devices(self):
+        notification = Notification.objects.create(
+            title="Hi", content="Hello", user=self.users[1], delivery_method="push"
+        )
+
+        self.assertCountEqual(self._pushes(notification), ["token-1-a", "token-1-b"])
+
+    def test_broadcast_goes_to_its_groups_only(self):
+        no_group = Notification.objects.create(
+            title="Hi", content="Hello", delivery_method="push"
+        )
+        merchants = Notification.objects.create(
+            title="Hi", content="Hello", delivery_method="push"
+        )
+        merchants.groups.add(self.group)
+
+        self.assertEqual(self._pushes(no_group), [])
+        self.assertEqual(self._pushes(merchants), ["token-0-a", "token-0-b"])
+
+    def test_batches_respect_the_size(self):
+        everyone = Group.objects.create(name="everyone")
+        everyone.user_set.set(self.users)
+        notification = Notification.objects.create(
+            title="Hi", content="Hello", delivery_method="push"
+        )
+        notification.groups.add(everyone)
+
+        self.assertEqual(
+            [len(batch) for batch in push_batches([notification.pk], 4)], [4, 2]
+        )
+
+    def test_only_transient_failures_are_retried(self):
+        notification = Notification.objects.create(
+            title="Hi", content="Hello", user=self.users[0], delivery_method="push"
+        )
+        LocMemBackend.outcomes = {"token-0-a": RETRY, "token-0-b": UNREGISTERED}
+
+        retry = send_batch(
+            [
+                [str(notification.pk), "token-0-a"],
+                [str(notification.pk), "token-0-b"],
+                [str(notification.pk), "token-1-a"],
+            ]
+        )
+
+        self.assertEqual(retry, [[str(notification.pk), "token-0-a"]])
+        self.assertEqual(
+            [message.token for message in LocMemBackend.sent], ["token-1-a"]
+        )
+        self.assertEqual(LocMemBackend.sent[0].title, "Hi")
+
+    def test_results_update_device_stats_and_prune_dead_tokens(self):
+        notification = Notification.objects.create(
+            title="Hi", content="Hello", user=self.users[0], delivery_method="push"
+        )
+        LocMemBackend.outcomes = {"token-0-a": UNREGISTERED, "token-1-b": FAILED}
+        pushes = [
+            [str(notification.pk), token]
+            for token in ["token-0-a", "token-1-a", "token-1-b"]
+        ]
+
+        send_batch(pushes)
+
+        self.assertFalse(UserDevice.objects.filter(id="token-0-a").exists())
+
+        sent = UserDevice.objects.get(id="token-1-a")
+        self.assertEqual((sent.pushes_sent, sent.pushes_failed), (1, 0))
+        self.assertIsNotNone(sent.last_push_at)
+
+        with self.settings(PUSH_DEVICE_FAILURE_LIMIT=2):
+            failing = UserDevice.objects.get(id="token-1-b")
+            self.assertEqual(failing.failure_streak, 1)
+            self.assertEqual(failing.last_push_error, FAILED)
+
+            send_batch(pushes)
+
+            # The unregistered token is no longer sent to
+            self.assertEqual(len(LocMemBackend.sent), 2)
+            self.assertFalse(UserDevice.objects.filter(id="token-1-b").exists())
+
+    def test_only_created_push_notifications_are_queued(self):
+        notification = Notification.objects.create(title="Hi", content="Hello")
+        notification.delivery_method = "push"
+        notification.save()
+
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        Notification.objects.create(title="Hi", content="Hello", delivery_method="push")
+
+        self.assertEqual(OutboxMessage.objects.get().task, PUSH_TASK)
+
+
+class InboxTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number="911111111", password=None, first_name="User"
+        )
+        other = User.objects.create_user(
+            phone_number="922222222", password=None, first_name="Other"
+        )
+        merchants = Group.objects.create(name="merchants")
+        agents = Group.objects.create(name="agents")
+        self.user.groups.add(merchants, agents)
+
+        def notify(title, groups=(), **kwargs):
+            notification = Notification.objects.create(
+                title=title, content=title, **kwargs
+            )
+            notification.groups.set(groups)
+
+            return notification
+
+        notify("mine", user=self.user)
+        notify("theirs", user=other)
+        notify("nobody")
+        notify("merchants", groups=[merchants])
+        notify("both groups", groups=[merchants, agents])
+        notify("others", groups=[Group.objects.create(name="others")])
+        self.expected = ["both groups", "merchants", "mine"]
+
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("notifications-list")
+
+    def test_inbox_merges_broadcasts_newest_first_in_pages(self):
+        titles = []
+        url = f"{self.url}?page_size=3"
+
+        while url:
+            response = self.client.get(url)
+            titles += [row["title"] for row in response.data["results"]]
+            url = response.data["next"]
+
+        self.assertEqual(titles, self.expected)
+
+    def test_bad_page_sizes_fall_back_to_a_sane_one(self):
+        for page_size, count in [("0", 1), ("-1", 1), ("abc", 3), ("1000", 3)]:
+            response = self.client.get(f"{self.url}?page_size={page_size}")
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data["results"]), count)
+
+    def test_malformed_cursors_are_not_found(self):
+        cursors = [
+            "not base64!",
+            urlsafe_b64encode(b"[]").decode(),
+            urlsafe_b64encode(b'{"id": "x"}').decode(),
+            urlsafe_b64encode(b'{"created_at": 1, "id": "x"}').decode(),
+            urlsafe_b64encode(
+                b'{"created_at": "2024-01-01T00:00Z", "id": "x"}'
+            ).decode(),
+        ]
+
+        for cursor in cursors:
+            response = self.client.get(f"{self.url}?cursor={cursor}")
+
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_read_cursor_and_unread_count(self):
+        unread = reverse("notifications-unread")
+
+        self.assertEqual(self.client.get(unread).data["unread_count"], 3)
+
+        self.client.post(reverse("notifications-read"), {})
+        self.assertEqual(self.client.get(unread).data["unread_count"], 0)
+
+        Notification.objects.create(title="new", content="new").groups.add(
+            Group.objects.get(name="merchants")
+        )
+        Notification.objects.create(title="new", content="new", user=self.user)
+
+        self.assertEqual(self.client.get(unread).data["unread_count"], 2)
+        # Counted once, not again on every read
+        self.assertEqual(self.client.get(unread).data["unread_count"], 2)
+        self.assertEqual(InboxState.objects.get(user=self.user).unread_count, 2)
+
+        rows = self.client.get(self.url).data["results"]
+        self.assertEqual(
+            [row["is_read"] for row in rows], [False, False, True, True, True]
+        )
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class RealtimeTests(TransactionTestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(
+            phone_number="911111111", password=None, first_name="Sender"
+        )
+        self.receiver = User.objects.create_user(
+            phone_number="922222222", password=None, first_name="Receiver"
+        )
+        self.from_wallet = Wallet.objects.create(user=self.sender, balance=1000)
+        self.to_wallet = Wallet.objects.create(user=self.receiver, balance=0)
+
+    def _connect(self, token):
+        from core.asgi import app
+
+        return WebsocketCommunicator(
+            app,
+            f"/ws/events/?token={token}",
+            headers=[(b"origin", b"http://localhost")],
+        )
+
+    async def _events(self, communicator, count):
+        return [await communicator.receive_json_from() for _ in range(count)]
+
+    async def test_connection_requires_a_valid_token(self):
+        connected, _ = await self._connect("not-a-token").connect()
+
+        self.assertFalse(connected)
+
+    async def test_committed_transfer_reaches_both_parties(self):
+        payer = self._connect(AccessToken.for_user(self.sender))
+        payee = self._connect(AccessToken.for_user(self.receiver))
+        self.assertTrue((await payer.connect())[0])
+        self.assertTrue((await payee.connect())[0])
+
+        tr = await database_sync_to_async(transfer)(
+            self.from_wallet, self.to_wallet, 300
+        )
+
+        payer_events = await self._events(payer, 2)
+        payee_events = await self._events(payee, 2)
+
+        self.assertCountEqual(
+            [event["type"] for event in payer_events],
+            ["transaction.completed", "notification"],
+        )
+        received = next(
+            event for event in payee_events if event["type"] == "payment.received"
+        )
+        self.assertEqual(received["data"]["id"], str(tr.id))
+        self.assertEqual(received["data"]["direction"], "in")
+        self.assertTrue(await payer.receive_nothing())
+
+        await payer.disconnect()
+        await payee.disconnect()
+
+    async def test_broadcasts_reach_their_groups(self):
+        group = await database_sync_to_async(Group.objects.create)(name="merchants")
+        await database_sync_to_async(self.receiver.groups.add)(group)
+
+        member = self._connect(AccessToken.for_user(self.receiver))
+        other = self._connect(AccessToken.for_user(self.sender))
+        await member.connect()
+        await other.connect()
+
+        def broadcast():
+            with transaction.atomic():
+                # Without groups, it reaches no one
+                Notification.objects.create(title="Nobody", content="Hello")
+                notification = Notification.objects.create(title="Hi", content="Hello")
+                notification.groups.add(group)
+
+        await database_sync_to_async(broadcast)()
+
+        self.assertEqual((await member.receive_json_from())["data"]["title"], "Hi")
+        self.assertTrue(await member.receive_nothing())
+        self.assertTrue(await other.receive_nothing())
+
+        await member.disconnect()
+        await other.disconnect()
@@ -1,24 +1,53 @@
-from django.db.models import Q
-from drf_spectacular.utils import OpenApiParameter, extend_schema
-from rest_framework.mixins import CreateModelMixin, ListModelMixin
+from drf_spectacular.utils import extend_schema
+from rest_framework.decorators import action
+from rest_framework.mixins import ListModelMixin
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
+from notifications.inbox import InboxPagination, inbox, mark_read, unread_count
 from notifications.models import *
 from notifications.serializers import *
 
 
 class NotificationViewset(ListModelMixin, GenericViewSet):
+    """
+    The inbox of the current user: their dedicated notifications merged with
+    the broadcasts that reach them, newest first, with a read cursor.
+    """
+
     serializer_class = NotificationSerilizer
     queryset = Notification.objects.all()
+    pagination_class = InboxPagination
 
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        return inbox(self.request.user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+
+        state = InboxState.objects.filter(user=self.request.user).first()
+        context["read_until"] = state.read_until if state else None
+
+        return context
+
+    @extend_schema(responses=InboxStateSerializer)
+    @action(detail=False, methods=["get"], url_path="unread")
+    def unread(self, request):
+        count = unread_count(request.user)
+        state = InboxState.objects.get(user=request.user)
+        state.unread_count = count
+
+        return Response(InboxStateSerializer(state).data)
 
-        user = self.request.user
+    @extend_schema(request=MarkReadSerializer, responses=InboxStateSerializer)
+    @action(detail=False, methods=["post"], url_path="read")
+    def read(self, request):
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-        queryset = queryset.filter(Q(groups__in=user.groups.all()) | Q(user=user))
+        state = mark_read(request.user, serializer.validated_data.get("until"))
 
-        return queryset
+        return Response(InboxStateSerializer(state).data)
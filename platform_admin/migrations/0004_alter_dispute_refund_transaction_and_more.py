@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("platform_admin", "0003_alter_dispute_amount"),
+        ("wallets", "0006_alter_ledgerentry_transaction_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="dispute",
+            name="refund_transaction",
+            field=models.OneToOneField(
+                blank=True,
+                db_constraint=False,
+                help_text="The refund transaction created for this dispute",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="dispute_refund",
+                to="wallets.transaction",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="dispute",
+            name="transaction",
+            field=models.ForeignKey(
+                db_constraint=False,
+                help_text="The transaction being disputed",
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="disputes",
+                to="wallets.transaction",
+            ),
+        ),
+    ]
@@ -29,6 +29,7 @@ class Dispute(BaseModel):
         Transaction,
         on_delete=models.PROTECT,
         related_name="disputes",
+        db_constraint=False,
         help_text="The transaction being disputed",
     )
     phone_number = models.CharField(
@@ -58,6 +59,7 @@ class Dispute(BaseModel):
         null=True,
         blank=True,
         related_name="dispute_refund",
+        db_constraint=False,
         help_text="The refund transaction created for this dispute",
     )
 
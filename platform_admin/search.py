@@ -0,0 +1,66 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast
+
+from accounts.models import Business, User
+from core.pagination import KeysetPagination
+from wallets.models import Wallet
+
+# Must match the expression of `transaction_remarks_search_idx`
+REMARKS_VECTOR = SearchVector("remarks", config="simple")
+
+
+def phone_fragment(phone):
+    """Digits of a phone number fragment in the form phone numbers are stored."""
+    digits = re.sub(r"\D", "", phone)
+
+    if len(digits) > 9:
+        return digits[-9:]
+
+    return digits[1:] if digits.startswith("0") else digits
+
+
+def search_transactions(queryset, q=None, phone=None, amount=None):
+    """
+    Narrow `queryset` to transactions whose remarks match the web-style
+    query `q`, with a counterparty whose phone number contains `phone`, or
+    of exactly `amount`. Text matches are annotated with their `rank`.
+    """
+    if q:
+        query = SearchQuery(q, config="simple", search_type="websearch")
+        queryset = (
+            queryset.annotate(search=REMARKS_VECTOR).filter(search=query)
+            # As double precision so that the rank survives the page cursor
+            .annotate(rank=Cast(SearchRank(REMARKS_VECTOR, query), FloatField()))
+        )
+
+    if phone:
+        fragment = phone_fragment(phone)
+        # Separate subqueries so that each can use its trigram index
+        users = User.objects.filter(phone_number__contains=fragment).values("id")
+        businesses = Business.objects.filter(contact_phone__contains=fragment).values(
+            "id"
+        )
+        wallets = Wallet.objects.filter(
+            Q(user__in=users) | Q(business__in=businesses)
+        ).values("id")
+        queryset = queryset.filter(
+            Q(from_wallet__in=wallets) | Q(to_wallet__in=wallets)
+        )
+
+    if amount is not None:
+        queryset = queryset.filter(amount=amount)
+
+    return queryset
+
+
+class SearchPagination(KeysetPagination):
+    """Keyset pages of transaction searches; ranked searches by rank first."""
+
+    def _ordering(self, queryset):
+        if "rank" in queryset.query.annotations:
+            return ["rank", *self.ordering]
+
+        return super()._ordering(queryset)
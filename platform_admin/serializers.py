@@ -110,6 +110,34 @@ class TransactionRecordSerializer(serializers.ModelSerializer):
         return f"business:{obj.to_wallet.business.id}"
 
 
+class TransactionSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(
+        required=False, help_text="Words or quoted phrases to find in the remarks"
+    )
+    phone = serializers.RegexField(
+        r"\d{3}",
+        required=False,
+        help_text="Fragment of a counterparty phone number, at least 3 digits",
+    )
+    amount = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError("give at least one of q, phone or amount")
+
+        return attrs
+
+
+class TransactionSearchSerializer(TransactionRecordSerializer):
+    rank = serializers.SerializerMethodField()
+
+    class Meta(TransactionRecordSerializer.Meta):
+        fields = TransactionRecordSerializer.Meta.fields + ["rank"]
+
+    def get_rank(self, obj) -> float:
+        return getattr(obj, "rank", None)
+
+
 class DisputeTransactionSerializer(serializers.ModelSerializer):
     transaction = serializers.SlugRelatedField(
         slug_field="id",
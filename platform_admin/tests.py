@@ -1,3 +1,83 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from wallets.models import Wallet
+from wallets.transfers import transfer
+
+User = get_user_model()
+
+
+class TransactionSearchTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            phone_number="911111171", password="testpass", first_name="Staff"
+        )
+        self.staff.is_staff = True
+        self.staff.save()
+
+        self.alice = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="911223344", password="testpass", first_name="Alice"
+            ),
+            balance=10000,
+        )
+        self.bob = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="955667788", password="testpass", first_name="Bob"
+            )
+        )
+
+        transfer(self.alice, self.bob, 150, remarks="rent for october")
+        transfer(self.alice, self.bob, 200, remarks="rent rent rent")
+        transfer(self.alice, self.bob, 300, remarks="school fees")
+        transfer(self.bob, self.alice, 150, remarks="refund")
+
+        self.client.force_authenticate(user=self.staff)
+        self.url = reverse("transaction-search-list")
+
+    def test_search_remarks_ranked(self):
+        response = self.client.get(self.url, {"q": "rent"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [row["remarks"] for row in response.data["results"]],
+            ["rent rent rent", "rent for october"],
+        )
+        self.assertIsNone(response.data["next"])
+
+    def _all_pages(self, params):
+        seen = []
+        response = self.client.get(self.url, {**params, "page_size": 1})
+
+        while True:
+            seen += [row["id"] for row in response.data["results"]]
+            if not response.data["next"]:
+                return seen
+            response = self.client.get(response.data["next"])
+
+    def test_keyset_pages_do_not_overlap(self):
+        for params in [{"amount": 150}, {"q": "rent"}]:
+            seen = self._all_pages(params)
+
+            self.assertEqual(len(seen), 2)
+            self.assertEqual(len(set(seen)), 2)
+
+    def test_search_by_phone_fragment(self):
+        response = self.client.get(self.url, {"phone": "0955 66", "q": "fees"})
+
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["amount"], 300)
+
+    def test_search_needs_a_criterion(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_is_for_staff_only(self):
+        self.client.force_authenticate(user=self.alice.user)
+
+        response = self.client.get(self.url, {"q": "rent"})
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
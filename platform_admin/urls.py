@@ -10,6 +10,9 @@ router.register("all_users", UsersDataViewset, basename="all-users-data")
 router.register(
     r"transaction-records", TransactionRecordViewset, basename="transaction-records"
 )
+router.register(
+    "transaction-search", TransactionSearchViewset, basename="transaction-search"
+)
 router.register(
     "dispute-records", DisputeTransactionViewset, basename="dispute-records"
 )
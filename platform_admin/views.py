@@ -11,7 +11,7 @@ from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
 )
-from rest_framework import status
+from rest_framework import exceptions, status
 from rest_framework.decorators import action
 from rest_framework.mixins import (
     CreateModelMixin,
@@ -28,8 +28,11 @@ from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
 from accounts.permissions import *
 from subscriptions.models import *
+from wallets.idempotency import IDEMPOTENCY_KEY_PARAMETER, idempotent
+from wallets.transfers import TransferError, transfer
 
 from .models import *
+from .search import SearchPagination, search_transactions
 from .serializers import *
 
 
@@ -43,12 +46,11 @@ class UsersDataViewset(GenericViewSet, ListModelMixin):
 
     def list(self, request, *args, **kwargs):
         data = []
-        for user in User.objects.all():
-            transactions = Transaction.objects.filter(
-                from_wallet__user=user, status="completed"
-            )
-            spend_data = transactions.aggregate(total=Sum("amount"))
+        users = User.objects.annotate(
+            total_spend=Coalesce(Sum("wallet__daily_stats__out_sum"), 0)
+        )
 
+        for user in users:
             subscriptions = UserSubscription.objects.filter(user=user, is_active=True)
             sub_data = subscriptions.aggregate(total=Sum("subscription__fixed_price"))
 
@@ -57,7 +59,7 @@ class UsersDataViewset(GenericViewSet, ListModelMixin):
                     "user_id": user.id,
                     "phone_number": user.phone_number,
                     "is_phone_verified": user.is_phone_verified,
-                    "total_spend": spend_data.get("total") or 0,
+                    "total_spend": user.total_spend,
                     "subscription_sum": sub_data.get("total") or 0,
                     "is_active_subscriber": subscriptions.exists(),
                 }
@@ -68,7 +70,12 @@ class UsersDataViewset(GenericViewSet, ListModelMixin):
 
 class TransactionRecordViewset(GenericViewSet, ListModelMixin, RetrieveModelMixin):
     serializer_class = TransactionRecordSerializer
-    queryset = Transaction.objects.all()
+    queryset = Transaction.objects.select_related(
+        "from_wallet__user",
+        "from_wallet__business",
+        "to_wallet__user",
+        "to_wallet__business",
+    )
     permission_classes = [IsAdminUser]
 
     def list(self, request, *args, **kwargs):
@@ -100,6 +107,29 @@ class TransactionRecordViewset(GenericViewSet, ListModelMixin, RetrieveModelMixi
         return Response(serializer.data)
 
 
+class TransactionSearchViewset(GenericViewSet, ListModelMixin):
+    """
+    Find transactions by remarks (full-text, ranked), counterparty phone
+    number fragment and amount, newest or best matching first, paged with
+    a keyset cursor.
+    """
+
+    serializer_class = TransactionSearchSerializer
+    queryset = TransactionRecordViewset.queryset
+    permission_classes = [IsAdminUser]
+    pagination_class = SearchPagination
+
+    def get_queryset(self):
+        query = TransactionSearchQuerySerializer(data=self.request.query_params)
+        query.is_valid(raise_exception=True)
+
+        return search_transactions(super().get_queryset(), **query.validated_data)
+
+    @extend_schema(parameters=[TransactionSearchQuerySerializer])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+
 class DisputeTransactionViewset(
     GenericViewSet, CreateModelMixin, ListModelMixin, RetrieveModelMixin
 ):
@@ -162,20 +192,46 @@ class DisputeTransactionViewset(
 
         return Response(serializer.data)
 
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
     @action(detail=True, methods=["patch"], url_path="process-refund")
+    @idempotent
     def process_refund(self, request, pk=None):
         dispute = self.get_object()
 
         with db_transaction.atomic():
-            # Create refund transaction
-            refund_tx = Transaction.objects.create(
-                from_wallet=dispute.transaction.to_wallet,  # Original receiver
-                to_wallet=dispute.transaction.from_wallet,  # Original sender
-                amount=dispute.transaction.amount,
-                status="completed",
-                remarks=f"Refund for disputed transaction {dispute.transaction.id}",
+            # Serialize refunds of the same dispute; the loser sees it resolved
+            dispute = (
+                Dispute.objects.select_for_update(of=("self",))
+                .select_related("transaction")
+                .get(pk=dispute.pk)
             )
 
+            if not dispute.transaction.to_wallet:
+                raise exceptions.ValidationError(
+                    "Transactions paid out of the platform cannot be refunded"
+                )
+
+            if dispute.transaction.status != "completed":
+                raise exceptions.ValidationError(
+                    "Only completed transactions can be refunded"
+                )
+
+            # Move the money back from the original receiver to the sender
+            try:
+                refund_tx = transfer(
+                    from_wallet=dispute.transaction.to_wallet,
+                    to_wallet=dispute.transaction.from_wallet,
+                    amount=dispute.transaction.amount,
+                    remarks=f"Refund for disputed transaction {dispute.transaction.id}",
+                    check_limits=False,
+                )
+            except TransferError as e:
+                raise exceptions.ValidationError(
+                    f"Failed to update wallet balances: {str(e)}"
+                )
+
+            dispute.transaction.transition_to("reversed")
+
             # Update dispute status and link refund transaction
             serializer = self.get_serializer(
                 dispute,
@@ -189,24 +245,8 @@ class DisputeTransactionViewset(
             dispute.refund_transaction = refund_tx
             dispute.save()
 
-            # Update wallet balances (pseudo-code - adjust to your wallet logic)
-            self._update_wallet_balances(refund_tx)
-
         return Response(serializer.data)
 
-    def _update_wallet_balances(self, transaction):
-        """Helper method to update wallet balances"""
-        try:
-            # Deduct from sender
-            transaction.from_wallet.balance -= transaction.amount
-            transaction.from_wallet.save()
-
-            # Add to receiver
-            transaction.to_wallet.balance += transaction.amount
-            transaction.to_wallet.save()
-        except Exception as e:
-            raise ValidationError(f"Failed to update wallet balances: {str(e)}")
-
 
 class BusinessRecordViewset(GenericViewSet, ListModelMixin):
     serializer_class = BusinessRecordSerializer
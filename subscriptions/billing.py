@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from wallets.models import Wallet
+from wallets.settlement import settle
+
+from .models import UserSubscription
+
+
+def _wallet_id(owner):
+    try:
+        return owner.wallet.pk
+    except Wallet.DoesNotExist:
+        return None
+
+
+def bill_due_subscriptions(batch_size=500):
+    """
+    Charge every active subscription whose billing date has passed,
+    `batch_size` subscriptions per DB transaction settled as one batch.
+    Subscriptions locked by another worker are skipped, and those that could
+    not be paid keep their billing date so the next run retries them.
+    Returns the number of subscriptions charged.
+    """
+    charged = 0
+    last_id = None
+
+    while True:
+        now = timezone.now()
+
+        with transaction.atomic():
+            due = (
+                UserSubscription.objects.select_for_update(
+                    of=("self",), skip_locked=True
+                )
+                .select_related(
+                    "user__wallet", "subscription__service__business__wallet"
+                )
+                .filter(
+                    is_active=True,
+                    next_billing_date__lte=now,
+                    subscription__fixed_price__gt=0,
+                )
+                .order_by("id")
+            )
+
+            if last_id is not None:
+                due = due.filter(id__gt=last_id)
+
+            batch = list(due[:batch_size])
+
+            if not batch:
+                return charged
+
+            last_id = batch[-1].id
+            billable = [
+                (
+                    user_subscription,
+                    _wallet_id(user_subscription.user),
+                    _wallet_id(user_subscription.subscription.service.business),
+                )
+                for user_subscription in batch
+            ]
+            billable = [row for row in billable if row[1] and row[2]]
+
+            results = settle(
+                [
+                    (
+                        from_id,
+                        to_id,
+                        user_subscription.subscription.fixed_price,
+                        f"Payment for subscription on {user_subscription.subscription.name}",
+                    )
+                    for user_subscription, from_id, to_id in billable
+                ]
+            )
+
+            paid = []
+            for (user_subscription, *_), result in zip(billable, results):
+                if result["status"] != "completed":
+                    continue
+
+                user_subscription.next_billing_date = now + timedelta(
+                    days=user_subscription.subscription.frequency
+                )
+                user_subscription.updated_at = now
+                paid.append(user_subscription)
+
+            UserSubscription.objects.bulk_update(
+                paid, ["next_billing_date", "updated_at"]
+            )
+
+        charged += len(paid)
+
+        if len(batch) < batch_size:
+            return charged
@@ -1,3 +1,84 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import Business, Service
+from subscriptions.billing import bill_due_subscriptions
+from subscriptions.models import Subscription, UserSubscription
+from wallets.ledger import ledger_balance
+from wallets.models import Transaction, Wallet
+
+User = get_user_model()
+
+
+class BillingTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(
+            phone_number="933333333", password="testpass", first_name="Owner"
+        )
+        self.business = Business.objects.create(
+            name="Gym", owner=owner, contact_email="gym@test.com"
+        )
+        self.subscription = Subscription.objects.create(
+            name="Monthly",
+            service=Service.objects.create(
+                business=self.business, name="Gym", service_type="basic"
+            ),
+            frequency=30,
+            fixed_price=100,
+            has_fixed_price=True,
+        )
+        self.yesterday = timezone.now() - timedelta(days=1)
+
+    def _subscriber(self, index, balance, **kwargs):
+        user = User.objects.create_user(
+            phone_number=f"91111111{index}", password="testpass", first_name="User"
+        )
+        Wallet.objects.create(user=user, balance=balance)
+
+        return UserSubscription.objects.create(
+            user=user, subscription=self.subscription, **kwargs
+        )
+
+    def test_due_subscriptions_are_charged_and_rescheduled(self):
+        due = [
+            self._subscriber(i, 500, next_billing_date=self.yesterday) for i in range(3)
+        ]
+
+        self.assertEqual(bill_due_subscriptions(batch_size=2), 3)
+
+        for user_subscription in due:
+            user_subscription.refresh_from_db()
+            self.assertEqual(user_subscription.user.wallet.balance, 400)
+            self.assertGreater(
+                user_subscription.next_billing_date,
+                timezone.now() + timedelta(days=29),
+            )
+
+        merchant = self.business.wallet
+        merchant.refresh_from_db()
+        self.assertEqual(merchant.total_balance, 300)
+        self.assertEqual(ledger_balance(merchant), 300)
+
+    def test_only_due_active_subscriptions_are_charged(self):
+        self._subscriber(0, 500, next_billing_date=timezone.now() + timedelta(days=1))
+        self._subscriber(1, 500, next_billing_date=self.yesterday, is_active=False)
+        self._subscriber(2, 500)
+
+        self.assertEqual(bill_due_subscriptions(), 0)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_unpaid_subscriptions_keep_their_billing_date(self):
+        broke = self._subscriber(0, 50, next_billing_date=self.yesterday)
+        paying = self._subscriber(1, 500, next_billing_date=self.yesterday)
+
+        self.assertEqual(bill_due_subscriptions(), 1)
+
+        broke.refresh_from_db()
+        self.assertEqual(broke.next_billing_date, self.yesterday)
+        self.assertEqual(broke.user.wallet.balance, 50)
 
-# Create your tests here.
+        paying.refresh_from_db()
+        self.assertEqual(paying.user.wallet.balance, 400)
@@ -0,0 +1,4 @@
+# Load the Celery app with Django, so that tasks are sent with its broker
+from .celery import app as celery_app
+
+__all__ = ["celery_app"]
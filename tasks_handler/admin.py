@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import OutboxMessage
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ["id", "task", "created_at"]
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
@@ -16,5 +16,10 @@ app.conf.update(
     timezone="Africa/Addis_Ababa",
     enable_utc=True,
 )
+# CELERY_* Django settings, e.g. CELERY_BEAT_SCHEDULER
+app.config_from_object("django.conf:settings", namespace="CELERY")
 
 app.autodiscover_tasks()
+
+# Registers the periodic tasks on `app.conf.beat_schedule`
+from . import crontabs
@@ -2,4 +2,37 @@ from celery.schedules import crontab
 
 from tasks_handler.celery import app
 
-app.conf.beat_schedule = {}
+app.conf.beat_schedule = {
+    "snapshot-wallet-balances": {
+        "task": "tasks_handler.tasks.snapshot_wallet_balances",
+        "schedule": crontab(minute=0),
+    },
+    "consolidate-wallet-stripes": {
+        "task": "tasks_handler.tasks.consolidate_wallet_stripes",
+        "schedule": crontab(minute="*/5"),
+    },
+    "purge-idempotency-keys": {
+        "task": "tasks_handler.tasks.purge_idempotency_keys",
+        "schedule": crontab(minute=30),
+    },
+    "create-transaction-partitions": {
+        "task": "tasks_handler.tasks.create_transaction_partitions",
+        "schedule": crontab(minute=0, hour=1),
+    },
+    "release-authorization-holds": {
+        "task": "tasks_handler.tasks.release_authorization_holds",
+        "schedule": crontab(minute="*"),
+    },
+    "time-out-transactions": {
+        "task": "tasks_handler.tasks.time_out_transactions",
+        "schedule": crontab(minute="*/5"),
+    },
+    "relay-outbox": {
+        "task": "tasks_handler.tasks.relay_outbox",
+        "schedule": crontab(minute="*"),
+    },
+    "reconcile-wallet-balances": {
+        "task": "tasks_handler.tasks.reconcile_wallet_balances",
+        "schedule": crontab(minute=0, hour=2),
+    },
+}
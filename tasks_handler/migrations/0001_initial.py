@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:29
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("task", models.CharField(max_length=255)),
+                ("kwargs", models.JSONField(default=dict)),
+            ],
+            options={
+                "ordering": ["created_at", "updated_at"],
+                "get_latest_by": "created_at",
+                "abstract": False,
+                "indexes": [
+                    models.Index(fields=["created_at"], name="outbox_created_at_idx")
+                ],
+            },
+        ),
+    ]
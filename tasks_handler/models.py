@@ -1,3 +1,17 @@
 from django.db import models
 
-# Create your models here.
+from core.models import BaseModel
+
+
+class OutboxMessage(BaseModel):
+    """
+    A Celery task to send once the DB transaction that wrote it commits.
+    Written with `tasks_handler.outbox.publish`, sent and deleted by
+    `tasks_handler.outbox.relay`.
+    """
+
+    task = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict)
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=["created_at"], name="outbox_created_at_idx")]
@@ -0,0 +1,77 @@
+import logging
+
+from django.db import transaction
+
+from .celery import app
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+RELAY_TASK = "tasks_handler.tasks.relay_outbox"
+
+
+def _start_relay():
+    try:
+        app.send_task(RELAY_TASK, retry=False)
+    except Exception as e:
+        # The periodic relay picks the messages up instead
+        logger.warning(f"Could not start the outbox relay: {e}")
+
+
+def publish_many(task, kwargs_list):
+    """
+    Send the Celery task named `task` once per kwargs in `kwargs_list` after
+    the surrounding transaction commits. The messages are written in that
+    transaction, so they are sent if and only if it commits, even when the
+    process dies right after committing.
+    """
+    messages = OutboxMessage.objects.bulk_create(
+        [OutboxMessage(task=task, kwargs=kwargs) for kwargs in kwargs_list],
+        batch_size=1000,
+    )
+
+    if messages:
+        transaction.on_commit(_start_relay)
+
+    return messages
+
+
+def publish(task, **kwargs):
+    return publish_many(task, [kwargs])[0]
+
+
+def relay(batch_size=500):
+    """
+    Send pending outbox messages to the broker, oldest first, `batch_size`
+    per DB transaction, and delete them. Rows are claimed with SKIP LOCKED
+    so relays running at the same time share the work. A message is deleted
+    only after the broker accepted it, so a relay dying in between sends it
+    again: tasks run at least once. Returns the number of messages sent.
+    """
+    sent = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                OutboxMessage.objects.select_for_update(skip_locked=True).order_by(
+                    "created_at"
+                )[:batch_size]
+            )
+
+            if not batch:
+                return sent
+
+            with app.producer_or_acquire() as producer:
+                for message in batch:
+                    app.send_task(
+                        message.task, kwargs=message.kwargs, producer=producer
+                    )
+
+            OutboxMessage.objects.filter(
+                id__in=[message.id for message in batch]
+            ).delete()
+
+        sent += len(batch)
+
+        if len(batch) < batch_size:
+            return sent
@@ -1,42 +1,88 @@
-from datetime import datetime, timedelta
+from celery import shared_task
+from django.conf import settings
 
-from celery import group, shared_task
-from django.db import transaction
-from django.utils import timezone
+from notifications.backends import get_backend
+from notifications.delivery import push_batches, retry_delay, send_batch
+from subscriptions.billing import bill_due_subscriptions
+from wallets.holds import release_expired_holds
+from wallets.idempotency import purge_expired_keys
+from wallets.ledger import take_snapshots
+from wallets.partitions import ensure_transaction_partitions
+from wallets.reconciliation import reconcile
+from wallets.stripes import consolidate_stripes
+from wallets.transfer_queue import apply_pending, time_out_stuck_transactions
 
-from subscriptions.models import Subscription, UserSubscription
-from wallets.models import Transaction
+from .outbox import relay
 
 
 @shared_task
 def dispatch_subscription_payment():
-    subscriptions = UserSubscription.objects.filter(
-        is_active=True, next_billing_date=timezone.now()
-    )
+    return bill_due_subscriptions()
 
-    for subscription in subscriptions:
-        handle_one_subscription(subscription).delay()
+
+@shared_task
+def snapshot_wallet_balances():
+    return take_snapshots()
+
+
+@shared_task
+def consolidate_wallet_stripes():
+    return consolidate_stripes()
+
+
+@shared_task
+def purge_idempotency_keys():
+    return purge_expired_keys()
+
+
+@shared_task
+def create_transaction_partitions():
+    return ensure_transaction_partitions()
+
+
+@shared_task
+def reconcile_wallet_balances():
+    run = reconcile()
+
+    return {"run": str(run.id), "discrepancies": run.discrepancies_found}
 
 
 @shared_task
-def handle_one_subscription(user_subscription):
+def apply_pending_transfers(wallet_id):
+    return apply_pending(wallet_id)
+
+
+@shared_task
+def release_authorization_holds():
+    return release_expired_holds()
+
+
+@shared_task
+def time_out_transactions():
+    return time_out_stuck_transactions()
+
+
+@shared_task
+def relay_outbox():
+    return relay()
+
+
+@shared_task
+def push_notifications(notification_ids):
+    batches = 0
+
+    for batch in push_batches(notification_ids, get_backend().batch_limit):
+        send_push_batch.delay(batch)
+        batches += 1
+
+    return batches
 
-    with transaction.atomic():
 
-        user = user_subscription.user
-        from_wallet = user.wallet
-        to_be_deducted_amount = user_subscription.subscription.fixed_price
-        to_wallet = user_subscription.subscription.bussines.wallet
+@shared_task(bind=True, max_retries=settings.PUSH_MAX_RETRIES)
+def send_push_batch(self, pushes):
+    retry = send_batch(pushes)
 
-        tr = Transaction.objects.create(
-            from_wallet=from_wallet,
-            to_wallet=to_wallet,
-            amount=to_be_deducted_amount,
-            remarks=f"Payment for subscription on {user_subscription.subscription.name}",
-            status="pending",
-        )
+    if retry:
+        raise self.retry(args=[retry], countdown=retry_delay(self.request.retries))
 
-        user_subscription.next_billing_date = timezone.now() + timedelta(
-            days=user_subscription.subscription.frequency
-        )
-        user_subscription.save()
+    return len(pushes)
@@ -1,3 +1,82 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
 from django.test import TestCase
+from kombu.exceptions import OperationalError
+
+from notifications.delivery import PUSH_TASK
+from tasks_handler import outbox
+from tasks_handler.celery import app
+from tasks_handler.models import OutboxMessage
+from wallets.models import Wallet
+from wallets.transfers import TransferError, transfer
+
+User = get_user_model()
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(
+            phone_number="911111111", password="testpass", first_name="Sender"
+        )
+        self.receiver = User.objects.create_user(
+            phone_number="922222222", password="testpass", first_name="Receiver"
+        )
+        self.from_wallet = Wallet.objects.create(user=self.sender, balance=1000)
+        self.to_wallet = Wallet.objects.create(user=self.receiver, balance=0)
+
+    def test_transfer_queues_push_instead_of_sending_it(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            transfer(self.from_wallet, self.to_wallet, 300)
+
+        message = OutboxMessage.objects.get()
+        notification = self.receiver.notifications.get(delivery_method="push")
+
+        self.assertEqual(message.task, PUSH_TASK)
+        self.assertEqual(message.kwargs, {"notification_ids": [str(notification.pk)]})
+        self.assertIn(outbox._start_relay, callbacks)
+
+    def test_rolled_back_transfer_leaves_no_message(self):
+        with self.assertRaises(TransferError):
+            with transaction.atomic():
+                transfer(self.from_wallet, self.to_wallet, 300)
+                raise TransferError("rolled back")
+
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_relay_sends_and_deletes_messages_in_order(self):
+        outbox.publish_many("tasks.example", [{"n": n} for n in range(5)])
+
+        with mock.patch.object(app, "send_task") as send_task:
+            self.assertEqual(outbox.relay(batch_size=2), 5)
+
+        self.assertEqual(
+            [call.kwargs["kwargs"] for call in send_task.call_args_list],
+            [{"n": n} for n in range(5)],
+        )
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_relay_keeps_messages_the_broker_refused(self):
+        outbox.publish("tasks.example", n=1)
+
+        with mock.patch.object(app, "send_task", side_effect=OperationalError):
+            with self.assertRaises(OperationalError):
+                outbox.relay()
+
+        self.assertEqual(OutboxMessage.objects.count(), 1)
+
+
+class BeatScheduleTests(TestCase):
+    def test_periodic_tasks_are_registered(self):
+        self.assertEqual(app.conf.beat_scheduler, settings.CELERY_BEAT_SCHEDULER)
+
+        # What a worker does on start; autodiscovery is lazy otherwise
+        app.loader.import_default_modules()
+
+        for name, entry in app.conf.beat_schedule.items():
+            self.assertIn(entry["task"], app.tasks, name)
 
-# Create your tests here.
+        self.assertIn("snapshot-wallet-balances", app.conf.beat_schedule)
+        self.assertIn("relay-outbox", app.conf.beat_schedule)
@@ -1,16 +1,103 @@
+from django.conf import settings
 from django.contrib import admin
 
-from .models import Transaction, Wallet
+from .models import (
+    AuthorizationHold,
+    BalanceDiscrepancy,
+    IdempotencyKey,
+    LedgerEntry,
+    ReconciliationRun,
+    Transaction,
+    Wallet,
+    WalletDailyStats,
+    WalletSnapshot,
+)
+from .stripes import disable_stripes, enable_stripes
 
 
 class WalletAdmin(admin.ModelAdmin):
     list_display = ["id", "user__phone_number", "balance", "wallet_type", "user__id"]
     list_filter = ["user"]
+    actions = ["enable_balance_stripes", "disable_balance_stripes"]
+
+    @admin.action(description="Spread incoming credits over striped sub-balances")
+    def enable_balance_stripes(self, request, queryset):
+        for wallet in queryset:
+            enable_stripes(wallet, settings.WALLET_BALANCE_STRIPES)
+
+    @admin.action(description="Fold striped sub-balances back and stop striping")
+    def disable_balance_stripes(self, request, queryset):
+        for wallet in queryset:
+            disable_stripes(wallet)
 
 
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ("id", "amount", "status", "remarks")
 
 
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ("id", "wallet", "amount", "sequence", "transaction")
+
+    # The ledger is append-only: no single or bulk deletes
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class WalletSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("id", "wallet", "sequence", "balance", "created_at")
+
+
+class WalletDailyStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        "wallet",
+        "day",
+        "stripe",
+        "in_count",
+        "in_sum",
+        "out_count",
+        "out_sum",
+    )
+    list_filter = ["day"]
+
+
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ("id", "key", "owner", "response_status", "expires_at")
+
+
+class AuthorizationHoldAdmin(admin.ModelAdmin):
+    list_display = ("id", "wallet", "merchant_wallet", "amount", "status", "expires_at")
+    list_filter = ["status"]
+
+
+class ReconciliationRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "status",
+        "wallets_checked",
+        "discrepancies_found",
+        "created_at",
+        "finished_at",
+    )
+
+
+class BalanceDiscrepancyAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "run",
+        "wallet",
+        "balance",
+        "ledger_balance",
+        "transaction_balance",
+    )
+    list_filter = ["run"]
+
+
 admin.site.register(Wallet, WalletAdmin)
 admin.site.register(Transaction, TransactionAdmin)
+admin.site.register(LedgerEntry, LedgerEntryAdmin)
+admin.site.register(WalletSnapshot, WalletSnapshotAdmin)
+admin.site.register(WalletDailyStats, WalletDailyStatsAdmin)
+admin.site.register(IdempotencyKey, IdempotencyKeyAdmin)
+admin.site.register(ReconciliationRun, ReconciliationRunAdmin)
+admin.site.register(BalanceDiscrepancy, BalanceDiscrepancyAdmin)
+admin.site.register(AuthorizationHold, AuthorizationHoldAdmin)
@@ -6,4 +6,4 @@ class WalletsConfig(AppConfig):
     name = "wallets"
 
     def ready(self):
-        from . import signals
+        from . import balance_cache, signals
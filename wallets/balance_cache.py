@@ -0,0 +1,165 @@
+import json
+import logging
+import time
+from functools import cache
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.dispatch import receiver
+from rest_framework.utils.encoders import JSONEncoder
+
+from .dispatch import balance_changed
+from .models import Wallet, WalletStripe
+from .serializers import WalletSerializers
+
+logger = logging.getLogger(__name__)
+
+# Store a wallet document unless the cached one is at least as new
+STORE_IF_NEWER = """
+local current = redis.call('HGET', KEYS[1], 'version')
+if current and tonumber(current) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'document', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+@cache
+def _client(url):
+    return redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+# Monotonic time until which reads do not try the cache, set when it could
+# not be reached so that requests do not each wait for its timeouts
+_skip_until = 0.0
+
+
+def _reachable():
+    return time.monotonic() >= _skip_until
+
+
+def _unreachable():
+    global _skip_until
+
+    _skip_until = time.monotonic() + settings.WALLET_CACHE_RETRY_AFTER.total_seconds()
+
+
+def _wallet_key(wallet_id):
+    return f"wallet:{wallet_id}"
+
+
+def _user_key(user_id):
+    return f"wallet:user:{user_id}"
+
+
+def _stripe_total(field):
+    return Coalesce(
+        Subquery(
+            WalletStripe.objects.filter(wallet=OuterRef("pk"))
+            .order_by()
+            .values("wallet")
+            .annotate(total=Sum(field))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def load(wallet_ids):
+    """
+    Read wallets from the database as `{wallet_id: (version, document)}`.
+
+    The version grows with every change to the wallet row or any of its
+    stripes, so a document read later never has a lower version.
+    """
+    wallets = Wallet.objects.filter(id__in=wallet_ids).annotate(
+        striped_balance=_stripe_total("balance"),
+        stripe_sequence=_stripe_total("ledger_sequence"),
+    )
+
+    return {
+        wallet.id: (
+            wallet.version + wallet.stripe_sequence,
+            WalletSerializers(wallet).data,
+        )
+        for wallet in wallets
+    }
+
+
+def store(documents):
+    client = _client(settings.WALLET_CACHE_URL)
+    store_if_newer = client.register_script(STORE_IF_NEWER)
+    ttl = int(settings.WALLET_CACHE_TTL.total_seconds())
+
+    with client.pipeline(transaction=False) as pipe:
+        for wallet_id, (version, document) in documents.items():
+            store_if_newer(
+                keys=[_wallet_key(wallet_id)],
+                args=[version, json.dumps(document, cls=JSONEncoder), ttl],
+                client=pipe,
+            )
+
+            if document["user"]:
+                pipe.set(_user_key(document["user"]), str(wallet_id), ex=ttl)
+
+        pipe.execute()
+
+
+def refresh(wallet_ids):
+    """Write the committed state of the wallets through to the cache."""
+    wallet_ids = [wallet_id for wallet_id in wallet_ids if wallet_id]
+
+    if not wallet_ids:
+        return
+
+    try:
+        store(load(wallet_ids))
+    except redis.RedisError as e:
+        _unreachable()
+        logger.warning(f"Could not refresh cached wallets {wallet_ids}: {e}")
+
+
+def fill(wallet_ids):
+    """
+    Cache wallets just read from the database after a miss. Skipped while
+    the cache is unreachable; unlike changes, a miss is not worth the wait.
+    """
+    if _reachable():
+        refresh(wallet_ids)
+
+
+def cached_wallet_of_user(user_id):
+    """
+    Return the cached serialized wallet of a user, or None when it is not
+    cached or the cache cannot be reached so that the caller reads the
+    database instead. Once it could not be reached, it is not tried again
+    for `WALLET_CACHE_RETRY_AFTER`.
+    """
+    if not _reachable():
+        return None
+
+    client = _client(settings.WALLET_CACHE_URL)
+
+    try:
+        wallet_id = client.get(_user_key(user_id))
+        document = wallet_id and client.hget(
+            _wallet_key(wallet_id.decode()), "document"
+        )
+    except redis.RedisError as e:
+        _unreachable()
+        logger.warning(f"Could not read cached wallet of user {user_id}: {e}")
+        return None
+
+    return json.loads(document) if document else None
+
+
+@receiver(balance_changed)
+def write_through(sender, wallet_ids, **kwargs):
+    wallet_ids = list(wallet_ids)
+
+    transaction.on_commit(lambda: refresh(wallet_ids))
@@ -0,0 +1,147 @@
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Transaction, WalletDailyStats
+
+# Transactions whose money has moved, whatever happened to them afterwards
+SETTLED_STATUSES = ["completed", "reversed"]
+
+
+def _upsert(rows, batch_size=1000):
+    """
+    Add `{(wallet_id, day, stripe): [in_count, in_sum, out_count, out_sum]}`
+    to the stats rows with INSERT ... ON CONFLICT DO UPDATE, in key order so
+    that concurrent transfers never wait on each other in a cycle.
+    """
+    table = connection.ops.quote_name(WalletDailyStats._meta.db_table)
+    items = sorted(rows.items(), key=lambda item: (str(item[0][0]), *item[0][1:]))
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start : start + batch_size]
+
+            values = ", ".join(["(%s::uuid, %s, %s, %s, %s, %s, %s)"] * len(batch))
+            params = [
+                param
+                for (wallet_id, day, stripe), counters in batch
+                for param in (str(wallet_id), day, stripe, *counters)
+            ]
+
+            cursor.execute(
+                f"INSERT INTO {table} AS s"
+                " (wallet_id, day, stripe, in_count, in_sum, out_count, out_sum)"
+                f" VALUES {values}"
+                " ON CONFLICT (wallet_id, day, stripe) DO UPDATE SET"
+                " in_count = s.in_count + EXCLUDED.in_count,"
+                " in_sum = s.in_sum + EXCLUDED.in_sum,"
+                " out_count = s.out_count + EXCLUDED.out_count,"
+                " out_sum = s.out_sum + EXCLUDED.out_sum",
+                params,
+            )
+
+
+def record(at, movements):
+    """
+    Count `(wallet_id, stripe, amount)` movements made at `at`: positive
+    amounts as money in, negative ones as money out. Movements without a
+    wallet (money leaving the platform) are ignored. Call it inside the
+    transaction making the movements.
+    """
+    day = timezone.localdate(at)
+    rows = defaultdict(lambda: [0, 0, 0, 0])
+
+    for wallet_id, stripe, amount in movements:
+        if wallet_id is None:
+            continue
+
+        counters = rows[(wallet_id, day, stripe or 0)]
+
+        if amount > 0:
+            counters[0] += 1
+            counters[1] += amount
+        else:
+            counters[2] += 1
+            counters[3] -= amount
+
+    if rows:
+        _upsert(rows)
+
+
+def totals(wallets, since=None, until=None):
+    """
+    Money in and out of `wallets` (a queryset or ids) from `since` to
+    `until`, both days inclusive, as `{wallet_id: {"in_count": ..., ...}}`.
+    """
+    stats = WalletDailyStats.objects.filter(wallet__in=wallets)
+
+    if since:
+        stats = stats.filter(day__gte=since)
+    if until:
+        stats = stats.filter(day__lte=until)
+
+    rows = (
+        stats.order_by()
+        .values("wallet")
+        .annotate(
+            in_count=Sum("in_count"),
+            in_sum=Sum("in_sum"),
+            out_count=Sum("out_count"),
+            out_sum=Sum("out_sum"),
+        )
+    )
+
+    return {row.pop("wallet"): row for row in rows}
+
+
+def backfill(day):
+    """
+    Recompute the stats of `day` from the transactions completed on it.
+    The stats table is locked against writes meanwhile, so transfers wait
+    for the day to be rewritten instead of being lost or counted twice.
+    Returns the number of rows written.
+    """
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    end = start + timedelta(days=1)
+
+    completed = Transaction.objects.filter(
+        status__in=SETTLED_STATUSES,
+        completed_at__gte=start,
+        completed_at__lt=end,
+        # Nothing stays pending for a day; lets PostgreSQL skip partitions
+        created_at__gte=start - timedelta(days=1),
+        created_at__lt=end,
+    ).order_by()
+
+    rows = defaultdict(lambda: [0, 0, 0, 0])
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "LOCK TABLE"
+                f" {connection.ops.quote_name(WalletDailyStats._meta.db_table)}"
+                " IN SHARE ROW EXCLUSIVE MODE"
+            )
+
+        for wallet_id, count, total in (
+            completed.filter(to_wallet__isnull=False)
+            .values("to_wallet")
+            .annotate(count=Count("id"), total=Sum("amount"))
+            .values_list("to_wallet", "count", "total")
+        ):
+            rows[(wallet_id, day, 0)][:2] = [count, total]
+
+        for wallet_id, count, total in (
+            completed.values("from_wallet")
+            .annotate(count=Count("id"), total=Sum("amount"))
+            .values_list("from_wallet", "count", "total")
+        ):
+            rows[(wallet_id, day, 0)][2:] = [count, total]
+
+        WalletDailyStats.objects.filter(day=day).delete()
+        _upsert(rows)
+
+    return len(rows)
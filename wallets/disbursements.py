@@ -0,0 +1,97 @@
+from uuid import UUID
+
+from django.db.models import Q
+
+from accounts.models import User
+
+from .models import Wallet
+from .settlement import settle
+
+
+def _parse_row(row):
+    """Return `(lookup, value, amount)` for a recipient row or raise ValueError."""
+    try:
+        amount = int(row.get("amount"))
+    except (TypeError, ValueError):
+        raise ValueError("invalid amount")
+
+    if amount <= 0:
+        raise ValueError("invalid amount")
+
+    recipient = str(row.get("recipient") or "").strip()
+
+    try:
+        return "id", UUID(recipient), amount
+    except ValueError:
+        pass
+
+    try:
+        return "phone", User.normalize_phone_number(recipient), amount
+    except ValueError:
+        raise ValueError("invalid recipient")
+
+
+def _resolve(lookups):
+    wallet_ids = [value for lookup, value in lookups if lookup == "id"]
+    phones = [value for lookup, value in lookups if lookup == "phone"]
+
+    wallets = Wallet.objects.filter(
+        Q(id__in=wallet_ids) | Q(user__phone_number__in=phones),
+        is_restricted=False,
+    ).values_list("id", "user__phone_number")
+
+    resolved = {}
+
+    for wallet_id, phone_number in wallets:
+        resolved["id", wallet_id] = wallet_id
+        if phone_number:
+            resolved["phone", phone_number] = wallet_id
+
+    return resolved
+
+
+def disburse(source, rows, remarks=None):
+    """
+    Pay many recipients from `source` in a single DB transaction.
+
+    `rows` is a list of `{"recipient": <wallet id or phone>, "amount": int}`.
+    Recipients are resolved in one query and the payouts applied as one
+    `settle` batch. Rows that cannot be paid are reported and skipped; if the
+    source cannot cover the rest nothing is paid. Returns one result dict per
+    row, in order.
+    """
+    results = [None] * len(rows)
+    parsed = []
+
+    for index, row in enumerate(rows):
+        try:
+            parsed.append((index, *_parse_row(row)))
+        except ValueError as e:
+            results[index] = {"status": "failed", "error": str(e)}
+
+    resolved = _resolve({(lookup, value) for _, lookup, value, _ in parsed})
+
+    payouts = []
+
+    for index, lookup, value, amount in parsed:
+        wallet_id = resolved.get((lookup, value))
+
+        if wallet_id is None:
+            results[index] = {"status": "failed", "error": "recipient not found"}
+        elif wallet_id == source.pk:
+            results[index] = {"status": "failed", "error": "cannot pay the source"}
+        else:
+            payouts.append((index, wallet_id, amount))
+
+    if not payouts:
+        return results
+
+    settled = settle(
+        [(source.pk, wallet_id, amount, remarks) for _, wallet_id, amount in payouts],
+        all_or_nothing=True,
+    )
+
+    for (index, *_), result in zip(payouts, settled):
+        results[index] = result
+
+    return results
@@ -1,3 +1,7 @@
 from django.dispatch import Signal
 
+# Sent with `wallet_ids` from inside the transaction that changed the wallets
 balance_changed = Signal()
+
+# Sent with `transactions` from inside the transaction that completed them
+transactions_completed = Signal()
@@ -0,0 +1,203 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import velocity
+from .dispatch import balance_changed
+from .models import AuthorizationHold, Wallet
+from .stripes import fold_stripes
+from .transfers import (
+    InsufficientFunds,
+    TransferError,
+    VelocityLimitExceeded,
+    lock_wallets,
+    transfer,
+)
+
+
+class HoldError(TransferError):
+    pass
+
+
+def _release(wallet_id, amount):
+    Wallet.objects.filter(id=wallet_id).update(
+        frozen_amount=F("frozen_amount") - amount, version=F("version") + 1
+    )
+
+
+def authorize(
+    wallet, merchant_wallet, amount, expires_at=None, remarks=None, grant=None
+):
+    """
+    Reserve `amount` of `wallet` for `merchant_wallet` until `expires_at`
+    (by default `AUTHORIZATION_HOLD_TTL` from now). The amount counts
+    against the wallet's spending limits when held, not when captured, and
+    holds placed under a user's `grant` to an enterprise count against the
+    grant's rolling limit. Returns the hold.
+    """
+    if amount <= 0:
+        raise HoldError("amount must be positive")
+
+    if wallet.pk == merchant_wallet.pk:
+        raise HoldError("cannot hold funds for the same wallet")
+
+    # Read before locking; Redis is not waited on while the lock is held
+    allowed = velocity.wallet_allowance(wallet)
+    granted = None if grant is None else velocity.grant_allowance(grant)
+
+    with transaction.atomic():
+        payer = lock_wallets(wallet.pk)[wallet.pk]
+
+        if payer.balance - payer.frozen_amount < amount and payer.balance_stripes:
+            fold_stripes(payer)
+
+        if payer.balance - payer.frozen_amount < amount:
+            raise InsufficientFunds("not enough amount in the wallet")
+
+        if allowed is not None and allowed < amount:
+            raise VelocityLimitExceeded("wallet has reached its spending limit")
+
+        if granted is not None and granted < amount:
+            raise HoldError("exceeds the amount granted by the user")
+
+        Wallet.objects.filter(id=payer.id).update(
+            frozen_amount=F("frozen_amount") + amount, version=F("version") + 1
+        )
+        wallet.frozen_amount = payer.frozen_amount + amount
+
+        hold = AuthorizationHold.objects.create(
+            wallet=wallet,
+            merchant_wallet=merchant_wallet,
+            amount=amount,
+            expires_at=expires_at or timezone.now() + settings.AUTHORIZATION_HOLD_TTL,
+            remarks=remarks,
+        )
+
+        velocity.record_debit(payer, amount)
+
+        if grant is not None:
+            velocity.record_grant_use(grant, amount)
+
+        balance_changed.send(sender=Wallet, wallet_ids=[wallet.pk])
+
+        return hold
+
+
+def _lock_authorized(hold):
+    locked = AuthorizationHold.objects.select_for_update().get(pk=hold.pk)
+
+    if locked.status != "authorized":
+        raise HoldError(f"hold is already {locked.status}")
+
+    if locked.expires_at <= timezone.now():
+        raise HoldError("hold has expired")
+
+    return locked
+
+
+def capture(hold, amount=None):
+    """
+    Capture `amount` (by default all) of an authorized hold: the whole hold
+    is released and the captured amount transferred to the merchant in the
+    same DB transaction. Returns the updated hold.
+    """
+    with transaction.atomic():
+        locked = _lock_authorized(hold)
+        amount = locked.amount if amount is None else amount
+
+        if not 0 < amount <= locked.amount:
+            raise HoldError(f"amount must be between 1 and {locked.amount}")
+
+        wallets = lock_wallets(locked.wallet_id, locked.merchant_wallet_id)
+
+        _release(locked.wallet_id, locked.amount)
+
+        locked.transaction = transfer(
+            wallets[locked.wallet_id],
+            wallets[locked.merchant_wallet_id],
+            amount,
+            remarks=locked.remarks or f"Capture of hold {locked.id}",
+            # Counted against the limits when authorized
+            check_limits=False,
+        )
+        locked.captured_amount = amount
+        locked.status = "captured"
+        locked.save()
+
+        return locked
+
+
+def void(hold):
+    """Release an authorized hold without moving any money."""
+    with transaction.atomic():
+        locked = _lock_authorized(hold)
+
+        lock_wallets(locked.wallet_id)
+        _release(locked.wallet_id, locked.amount)
+
+        locked.status = "voided"
+        locked.save()
+
+        balance_changed.send(sender=Wallet, wallet_ids=[locked.wallet_id])
+
+        return locked
+
+
+def release_expired_holds(batch_size=1000):
+    """
+    Expire authorized holds past `expires_at` and give their funds back,
+    `batch_size` holds per DB transaction. Each batch is one UPDATE of the
+    holds and one UPDATE of the wallets' frozen amounts. Returns the number
+    of holds released.
+    """
+    holds = connection.ops.quote_name(AuthorizationHold._meta.db_table)
+    wallets = connection.ops.quote_name(Wallet._meta.db_table)
+
+    released = 0
+
+    while True:
+        now = timezone.now()
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {holds} SET status = 'expired', updated_at = %s"
+                f" WHERE id IN (SELECT id FROM {holds}"
+                "  WHERE status = 'authorized' AND expires_at <= %s"
+                "  LIMIT %s FOR UPDATE SKIP LOCKED)"
+                " RETURNING wallet_id, amount",
+                [now, now, batch_size],
+            )
+            rows = cursor.fetchall()
+
+            if not rows:
+                return released
+
+            frozen = defaultdict(int)
+            for wallet_id, amount in rows:
+                frozen[wallet_id] += amount
+
+            lock_wallets(*frozen)
+
+            values = ", ".join(["(%s::uuid, %s::bigint)"] * len(frozen))
+            cursor.execute(
+                f"UPDATE {wallets} AS w"
+                " SET frozen_amount = w.frozen_amount - v.amount,"
+                " version = w.version + 1"
+                f" FROM (VALUES {values}) AS v(id, amount)"
+                " WHERE w.id = v.id",
+                [
+                    param
+                    for wallet_id, amount in frozen.items()
+                    for param in (str(wallet_id), amount)
+                ],
+            )
+
+            balance_changed.send(sender=Wallet, wallet_ids=list(frozen))
+
+        released += len(rows)
+
+        if len(rows) < batch_size:
+            return released
@@ -0,0 +1,143 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.utils import timezone
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    name=HEADER,
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    required=False,
+    description="Client generated key that makes retries of this request safe",
+)
+
+
+def _fingerprint(request):
+    payload = json.dumps(
+        [request.method, request.path, request.data], sort_keys=True, default=str
+    )
+    digest = hashlib.sha256(payload.encode())
+
+    # `request.data` only names uploaded files
+    for field, uploads in sorted(request.FILES.lists()):
+        for upload in uploads:
+            digest.update(field.encode())
+
+            for chunk in upload.chunks():
+                digest.update(chunk)
+
+            upload.seek(0)
+
+    return digest.hexdigest()
+
+
+def _claim(owner, key, fingerprint):
+    """
+    Return `(record, created)`. A record that is not `created` belongs to an
+    earlier request with the same key.
+
+    A claim is leased for `IDEMPOTENCY_CLAIM_LEASE` until its response is
+    stored, then kept for `IDEMPOTENCY_KEY_TTL`. Expired records, including
+    claims of requests that died before answering, are taken over.
+    """
+    now = timezone.now()
+    defaults = {
+        "fingerprint": fingerprint,
+        "expires_at": now + settings.IDEMPOTENCY_CLAIM_LEASE,
+    }
+
+    record, created = IdempotencyKey.objects.get_or_create(
+        owner=owner, key=key, defaults=defaults
+    )
+
+    if not created and record.expires_at <= now:
+        IdempotencyKey.objects.filter(id=record.id).delete()
+        record, created = IdempotencyKey.objects.get_or_create(
+            owner=owner, key=key, defaults=defaults
+        )
+
+    return record, created
+
+
+def idempotent(view_method):
+    """
+    Make a money-moving view method safe to retry.
+
+    When the client sends an `Idempotency-Key` header the first successful
+    response is stored for the authenticated caller and replayed for every
+    retry with the same key, without running the view again. Failed requests
+    release the key so that they can be retried, and so does a request that
+    is still unanswered when its claim lease runs out.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        user = request.user
+
+        if not key or not getattr(user, "is_authenticated", False):
+            return view_method(self, request, *args, **kwargs)
+
+        owner = f"{user._meta.label_lower}:{user.pk}"
+        fingerprint = _fingerprint(request)
+
+        record, created = _claim(owner, key, fingerprint)
+
+        if not created:
+            if record.fingerprint != fingerprint:
+                return Response(
+                    {"detail": f"{HEADER} was already used for a different request"},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+
+            if record.response_status is None:
+                return Response(
+                    {"detail": f"A request with this {HEADER} is still in progress"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+
+            response = Response(record.response_body, status=record.response_status)
+            response["Idempotent-Replayed"] = "true"
+
+            return response
+
+        # By id: a retry may have taken over the key once the lease ran out
+        claim = IdempotencyKey.objects.filter(id=record.id)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            claim.delete()
+            raise
+
+        if not status.is_success(response.status_code):
+            claim.delete()
+            return response
+
+        now = timezone.now()
+        claim.update(
+            response_status=response.status_code,
+            response_body=response.data,
+            expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+            updated_at=now,
+        )
+
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys():
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+
+    return deleted
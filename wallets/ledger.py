@@ -0,0 +1,132 @@
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import LedgerEntry, Wallet, WalletSnapshot, WalletStripe
+
+
+def _latest_snapshot(wallet_ref):
+    return WalletSnapshot.objects.filter(wallet=wallet_ref).order_by("-sequence")
+
+
+def with_ledger_balance(queryset):
+    """
+    Annotate wallets with `ledger_balance`, the balance derived from the most
+    recent snapshot plus the ledger entries written after it. Credits still
+    sitting in stripes are not part of it until they are folded in.
+    """
+    latest = _latest_snapshot(OuterRef("pk"))
+
+    tail = (
+        LedgerEntry.objects.filter(
+            wallet=OuterRef("pk"),
+            stripe__isnull=True,
+            sequence__gt=OuterRef("snapshot_sequence"),
+            sequence__lte=OuterRef("ledger_sequence"),
+        )
+        .order_by()
+        .values("wallet")
+        .annotate(total=Sum("amount"))
+        .values("total")
+    )
+
+    return queryset.annotate(
+        snapshot_sequence=Coalesce(Subquery(latest.values("sequence")[:1]), 0),
+        snapshot_balance=Coalesce(Subquery(latest.values("balance")[:1]), 0),
+    ).annotate(
+        ledger_balance=F("snapshot_balance") + Coalesce(Subquery(tail), 0),
+    )
+
+
+def ledger_balance(wallet):
+    return (
+        with_ledger_balance(Wallet.objects.filter(pk=wallet.pk))
+        .values_list("ledger_balance", flat=True)
+        .get()
+    )
+
+
+def take_snapshots(batch_size=1000):
+    """
+    Snapshot every wallet that has ledger entries newer than its latest
+    snapshot. Returns the number of snapshots written.
+    """
+    wallets = (
+        with_ledger_balance(Wallet.objects.all())
+        .filter(ledger_sequence__gt=F("snapshot_sequence"))
+        .values_list("id", "ledger_sequence", "ledger_balance")
+    )
+
+    created = 0
+    batch = []
+
+    for wallet_id, sequence, balance in wallets.iterator(chunk_size=batch_size):
+        batch.append(
+            WalletSnapshot(wallet_id=wallet_id, sequence=sequence, balance=balance)
+        )
+
+        if len(batch) >= batch_size:
+            created += len(
+                WalletSnapshot.objects.bulk_create(batch, ignore_conflicts=True)
+            )
+            batch = []
+
+    if batch:
+        created += len(WalletSnapshot.objects.bulk_create(batch, ignore_conflicts=True))
+
+    return created
+
+
+def balance_at(wallet, at):
+    """
+    Balance of `wallet` from the ledger entries written before `at`.
+
+    Starts from the latest snapshot taken before `at` and adds the entries
+    numbered after it, up to the sequence of the first snapshot taken from
+    `at` on, so the entries read are bounded by the snapshot interval
+    rather than the age of the wallet. Credits held in stripes are those
+    made since each stripe was last folded into the wallet.
+    """
+    snapshots = WalletSnapshot.objects.filter(wallet=wallet)
+    previous = (
+        snapshots.filter(created_at__lt=at)
+        .order_by("-sequence")
+        .values_list("sequence", "balance")
+        .first()
+    )
+    following = (
+        snapshots.filter(created_at__gte=at)
+        .order_by("sequence")
+        .values_list("sequence", flat=True)
+        .first()
+    )
+
+    sequence, balance = previous or (0, 0)
+
+    tail = LedgerEntry.objects.filter(
+        wallet=wallet,
+        stripe__isnull=True,
+        sequence__gt=sequence,
+        created_at__lt=at,
+    )
+    if following is not None:
+        tail = tail.filter(sequence__lte=following)
+
+    striped = 0
+    for stripe in WalletStripe.objects.filter(wallet=wallet).values_list(
+        "index", flat=True
+    ):
+        entries = LedgerEntry.objects.filter(
+            wallet=wallet, stripe=stripe, created_at__lt=at
+        )
+        folded = (
+            entries.filter(amount__lt=0)
+            .order_by("-sequence")
+            .values_list("sequence", flat=True)
+            .first()
+        )
+        credits = entries.filter(sequence__gt=folded or 0).aggregate(
+            total=Sum("amount")
+        )
+        striped += credits["total"] or 0
+
+    return balance + (tail.aggregate(total=Sum("amount"))["total"] or 0) + striped
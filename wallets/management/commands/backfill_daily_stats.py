@@ -0,0 +1,41 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from wallets.daily_stats import backfill
+from wallets.models import Transaction
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily wallet stats from transactions, one day at a time"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="First day to recompute (default: day of the first transaction)",
+        )
+        parser.add_argument(
+            "--until",
+            type=date.fromisoformat,
+            help="Last day to recompute (default: today)",
+        )
+
+    def handle(self, *args, **options):
+        until = options["until"] or timezone.localdate()
+        since = options["since"]
+
+        if since is None:
+            first = Transaction.objects.aggregate(first=Min("created_at"))["first"]
+            since = timezone.localdate(first) if first else until
+
+        day = since
+        written = 0
+
+        while day <= until:
+            written += backfill(day)
+            day += timedelta(days=1)
+
+        self.stdout.write(f"Wrote {written} daily stats rows from {since} to {until}")
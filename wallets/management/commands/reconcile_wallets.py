@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from wallets.reconciliation import reconcile
+
+
+class Command(BaseCommand):
+    help = "Check wallet balances against the ledger and transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Start a new run instead of resuming an unfinished one",
+        )
+
+    def handle(self, *args, **options):
+        run = reconcile(chunk_size=options["chunk_size"], restart=options["restart"])
+
+        self.stdout.write(
+            f"Checked {run.wallets_checked} wallets, "
+            f"found {run.discrepancies_found} discrepancies (run {run.id})"
+        )
@@ -0,0 +1,48 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from wallets.stress import StressHarness
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent transfers, bill payments and refunds at a throwaway"
+        " test database and check the ledger invariants"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wallets", type=int, default=50)
+        parser.add_argument("--operations", type=int, default=5000)
+        parser.add_argument("--workers", type=int, default=16)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database around for inspection",
+        )
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False, keepdb=options["keepdb"]
+        )
+
+        try:
+            harness = StressHarness(
+                wallets=options["wallets"],
+                operations=options["operations"],
+                workers=options["workers"],
+                seed=options["seed"],
+            )
+            harness.setup()
+            report = harness.run()
+        finally:
+            if not options["keepdb"]:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(json.dumps(report, indent=2))
+
+        if report["violations"]:
+            raise CommandError(f"{len(report['violations'])} invariants broken")
@@ -0,0 +1,122 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:26
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_ledgers(apps, schema_editor):
+    """Record existing balances as the first entry of every wallet's ledger."""
+    Wallet = apps.get_model("wallets", "Wallet")
+    LedgerEntry = apps.get_model("wallets", "LedgerEntry")
+
+    wallets = Wallet.objects.exclude(balance=0)
+
+    LedgerEntry.objects.bulk_create(
+        (
+            LedgerEntry(wallet_id=wallet.id, amount=wallet.balance, sequence=1)
+            for wallet in wallets.only("id", "balance").iterator()
+        ),
+        batch_size=1000,
+    )
+    wallets.update(ledger_sequence=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wallet",
+            name="ledger_sequence",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name="LedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("amount", models.BigIntegerField()),
+                ("sequence", models.PositiveBigIntegerField()),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="ledger_entries",
+                        to="wallets.transaction",
+                    ),
+                ),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="ledger_entries",
+                        to="wallets.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["wallet", "sequence"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("wallet__isnull", False)),
+                        fields=("wallet", "sequence"),
+                        name="unique_ledger_entry_sequence",
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="WalletSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("sequence", models.PositiveBigIntegerField()),
+                ("balance", models.BigIntegerField()),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshots",
+                        to="wallets.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["wallet", "-sequence"],
+                "get_latest_by": "sequence",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("wallet", "sequence"), name="unique_wallet_snapshot"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
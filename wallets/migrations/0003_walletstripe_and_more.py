@@ -0,0 +1,86 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:28
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0002_wallet_ledger_sequence_ledgerentry_walletsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WalletStripe",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("index", models.PositiveSmallIntegerField()),
+                ("balance", models.BigIntegerField(default=0)),
+                ("ledger_sequence", models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["wallet", "index"],
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name="ledgerentry",
+            name="unique_ledger_entry_sequence",
+        ),
+        migrations.AddField(
+            model_name="ledgerentry",
+            name="stripe",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="wallet",
+            name="balance_stripes",
+            field=models.PositiveSmallIntegerField(
+                default=0,
+                help_text="Number of sub-balances incoming credits are spread over, 0 to disable",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ledgerentry",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("stripe__isnull", True), ("wallet__isnull", False)),
+                fields=("wallet", "sequence"),
+                name="unique_ledger_entry_sequence",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="ledgerentry",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("stripe__isnull", False)),
+                fields=("wallet", "stripe", "sequence"),
+                name="unique_ledger_entry_stripe_sequence",
+            ),
+        ),
+        migrations.AddField(
+            model_name="walletstripe",
+            name="wallet",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="stripes",
+                to="wallets.wallet",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="walletstripe",
+            constraint=models.UniqueConstraint(
+                fields=("wallet", "index"), name="unique_wallet_stripe"
+            ),
+        ),
+    ]
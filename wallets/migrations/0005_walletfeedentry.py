@@ -0,0 +1,95 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_feed(apps, schema_editor):
+    Transaction = apps.get_model("wallets", "Transaction")
+    WalletFeedEntry = apps.get_model("wallets", "WalletFeedEntry")
+
+    batch = []
+    transactions = Transaction.objects.values_list(
+        "id", "from_wallet_id", "to_wallet_id", "created_at"
+    )
+
+    for tr_id, from_wallet_id, to_wallet_id, created_at in transactions.iterator():
+        batch.append(
+            WalletFeedEntry(
+                wallet_id=from_wallet_id,
+                transaction_id=tr_id,
+                direction="out",
+                created_at=created_at,
+            )
+        )
+        if to_wallet_id:
+            batch.append(
+                WalletFeedEntry(
+                    wallet_id=to_wallet_id,
+                    transaction_id=tr_id,
+                    direction="in",
+                    created_at=created_at,
+                )
+            )
+
+        if len(batch) >= 1000:
+            WalletFeedEntry.objects.bulk_create(batch)
+            batch = []
+
+    WalletFeedEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0004_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WalletFeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "direction",
+                    models.CharField(
+                        choices=[("in", "In"), ("out", "Out")], max_length=3
+                    ),
+                ),
+                ("created_at", models.DateTimeField()),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to="wallets.transaction",
+                    ),
+                ),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed",
+                        to="wallets.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["wallet", "-created_at", "-id"], name="wallet_feed_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0005_walletfeedentry"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ledgerentry",
+            name="transaction",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="ledger_entries",
+                to="wallets.transaction",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="walletfeedentry",
+            name="transaction",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="feed_entries",
+                to="wallets.transaction",
+            ),
+        ),
+    ]
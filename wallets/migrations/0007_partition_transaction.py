@@ -0,0 +1,216 @@
+from django.db import migrations, transaction
+from django.utils import timezone
+
+from wallets.partitions import next_month
+
+TABLE = "wallets_transaction"
+LEGACY = "wallets_transaction_legacy"
+# Built next to the live table, then swapped in for it
+PARTITIONED = "wallets_transaction_partitioned"
+MIRROR = "wallets_transaction_mirror"
+BATCH_SIZE = 10_000
+
+# (name, definition); built before the backfill, renamed in the swap
+INDEXES = [
+    (
+        "wallets_transaction_from_wallet_id_18edf3fa",
+        'CREATE INDEX "{name}" ON "{table}" ("from_wallet_id")',
+    ),
+    (
+        "wallets_transaction_to_wallet_id_fadc9c3f",
+        'CREATE INDEX "{name}" ON "{table}" ("to_wallet_id")',
+    ),
+]
+CONSTRAINTS = [
+    (
+        "wallets_transaction_from_wallet_id_18edf3fa_fk_wallets_w",
+        'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" FOREIGN KEY ("from_wallet_id")'
+        ' REFERENCES "wallets_wallet" ("id") DEFERRABLE INITIALLY DEFERRED',
+    ),
+    (
+        "wallets_transaction_to_wallet_id_fadc9c3f_fk_wallets_wallet_id",
+        'ALTER TABLE "{table}" ADD CONSTRAINT "{name}" FOREIGN KEY ("to_wallet_id")'
+        ' REFERENCES "wallets_wallet" ("id") DEFERRABLE INITIALLY DEFERRED',
+    ),
+]
+
+
+def _staged(name):
+    # Within the 63 characters PostgreSQL keeps of a name
+    return f"{name[:61]}_p"
+
+
+def _create_partitioned_table(schema_editor):
+    """
+    Create the partitioned table with one partition per month from the
+    oldest transaction to three months ahead plus a default partition, and
+    a trigger that mirrors every write to the live table into it.
+    """
+    connection = schema_editor.connection
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT min("created_at") FROM "{TABLE}"')
+        oldest = cursor.fetchone()[0]
+        columns = [
+            column.name
+            for column in connection.introspection.get_table_description(cursor, TABLE)
+        ]
+
+    today = timezone.now().date()
+    month = (oldest.date() if oldest else today).replace(day=1)
+    last = today.replace(day=1)
+    for _ in range(3):
+        last = next_month(last)
+
+    schema_editor.execute(
+        f'CREATE TABLE "{PARTITIONED}" (LIKE "{TABLE}" INCLUDING DEFAULTS,'
+        ' PRIMARY KEY ("id", "created_at")) PARTITION BY RANGE ("created_at")'
+    )
+
+    while month <= last:
+        following = next_month(month)
+        schema_editor.execute(
+            f'CREATE TABLE "{TABLE}_y{month.year}m{month.month:02d}" PARTITION OF'
+            f" \"{PARTITIONED}\" FOR VALUES FROM ('{month.isoformat()} 00:00:00+00')"
+            f" TO ('{following.isoformat()} 00:00:00+00')"
+        )
+        month = following
+
+    schema_editor.execute(
+        f'CREATE TABLE "{TABLE}_default" PARTITION OF "{PARTITIONED}" DEFAULT'
+    )
+
+    for name, statement in INDEXES + CONSTRAINTS:
+        schema_editor.execute(statement.format(name=_staged(name), table=PARTITIONED))
+
+    updates = ", ".join(
+        f'"{column}" = EXCLUDED."{column}"'
+        for column in columns
+        if column not in ("id", "created_at")
+    )
+    schema_editor.execute(
+        f'CREATE FUNCTION "{MIRROR}"() RETURNS trigger LANGUAGE plpgsql AS $$\n'
+        "BEGIN\n"
+        "    IF TG_OP = 'DELETE' THEN\n"
+        f'        DELETE FROM "{PARTITIONED}"'
+        ' WHERE "id" = OLD."id" AND "created_at" = OLD."created_at";\n'
+        "        RETURN OLD;\n"
+        "    END IF;\n"
+        f'    INSERT INTO "{PARTITIONED}" SELECT NEW.*'
+        f' ON CONFLICT ("id", "created_at") DO UPDATE SET {updates};\n'
+        "    RETURN NEW;\n"
+        "END\n"
+        "$$"
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER "{MIRROR}" AFTER INSERT OR UPDATE OR DELETE ON "{TABLE}"'
+        f' FOR EACH ROW EXECUTE FUNCTION "{MIRROR}"()'
+    )
+
+
+def _backfill(schema_editor):
+    """
+    Copy the rows of the live table in batches of `BATCH_SIZE`, each in its
+    own transaction. Rows the trigger already mirrored are newer and kept.
+    """
+    last_id = None
+
+    while True:
+        with transaction.atomic(), schema_editor.connection.cursor() as cursor:
+            cursor.execute(
+                f'WITH batch AS (SELECT * FROM "{TABLE}"'
+                ' WHERE %s::uuid IS NULL OR "id" > %s::uuid ORDER BY "id" LIMIT %s),'
+                f' copied AS (INSERT INTO "{PARTITIONED}" SELECT * FROM batch'
+                " ON CONFLICT DO NOTHING)"
+                ' SELECT "id" FROM batch ORDER BY "id" DESC LIMIT 1',
+                [last_id, last_id, BATCH_SIZE],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            return
+
+        last_id = row[0]
+
+
+def _swap(schema_editor):
+    """Replace the live table with the partitioned one."""
+    schema_editor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+    schema_editor.execute(f'DROP TABLE "{TABLE}"')
+    schema_editor.execute(f'DROP FUNCTION "{MIRROR}"()')
+    schema_editor.execute(f'ALTER TABLE "{PARTITIONED}" RENAME TO "{TABLE}"')
+    schema_editor.execute(
+        f'ALTER TABLE "{TABLE}" RENAME CONSTRAINT "{PARTITIONED}_pkey"'
+        f' TO "{TABLE}_pkey"'
+    )
+
+    for name, _ in INDEXES:
+        schema_editor.execute(f'ALTER INDEX "{_staged(name)}" RENAME TO "{name}"')
+
+    for name, _ in CONSTRAINTS:
+        schema_editor.execute(
+            f'ALTER TABLE "{TABLE}" RENAME CONSTRAINT "{_staged(name)}" TO "{name}"'
+        )
+
+
+def partition_transactions(apps, schema_editor):
+    """
+    Rebuild the transaction table as a table range partitioned by month of
+    `created_at` without blocking writes for the length of the copy.
+
+    The partitioned table is built next to the live one, which keeps serving
+    reads and writes: a trigger mirrors its writes while the existing rows
+    are copied in batches. Only the final swap locks the table, for as long
+    as a DROP and a few renames take. The migration is not atomic; when it
+    fails half way, drop the partitioned table, its partitions and the
+    trigger function before running it again.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with transaction.atomic():
+        _create_partitioned_table(schema_editor)
+
+    _backfill(schema_editor)
+
+    with transaction.atomic():
+        _swap(schema_editor)
+
+
+def unpartition_transactions(apps, schema_editor):
+    """
+    Copy the transactions back into a plain table in one transaction, which
+    blocks writes to them until it commits: run it in a maintenance window.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with transaction.atomic():
+        schema_editor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{LEGACY}"')
+        schema_editor.execute(
+            f'ALTER TABLE "{LEGACY}" RENAME CONSTRAINT "{TABLE}_pkey"'
+            f' TO "{LEGACY}_pkey"'
+        )
+        schema_editor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{LEGACY}" INCLUDING DEFAULTS,'
+            ' PRIMARY KEY ("id"))'
+        )
+        schema_editor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{LEGACY}"')
+        schema_editor.execute(f'DROP TABLE "{LEGACY}" CASCADE')
+
+        for name, statement in INDEXES + CONSTRAINTS:
+            schema_editor.execute(statement.format(name=name, table=TABLE))
+
+
+class Migration(migrations.Migration):
+    # The backfill commits batch by batch
+    atomic = False
+
+    dependencies = [
+        ("wallets", "0006_alter_ledgerentry_transaction_and_more"),
+        ("platform_admin", "0004_alter_dispute_refund_transaction_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_transactions, unpartition_transactions),
+    ]
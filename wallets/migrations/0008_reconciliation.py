@@ -0,0 +1,90 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:42
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0007_partition_transaction"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReconciliationRun",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("running", "Running"), ("completed", "Completed")],
+                        default="running",
+                        max_length=10,
+                    ),
+                ),
+                ("checkpoint", models.UUIDField(blank=True, null=True)),
+                ("wallets_checked", models.PositiveBigIntegerField(default=0)),
+                ("discrepancies_found", models.PositiveBigIntegerField(default=0)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="BalanceDiscrepancy",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("balance", models.BigIntegerField()),
+                ("ledger_balance", models.BigIntegerField()),
+                ("transaction_balance", models.BigIntegerField()),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="discrepancies",
+                        to="wallets.wallet",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="discrepancies",
+                        to="wallets.reconciliationrun",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["run", "wallet"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("run", "wallet"), name="unique_balance_discrepancy"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0008_reconciliation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="wallet",
+            name="version",
+            field=models.PositiveBigIntegerField(
+                default=0, help_text="Bumped on every change to the wallet row"
+            ),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:53
+
+import uuid
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0009_wallet_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorizationHold",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "amount",
+                    models.BigIntegerField(
+                        validators=[
+                            django.core.validators.MinValueValidator(
+                                1, message="Amount must be at least 1."
+                            )
+                        ]
+                    ),
+                ),
+                ("captured_amount", models.BigIntegerField(default=0)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("authorized", "Authorized"),
+                            ("captured", "Captured"),
+                            ("voided", "Voided"),
+                            ("expired", "Expired"),
+                        ],
+                        default="authorized",
+                        max_length=10,
+                    ),
+                ),
+                ("expires_at", models.DateTimeField()),
+                ("remarks", models.TextField(blank=True, null=True)),
+                (
+                    "merchant_wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="merchant_holds",
+                        to="wallets.wallet",
+                    ),
+                ),
+                (
+                    "transaction",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="holds",
+                        to="wallets.transaction",
+                    ),
+                ),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="holds",
+                        to="wallets.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "authorized")),
+                        fields=["expires_at"],
+                        name="authorized_hold_expiry_idx",
+                    )
+                ],
+            },
+        ),
+    ]
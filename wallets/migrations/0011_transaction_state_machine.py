@@ -0,0 +1,72 @@
+# Generated by Django 5.1.1 on 2026-10-18 19:57
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def stamp_completed(apps, schema_editor):
+    Transaction = apps.get_model("wallets", "Transaction")
+
+    Transaction.objects.filter(status="completed").update(completed_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0010_authorizationhold"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transaction",
+            name="completed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="failed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="processing_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="reversed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="transaction",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                    ("reversed", "Reversed"),
+                ],
+                default="pending",
+                max_length=10,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["from_wallet", "created_at"],
+                name="transaction_pending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("status__in", ["pending", "processing"])),
+                fields=["status", "created_at"],
+                name="transaction_open_idx",
+            ),
+        ),
+        migrations.RunPython(stamp_completed, migrations.RunPython.noop),
+    ]
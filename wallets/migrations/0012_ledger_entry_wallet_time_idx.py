@@ -0,0 +1,19 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0011_transaction_state_machine"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="ledgerentry",
+            index=models.Index(
+                fields=["wallet", "created_at"], name="ledger_entry_wallet_time_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0012_ledger_entry_wallet_time_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WalletDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("stripe", models.PositiveSmallIntegerField(default=0)),
+                ("in_count", models.PositiveIntegerField(default=0)),
+                ("in_sum", models.BigIntegerField(default=0)),
+                ("out_count", models.PositiveIntegerField(default=0)),
+                ("out_sum", models.BigIntegerField(default=0)),
+                (
+                    "wallet",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="wallets.wallet",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "wallet daily stats",
+                "ordering": ["wallet", "-day", "stripe"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("wallet", "day", "stripe"),
+                        name="unique_wallet_daily_stats",
+                    )
+                ],
+            },
+        ),
+    ]
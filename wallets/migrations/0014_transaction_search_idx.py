@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-18 20:22
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0013_wallet_daily_stats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.search.SearchVector("remarks", config="simple"),
+                name="transaction_remarks_search_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["amount", "-created_at"], name="transaction_amount_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-18 21:05
+
+from django.db import migrations
+
+
+def type_business_wallets(apps, schema_editor):
+    Wallet = apps.get_model("wallets", "Wallet")
+
+    Wallet.objects.filter(business__isnull=False, wallet_type="user").update(
+        wallet_type="business"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("wallets", "0014_transaction_search_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(type_business_wallets, migrations.RunPython.noop),
+    ]
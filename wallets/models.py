@@ -1,7 +1,11 @@
 from uuid import uuid4
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from django.db import models, transaction
+from django.utils import timezone
 
 from accounts.models import Business, User
 from core.models import BaseModel
@@ -31,6 +35,14 @@ class Wallet(BaseModel):
         validators=[MinValueValidator(0, message="Frozen amount cannot be negative.")],
     )
     is_restricted = models.BooleanField(default=False)
+    ledger_sequence = models.PositiveBigIntegerField(default=0)
+    version = models.PositiveBigIntegerField(
+        default=0, help_text="Bumped on every change to the wallet row"
+    )
+    balance_stripes = models.PositiveSmallIntegerField(
+        default=0,
+        help_text="Number of sub-balances incoming credits are spread over, 0 to disable",
+    )
     wallet_type = models.CharField(
         max_length=255,
         choices=[
@@ -47,8 +59,67 @@ class Wallet(BaseModel):
     def __str__(self):
         return f"Wallet({self.id})"
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "version"}
+
+        return super().save(*args, **kwargs)
+
+    @property
+    def total_balance(self):
+        """Balance including credits not yet folded in from the stripes."""
+        if not self.balance_stripes:
+            return self.balance
+
+        striped = getattr(self, "striped_balance", None)
+
+        if striped is None:
+            striped = self.stripes.aggregate(total=models.Sum("balance"))["total"]
+
+        return self.balance + (striped or 0)
+
+    @property
+    def available_balance(self):
+        """What can be spent: the total balance less the frozen amount."""
+        return self.total_balance - self.frozen_amount
+
+    def balance_at(self, at):
+        """Balance of the wallet from its ledger entries written before `at`."""
+        from .ledger import balance_at
+
+        return balance_at(self, at)
+
+
+class WalletStripe(BaseModel):
+    """One of the sub-balances that credits to a hot wallet land in."""
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="stripes")
+    index = models.PositiveSmallIntegerField()
+    balance = models.BigIntegerField(default=0)
+    ledger_sequence = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["wallet", "index"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "index"], name="unique_wallet_stripe"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.balance} (Wallet: {self.wallet_id}, Stripe: {self.index})"
+
 
 class Transaction(BaseModel):
+    """
+    On PostgreSQL the table is range partitioned by `created_at` month (see
+    `wallets.partitions`). The partition key is part of the primary key, so
+    foreign keys pointing here are declared with `db_constraint=False`.
+    """
+
     from_wallet = models.ForeignKey(
         Wallet, on_delete=models.CASCADE, related_name="transactions"
     )
@@ -64,11 +135,355 @@ class Transaction(BaseModel):
         max_length=10,
         choices=[
             ("pending", "Pending"),
+            ("processing", "Processing"),
             ("completed", "Completed"),
             ("failed", "Failed"),
+            ("reversed", "Reversed"),
         ],
         default="pending",
     )
+    processing_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+    reversed_at = models.DateTimeField(null=True, blank=True)
+
+    # Statuses a transaction may move to from each status
+    TRANSITIONS = {
+        "pending": {"processing", "failed"},
+        "processing": {"completed", "failed"},
+        "completed": {"reversed"},
+        "failed": set(),
+        "reversed": set(),
+    }
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(
+                fields=["from_wallet", "created_at"],
+                condition=models.Q(status="pending"),
+                name="transaction_pending_idx",
+            ),
+            models.Index(
+                fields=["status", "created_at"],
+                condition=models.Q(status__in=["pending", "processing"]),
+                name="transaction_open_idx",
+            ),
+            GinIndex(
+                SearchVector("remarks", config="simple"),
+                name="transaction_remarks_search_idx",
+            ),
+            models.Index(
+                fields=["amount", "-created_at"], name="transaction_amount_idx"
+            ),
+        ]
+
+    def transition_to(self, status):
+        """
+        Move the transaction to `status`, stamping the matching `<status>_at`
+        field, and save it. Raises ValueError for a transition the state
+        machine does not allow.
+        """
+        if status not in self.TRANSITIONS[self.status]:
+            raise ValueError(f"cannot move a {self.status} transaction to {status}")
+
+        self.status = status
+        setattr(self, f"{status}_at", timezone.now())
+        self.save(update_fields=["status", f"{status}_at", "updated_at"])
 
     def __str__(self):
         return f"{self.amount} (Status: {self.status})"
+
+
+class WalletFeedEntry(models.Model):
+    """
+    Denormalized per-wallet view of transactions, one row per wallet taking
+    part, so that a wallet's history is a single index range scan.
+    """
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name="feed")
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        db_constraint=False,
+    )
+    direction = models.CharField(max_length=3, choices=[("in", "In"), ("out", "Out")])
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [
+            models.Index(
+                fields=["wallet", "-created_at", "-id"], name="wallet_feed_idx"
+            )
+        ]
+
+    @classmethod
+    def for_transaction(cls, tr):
+        entries = [
+            cls(
+                wallet_id=tr.from_wallet_id,
+                transaction=tr,
+                direction="out",
+                created_at=tr.created_at,
+            )
+        ]
+
+        if tr.to_wallet_id:
+            entries.append(
+                cls(
+                    wallet_id=tr.to_wallet_id,
+                    transaction=tr,
+                    direction="in",
+                    created_at=tr.created_at,
+                )
+            )
+
+        return entries
+
+    def __str__(self):
+        return f"{self.direction} {self.transaction_id} (Wallet: {self.wallet_id})"
+
+
+class WalletDailyStats(models.Model):
+    """
+    Money in and out of a wallet per day, kept current in the same DB
+    transaction as every transfer. Credits to a striped wallet are counted
+    on the row of the stripe they land in, so a day's figures are the sum
+    over the wallet's rows for that day.
+    """
+
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    day = models.DateField()
+    stripe = models.PositiveSmallIntegerField(default=0)
+    in_count = models.PositiveIntegerField(default=0)
+    in_sum = models.BigIntegerField(default=0)
+    out_count = models.PositiveIntegerField(default=0)
+    out_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["wallet", "-day", "stripe"]
+        verbose_name_plural = "wallet daily stats"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "day", "stripe"], name="unique_wallet_daily_stats"
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"+{self.in_sum} -{self.out_sum} on {self.day} (Wallet: {self.wallet_id})"
+        )
+
+
+class LedgerEntry(BaseModel):
+    """
+    Append-only record of a single balance change.
+
+    Every money movement writes one entry per side, so the entries of a
+    transaction always sum to zero. The side leaving the platform (e.g. bill
+    payments) is recorded with no wallet. Credits to a striped wallet are
+    recorded against the stripe and numbered by the stripe's own sequence.
+    """
+
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="ledger_entries",
+    )
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="ledger_entries",
+        db_constraint=False,
+    )
+    stripe = models.PositiveSmallIntegerField(null=True, blank=True)
+    amount = models.BigIntegerField()
+    sequence = models.PositiveBigIntegerField()
+
+    class Meta:
+        ordering = ["wallet", "sequence"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "sequence"],
+                condition=models.Q(wallet__isnull=False, stripe__isnull=True),
+                name="unique_ledger_entry_sequence",
+            ),
+            models.UniqueConstraint(
+                fields=["wallet", "stripe", "sequence"],
+                condition=models.Q(stripe__isnull=False),
+                name="unique_ledger_entry_stripe_sequence",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["wallet", "created_at"], name="ledger_entry_wallet_time_idx"
+            )
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Ledger entries cannot be modified.")
+
+        return super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Ledger entries cannot be deleted.")
+
+    def __str__(self):
+        return f"{self.amount} (Wallet: {self.wallet_id}, Seq: {self.sequence})"
+
+
+class WalletSnapshot(BaseModel):
+    """Balance of a wallet after its ledger entry number `sequence`."""
+
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.CASCADE, related_name="snapshots"
+    )
+    sequence = models.PositiveBigIntegerField()
+    balance = models.BigIntegerField()
+
+    class Meta:
+        ordering = ["wallet", "-sequence"]
+        get_latest_by = "sequence"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["wallet", "sequence"], name="unique_wallet_snapshot"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.balance} (Wallet: {self.wallet_id}, Seq: {self.sequence})"
+
+
+class IdempotencyKey(BaseModel):
+    """First response of a money-moving request, replayed for retries."""
+
+    key = models.CharField(max_length=255)
+    owner = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["owner", "key"], name="unique_idempotency_key"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.key} ({self.owner})"
+
+
+class AuthorizationHold(BaseModel):
+    """
+    Funds reserved on `wallet` for `merchant_wallet` by raising the wallet's
+    `frozen_amount`. The merchant later captures part or all of the hold, or
+    voids it; holds left authorized past `expires_at` are released by
+    `wallets.holds.release_expired_holds`.
+    """
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.PROTECT, related_name="holds")
+    merchant_wallet = models.ForeignKey(
+        Wallet, on_delete=models.PROTECT, related_name="merchant_holds"
+    )
+    amount = models.BigIntegerField(
+        validators=[MinValueValidator(1, message="Amount must be at least 1.")]
+    )
+    captured_amount = models.BigIntegerField(default=0)
+    status = models.CharField(
+        max_length=10,
+        choices=[
+            ("authorized", "Authorized"),
+            ("captured", "Captured"),
+            ("voided", "Voided"),
+            ("expired", "Expired"),
+        ],
+        default="authorized",
+    )
+    expires_at = models.DateTimeField()
+    remarks = models.TextField(null=True, blank=True)
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="holds",
+        db_constraint=False,
+    )
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["expires_at"],
+                condition=models.Q(status="authorized"),
+                name="authorized_hold_expiry_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.amount} (Wallet: {self.wallet_id}, Status: {self.status})"
+
+
+class ReconciliationRun(BaseModel):
+    """
+    One pass of `wallets.reconciliation.reconcile` over all wallets, walked in
+    id order. `checkpoint` is the last wallet checked so an interrupted run
+    can pick up where it stopped.
+    """
+
+    status = models.CharField(
+        max_length=10,
+        choices=[("running", "Running"), ("completed", "Completed")],
+        default="running",
+    )
+    checkpoint = models.UUIDField(null=True, blank=True)
+    wallets_checked = models.PositiveBigIntegerField(default=0)
+    discrepancies_found = models.PositiveBigIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Reconciliation {self.created_at:%Y-%m-%d %H:%M} ({self.status})"
+
+
+class BalanceDiscrepancy(BaseModel):
+    """
+    A wallet whose stored balance does not match its money movements.
+
+    `balance` is the stored balance including stripes, `ledger_balance` the
+    sum of the wallet's ledger entries and `transaction_balance` its opening
+    entries plus completed incoming minus completed outgoing transactions.
+    """
+
+    run = models.ForeignKey(
+        ReconciliationRun, on_delete=models.CASCADE, related_name="discrepancies"
+    )
+    wallet = models.ForeignKey(
+        Wallet, on_delete=models.CASCADE, related_name="discrepancies"
+    )
+    balance = models.BigIntegerField()
+    ledger_balance = models.BigIntegerField()
+    transaction_balance = models.BigIntegerField()
+
+    class Meta:
+        ordering = ["run", "wallet"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["run", "wallet"], name="unique_balance_discrepancy"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.balance} != {self.ledger_balance} (Wallet: {self.wallet_id})"
@@ -0,0 +1,90 @@
+from datetime import date
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Transaction
+
+
+def next_month(month):
+    """First day of the month after `month`."""
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [Transaction._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def _create_partition(cursor, table, name, start, end):
+    """
+    Create the partition `name` of `table` for `[start, end)`. Rows of the
+    range already in the default partition, which would make the CREATE
+    fail, are moved into it while the default partition is detached.
+    """
+    quote = connection.ops.quote_name
+    default = quote(f"{table}_default")
+    bounds = [f"{start.isoformat()} 00:00:00+00", f"{end.isoformat()} 00:00:00+00"]
+
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {default}"
+        " WHERE created_at >= %s AND created_at < %s)",
+        bounds,
+    )
+    stranded = cursor.fetchone()[0]
+
+    if stranded:
+        cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {default}")
+
+    cursor.execute(
+        f"CREATE TABLE {quote(name)} PARTITION OF {quote(table)}"
+        " FOR VALUES FROM (%s) TO (%s)",
+        bounds,
+    )
+
+    if stranded:
+        cursor.execute(
+            f"WITH moved AS (DELETE FROM {default}"
+            " WHERE created_at >= %s AND created_at < %s RETURNING *)"
+            f" INSERT INTO {quote(table)} SELECT * FROM moved",
+            bounds,
+        )
+        cursor.execute(f"ALTER TABLE {quote(table)} ATTACH PARTITION {default} DEFAULT")
+
+
+def ensure_transaction_partitions(months_ahead=3):
+    """
+    Create the monthly transaction partitions from the current month up to
+    `months_ahead` months ahead, so that new rows never land in the default
+    partition. Rows that did land there are moved into the new partition.
+    Returns the names of the partitions created.
+    """
+    if not is_partitioned():
+        return []
+
+    table = Transaction._meta.db_table
+    month = timezone.now().date().replace(day=1)
+    created = []
+
+    for _ in range(months_ahead + 1):
+        following = next_month(month)
+        name = f"{table}_y{month.year}m{month.month:02d}"
+
+        # Each in its own transaction, which holds the table locked
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [name])
+
+            if cursor.fetchone()[0] is None:
+                _create_partition(cursor, table, name, month, following)
+                created.append(name)
+
+        month = following
+
+    return created
@@ -1 +1,13 @@
+def controls_wallet(user, wallet):
+    """
+    Whether `user` may move money out of `wallet`: their own wallet, the
+    wallet of a business they own or, for an enterprise authenticated with
+    an API key, the enterprise's wallet.
+    """
+    if getattr(user, "is_enterprise", False):
+        return wallet.enterprise_id == user.pk
 
+    if wallet.user_id is not None:
+        return wallet.user_id == user.pk
+
+    return wallet.business is not None and wallet.business.owner_id == user.pk
@@ -0,0 +1,132 @@
+import logging
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    BalanceDiscrepancy,
+    LedgerEntry,
+    ReconciliationRun,
+    Transaction,
+    Wallet,
+    WalletStripe,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _total(queryset, group_by, field="amount"):
+    return Coalesce(
+        Subquery(
+            queryset.order_by()
+            .values(group_by)
+            .annotate(total=Sum(field))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def with_expected_balances(queryset):
+    """
+    Annotate wallets with `stored_balance` (balance plus stripes) and the two
+    balances it should equal: `ledger_total`, the sum of all the wallet's
+    ledger entries, and `transaction_total`, its opening entries plus
+    completed (or since reversed) incoming minus outgoing transactions.
+
+    Transactions from before the ledger existed are already part of the
+    opening entries, so only transactions with ledger entries are counted.
+    """
+    entries = LedgerEntry.objects.filter(wallet=OuterRef("pk"))
+    # Reversed transactions moved money too; the reversal is its own transfer
+    completed = Transaction.objects.filter(
+        Exists(LedgerEntry.objects.filter(transaction=OuterRef("pk"))),
+        status__in=["completed", "reversed"],
+    )
+    stripes = WalletStripe.objects.filter(wallet=OuterRef("pk"))
+
+    return queryset.annotate(
+        stored_balance=F("balance") + _total(stripes, "wallet", field="balance"),
+        ledger_total=_total(entries, "wallet"),
+        opening_total=_total(entries.filter(transaction__isnull=True), "wallet"),
+        received=_total(completed.filter(to_wallet=OuterRef("pk")), "to_wallet"),
+        sent=_total(completed.filter(from_wallet=OuterRef("pk")), "from_wallet"),
+    ).annotate(
+        transaction_total=F("opening_total") + F("received") - F("sent"),
+    )
+
+
+def reconcile(chunk_size=1000, restart=False):
+    """
+    Check every wallet's stored balance against its ledger and transactions,
+    `chunk_size` wallets at a time, recording mismatches as
+    `BalanceDiscrepancy` rows.
+
+    The comparison runs in the database, one statement per chunk, so only the
+    mismatched rows of a chunk are ever held in memory. Progress is saved
+    after each chunk and an unfinished run is resumed from its checkpoint
+    unless `restart` is set. Returns the run.
+    """
+    run = (
+        None if restart else ReconciliationRun.objects.filter(status="running").first()
+    )
+
+    if run is None:
+        run = ReconciliationRun.objects.create()
+
+    wallets = Wallet.objects.order_by("id")
+
+    while True:
+        remaining = wallets.filter(id__gt=run.checkpoint) if run.checkpoint else wallets
+        boundary = list(
+            remaining.values_list("id", flat=True)[chunk_size - 1 : chunk_size]
+        )
+        chunk = remaining.filter(id__lte=boundary[0]) if boundary else remaining
+
+        mismatched = (
+            with_expected_balances(chunk)
+            .exclude(
+                stored_balance=F("ledger_total"),
+                ledger_total=F("transaction_total"),
+            )
+            .values_list("id", "stored_balance", "ledger_total", "transaction_total")
+        )
+
+        discrepancies = [
+            BalanceDiscrepancy(
+                run=run,
+                wallet_id=wallet_id,
+                balance=balance,
+                ledger_balance=ledger_total,
+                transaction_balance=transaction_total,
+            )
+            for wallet_id, balance, ledger_total, transaction_total in (
+                mismatched.iterator(chunk_size=chunk_size)
+            )
+        ]
+
+        if discrepancies:
+            logger.warning(
+                f"Reconciliation {run.id} found {len(discrepancies)} wallets"
+                " with mismatched balances"
+            )
+
+        with transaction.atomic():
+            BalanceDiscrepancy.objects.bulk_create(discrepancies)
+
+            run.discrepancies_found += len(discrepancies)
+
+            if boundary:
+                run.wallets_checked += chunk_size
+                run.checkpoint = boundary[0]
+            else:
+                run.wallets_checked += chunk.count()
+                run.status = "completed"
+                run.finished_at = timezone.now()
+
+            run.save()
+
+        if not boundary:
+            return run
@@ -1,49 +1,107 @@
+import csv
+import io
+import itertools
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer, Serializer
 from rest_framework.validators import ValidationError
 
 from accounts.serializers import BusinessSerializer, UserGeneralInfoSerializer
+from enterprises.models import UserGrant
 from enterprises.serializers import EnterpriseSerializer
+from wallets.disbursements import disburse
+from wallets.holds import authorize
 from wallets.models import *
+from wallets.permissions import controls_wallet
+from wallets.statements import FORMATS as statement_formats
+from wallets.transfer_queue import enqueue_transfer
+from wallets.transfers import TransferError, transfer
 
 
 class WalletSerializers(ModelSerializer):
+    total_balance = serializers.IntegerField(read_only=True)
+
     class Meta:
-        exclude = []
+        fields = [
+            "id",
+            "user",
+            "business",
+            "enterprise",
+            "wallet_type",
+            "balance",
+            "frozen_amount",
+            "total_balance",
+            "is_restricted",
+            "created_at",
+            "updated_at",
+        ]
         model = Wallet
 
 
 class WalletPublicSerializer(ModelSerializer):
     class Meta:
         depth = 1
-        exclude = ["balance", "frozen_amount"]
+        fields = [
+            "id",
+            "user",
+            "business",
+            "enterprise",
+            "wallet_type",
+            "is_restricted",
+            "created_at",
+            "updated_at",
+        ]
         model = Wallet
 
 
 class TransactionSerializer(ModelSerializer):
+    # Relations the views select_related so that a page renders in one query
+    related_fields = [
+        "to_wallet__user",
+        "to_wallet__business",
+        "to_wallet__enterprise",
+    ]
+
     to_user = serializers.SerializerMethodField()
     to_business = serializers.SerializerMethodField()
     to_enterprise = serializers.SerializerMethodField()
+    direction = serializers.SerializerMethodField()
 
-    def get_to_user(self, instance):
+    def _render(self, serializer_class, instance):
+        """Serialize a counterparty once per response and reuse it across rows."""
+        if instance is None:
+            return None
 
-        if instance.to_wallet and instance.to_wallet.user:
-            return UserGeneralInfoSerializer(instance.to_wallet.user).data
+        rendered = self.context.setdefault("rendered_counterparties", {})
+        key = (serializer_class, instance.pk)
 
-        return None
+        if key not in rendered:
+            rendered[key] = serializer_class(instance).data
+
+        return rendered[key]
+
+    def get_direction(self, instance):
+        return getattr(instance, "direction", None)
+
+    def get_to_user(self, instance):
+        return self._render(
+            UserGeneralInfoSerializer,
+            instance.to_wallet.user if instance.to_wallet else None,
+        )
 
     def get_to_business(self, instance):
-        return (
-            BusinessSerializer(instance.to_wallet.business).data
-            if instance.to_wallet and instance.to_wallet.business
-            else None
+        return self._render(
+            BusinessSerializer,
+            instance.to_wallet.business if instance.to_wallet else None,
         )
 
     def get_to_enterprise(self, instance):
-        return (
-            EnterpriseSerializer(instance.to_wallet.enterprise).data
-            if instance.to_wallet and instance.to_wallet.enterprise
-            else None
+        return self._render(
+            EnterpriseSerializer,
+            instance.to_wallet.enterprise if instance.to_wallet else None,
         )
 
     class Meta:
@@ -52,10 +110,18 @@ class TransactionSerializer(ModelSerializer):
 
 
 class SendMoneyP2PSerializer(Serializer):
+    id = serializers.UUIDField(read_only=True)
     from_wallet = serializers.PrimaryKeyRelatedField(queryset=Wallet.objects.filter())
     to_wallet = serializers.PrimaryKeyRelatedField(queryset=Wallet.objects.filter())
     amount = serializers.IntegerField(min_value=10)
     remarks = serializers.CharField()
+    mode = serializers.ChoiceField(
+        choices=["sync", "async"],
+        default="sync",
+        write_only=True,
+        help_text="`async` queues the transfer and answers with it still pending",
+    )
+    status = serializers.CharField(read_only=True)
 
     def validate(self, attrs):
         attrs = super().validate(attrs)
@@ -64,12 +130,248 @@ class SendMoneyP2PSerializer(Serializer):
 
         wallet = attrs.get("from_wallet")
 
-        if wallet.balance < amount:
+        # Cheap early rejection; the authoritative check runs under row lock.
+        if wallet.available_balance < amount:
             raise ValidationError({"amount": ["not enough amount in the wallet"]}, 400)
 
         return attrs
 
     def create(self, validated_data):
-        tr = Transaction.objects.create(**validated_data)
+        if validated_data.pop("mode") == "async":
+            return enqueue_transfer(**validated_data)
+
+        try:
+            tr = transfer(**validated_data)
+        except TransferError as e:
+            raise ValidationError({"amount": [str(e)]}, 400)
 
         return tr
+
+
+class DisbursementSerializer(Serializer):
+    from_wallet = serializers.PrimaryKeyRelatedField(
+        queryset=Wallet.objects.filter(is_restricted=False).select_related("business"),
+        write_only=True,
+    )
+    remarks = serializers.CharField(required=False, write_only=True)
+    recipients = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        write_only=True,
+        help_text='[{"recipient": "<wallet id or phone number>", "amount": 100}]',
+    )
+    file = serializers.FileField(
+        required=False,
+        write_only=True,
+        help_text="CSV file with `recipient` and `amount` columns",
+    )
+    total = serializers.IntegerField(read_only=True)
+    completed = serializers.IntegerField(read_only=True)
+    failed = serializers.IntegerField(read_only=True)
+    results = serializers.ListField(child=serializers.DictField(), read_only=True)
+
+    def validate_from_wallet(self, wallet):
+        if not controls_wallet(self.context["request"].user, wallet):
+            raise ValidationError("you can only disburse from your wallets")
+
+        if wallet.wallet_type not in ("business", "enterprise"):
+            raise ValidationError("only business and enterprise wallets can disburse")
+
+        return wallet
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+
+        recipients = attrs.pop("recipients", None)
+        file = attrs.pop("file", None)
+
+        if (recipients is None) == (file is None):
+            raise ValidationError(
+                {"recipients": ["provide either a recipients list or a file"]}
+            )
+
+        limit = settings.DISBURSEMENT_MAX_ROWS
+
+        if file is not None:
+            try:
+                # One row past the limit is enough to reject the file
+                recipients = list(
+                    itertools.islice(
+                        csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig")),
+                        limit + 1,
+                    )
+                )
+            except (UnicodeDecodeError, csv.Error):
+                raise ValidationError({"file": ["file is not a valid CSV"]})
+
+            if len(recipients) > limit:
+                raise ValidationError({"file": [f"file has more than {limit} rows"]})
+
+        if not recipients:
+            raise ValidationError({"recipients": ["no recipients given"]})
+
+        if len(recipients) > limit:
+            raise ValidationError(
+                {"recipients": [f"at most {limit} recipients are allowed"]}
+            )
+
+        attrs["rows"] = recipients
+
+        return attrs
+
+    def create(self, validated_data):
+        try:
+            results = disburse(
+                validated_data["from_wallet"],
+                validated_data["rows"],
+                remarks=validated_data.get("remarks"),
+            )
+        except TransferError as e:
+            raise ValidationError({"amount": [str(e)]}, 400)
+
+        completed = [result for result in results if result["status"] == "completed"]
+
+        return {
+            "total": len(results),
+            "completed": len(completed),
+            "failed": len(results) - len(completed),
+            "results": results,
+        }
+
+
+class BalanceAtSerializer(Serializer):
+    wallet = serializers.PrimaryKeyRelatedField(
+        queryset=Wallet.objects.select_related("business")
+    )
+    at = serializers.DateTimeField(required=False)
+    balance = serializers.IntegerField(read_only=True)
+
+    def validate_wallet(self, wallet):
+        user = self.context["request"].user
+
+        if not user.is_staff and not controls_wallet(user, wallet):
+            raise ValidationError("you can only view balances of your wallets")
+
+        return wallet
+
+
+class StatementQuerySerializer(Serializer):
+    wallet = serializers.PrimaryKeyRelatedField(
+        queryset=Wallet.objects.select_related("business")
+    )
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    file_format = serializers.ChoiceField(
+        choices=list(statement_formats), default="csv"
+    )
+
+    def validate_wallet(self, wallet):
+        if not controls_wallet(self.context["request"].user, wallet):
+            raise ValidationError("you can only export statements of your wallets")
+
+        return wallet
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+
+        if attrs.get("start") and attrs.get("end") and attrs["start"] >= attrs["end"]:
+            raise ValidationError({"end": ["must be after start"]})
+
+        return attrs
+
+
+class AuthorizationHoldSerializer(ModelSerializer):
+    def validate_wallet(self, wallet):
+        user = self.context["request"].user
+
+        if wallet.is_restricted:
+            raise ValidationError("wallet is restricted")
+
+        if not controls_wallet(user, wallet) and self._grant(user, wallet) is None:
+            raise ValidationError("you are not allowed to hold funds of this wallet")
+
+        return wallet
+
+    def validate_merchant_wallet(self, wallet):
+        if wallet.is_restricted:
+            raise ValidationError("wallet is restricted")
+
+        return wallet
+
+    def validate_expires_at(self, expires_at):
+        if (
+            not timezone.now()
+            < expires_at
+            <= timezone.now() + settings.AUTHORIZATION_HOLD_TTL
+        ):
+            raise ValidationError(
+                f"must be in the future and within {settings.AUTHORIZATION_HOLD_TTL}"
+            )
+
+        return expires_at
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+
+        user = self.context["request"].user
+        grant = None
+
+        if not controls_wallet(user, attrs["wallet"]):
+            grant = self._grant(user, attrs["wallet"])
+
+        if grant and attrs["amount"] > grant.max_amount:
+            raise ValidationError(
+                {"amount": ["exceeds the amount granted by the user"]}
+            )
+
+        if attrs["wallet"].available_balance < attrs["amount"]:
+            raise ValidationError({"amount": ["not enough amount in the wallet"]})
+
+        attrs["grant"] = grant
+
+        return attrs
+
+    def _grant(self, user, wallet):
+        """The active grant of the wallet's owner to an enterprise caller."""
+        if not getattr(user, "is_enterprise", False) or wallet.user_id is None:
+            return None
+
+        return (
+            UserGrant.objects.filter(
+                enterprise=user,
+                user_id=wallet.user_id,
+                grant_status="approved",
+                is_active=True,
+            )
+            .filter(Q(expires_at=None) | Q(expires_at__gt=timezone.now()))
+            .first()
+        )
+
+    def create(self, validated_data):
+        try:
+            return authorize(**validated_data)
+        except TransferError as e:
+            raise ValidationError({"amount": [str(e)]}, 400)
+
+    class Meta:
+        model = AuthorizationHold
+        fields = [
+            "id",
+            "wallet",
+            "merchant_wallet",
+            "amount",
+            "captured_amount",
+            "status",
+            "expires_at",
+            "remarks",
+            "transaction",
+            "created_at",
+        ]
+        read_only_fields = ["captured_amount", "status", "transaction", "created_at"]
+        extra_kwargs = {"expires_at": {"required": False}}
+
+
+class AuthorizationHoldCaptureSerializer(Serializer):
+    amount = serializers.IntegerField(
+        min_value=1, required=False, help_text="Defaults to the whole hold"
+    )
@@ -0,0 +1,211 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.delivery import deliver
+from notifications.models import Notification
+
+from . import daily_stats, velocity
+from .dispatch import balance_changed, transactions_completed
+from .models import LedgerEntry, Transaction, Wallet, WalletFeedEntry
+from .stripes import fold_stripes
+from .transfers import (
+    InsufficientFunds,
+    VelocityLimitExceeded,
+    apply_balance_deltas,
+    lock_wallets,
+)
+
+
+def _notifications(tr, payer, payee):
+    notifications = []
+
+    if payer.user_id:
+        notifications.append(
+            Notification(
+                title="Transaction Completed",
+                content=f"Transfer of amount {tr.amount} ETB has been completed",
+                user_id=payer.user_id,
+            )
+        )
+
+    if payee and payee.user_id:
+        notifications.append(
+            Notification(
+                title="Payment Received",
+                content=f"You have received {tr.amount} ETB",
+                user_id=payee.user_id,
+                delivery_method="push",
+            )
+        )
+
+    return notifications
+
+
+def settle(transfers, all_or_nothing=False, check_limits=True):
+    """
+    Apply many transfers in one DB transaction, netted per wallet.
+
+    `transfers` is a list of `(from_wallet_id, to_wallet_id, amount, remarks)`
+    where `to_wallet_id` may be None for payments leaving the platform. They
+    are checked in order against each payer's running available balance, so
+    credits earlier in the batch can fund later debits. A transfer that would
+    overdraw its payer, or take it over its spending limits, is reported as
+    failed and skipped, or with `all_or_nothing` rejects the whole batch.
+
+    The net change of every wallet is applied with batched
+    UPDATE ... FROM (VALUES ...) statements, one row per distinct wallet,
+    and transactions, ledger entries, feed entries and notifications are
+    bulk inserted. Returns one result dict per transfer, in order.
+    """
+    results = [None] * len(transfers)
+    allowances = {}
+
+    if check_limits:
+        # Read before locking; Redis is not waited on while the locks are held
+        payers = Wallet.objects.filter(
+            id__in={from_id for from_id, *_ in transfers}
+        ).only("id", "business_id", "wallet_type")
+        allowances = {payer.id: velocity.wallet_allowance(payer) for payer in payers}
+
+    with transaction.atomic():
+        locked = lock_wallets(
+            *(
+                wallet_id
+                for from_id, to_id, *_ in transfers
+                for wallet_id in (from_id, to_id)
+            )
+        )
+        available = {
+            wallet.id: wallet.balance - wallet.frozen_amount
+            for wallet in locked.values()
+        }
+        folded = set()
+        spent = defaultdict(int)
+        accepted = []
+
+        for index, (from_id, to_id, amount, remarks) in enumerate(transfers):
+            payer = locked.get(from_id)
+
+            if payer is None or (to_id is not None and to_id not in locked):
+                results[index] = {"status": "failed", "error": "wallet not found"}
+                continue
+
+            if amount <= 0:
+                results[index] = {"status": "failed", "error": "invalid amount"}
+                continue
+
+            if from_id == to_id:
+                results[index] = {
+                    "status": "failed",
+                    "error": "cannot transfer to the same wallet",
+                }
+                continue
+
+            if (
+                available[from_id] < amount
+                and payer.balance_stripes
+                and from_id not in folded
+            ):
+                folded.add(from_id)
+                available[from_id] += fold_stripes(payer)
+
+            if available[from_id] < amount:
+                if all_or_nothing:
+                    raise InsufficientFunds("not enough amount in the wallet")
+
+                results[index] = {
+                    "status": "failed",
+                    "error": "not enough amount in the wallet",
+                }
+                continue
+
+            if allowances.get(from_id) is not None and allowances[from_id] < amount:
+                if all_or_nothing:
+                    raise VelocityLimitExceeded("wallet has reached its spending limit")
+
+                results[index] = {
+                    "status": "failed",
+                    "error": "wallet has reached its spending limit",
+                }
+                continue
+
+            if allowances.get(from_id) is not None:
+                allowances[from_id] -= amount
+
+            available[from_id] -= amount
+            spent[from_id] += amount
+            if to_id is not None:
+                available[to_id] += amount
+
+            accepted.append((index, from_id, to_id, amount, remarks))
+
+        if not accepted:
+            return results
+
+        now = timezone.now()
+        sequences = {wallet.id: wallet.ledger_sequence for wallet in locked.values()}
+        deltas = defaultdict(lambda: [0, 0])
+        transactions = []
+        entries = []
+        notifications = []
+
+        for index, from_id, to_id, amount, remarks in accepted:
+            tr = Transaction(
+                from_wallet_id=from_id,
+                to_wallet_id=to_id,
+                amount=amount,
+                remarks=remarks,
+                status="completed",
+                completed_at=now,
+            )
+            transactions.append(tr)
+
+            for side, signed in ((from_id, -amount), (to_id, amount)):
+                if side is None:
+                    entries.append(
+                        LedgerEntry(transaction=tr, amount=signed, sequence=0)
+                    )
+                    continue
+
+                deltas[side][0] += signed
+                deltas[side][1] += 1
+                sequences[side] += 1
+                entries.append(
+                    LedgerEntry(
+                        wallet_id=side,
+                        transaction=tr,
+                        amount=signed,
+                        sequence=sequences[side],
+                    )
+                )
+
+            notifications += _notifications(tr, locked[from_id], locked.get(to_id))
+            results[index] = {"status": "completed", "transaction": tr.id}
+
+        apply_balance_deltas(deltas)
+        Transaction.objects.bulk_create(transactions, batch_size=1000)
+        LedgerEntry.objects.bulk_create(entries, batch_size=1000)
+        WalletFeedEntry.objects.bulk_create(
+            [
+                entry
+                for tr in transactions
+                for entry in WalletFeedEntry.for_transaction(tr)
+            ],
+            batch_size=1000,
+        )
+        Notification.objects.bulk_create(notifications, batch_size=1000)
+        deliver(notifications)
+        daily_stats.record(
+            now, [(entry.wallet_id, None, entry.amount) for entry in entries]
+        )
+
+        if check_limits:
+            for wallet_id, amount in spent.items():
+                velocity.record_debit(locked[wallet_id], amount)
+
+        balance_changed.send(sender=Wallet, wallet_ids=list(deltas))
+        transactions_completed.send(sender=Transaction, transactions=transactions)
+
+    return results
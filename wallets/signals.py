@@ -1,44 +1,56 @@
-import logging
-
-from django.core.mail import send_mail
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from notifications.models import Notification
 
-from .models import Transaction
+from .dispatch import balance_changed
+from .models import Transaction, Wallet
+
 
-logger = logging.getLogger(__name__)
+@receiver(post_save, sender=Wallet)
+def announce_saved_wallet(sender, instance, **kwargs):
+    balance_changed.send(sender=Wallet, wallet_ids=[instance.pk])
 
 
 @receiver(post_save, sender=Transaction)
-def update_wallet_balance(sender, instance, created, **kwargs):
-
-    if created:
-        try:
-            if instance.status == "pending":
-                from_wallet = instance.from_wallet
-                to_wallet = instance.to_wallet
-                from_wallet.balance += instance.amount
-                to_wallet.balance -= instance.amount
-                from_wallet.save()
-                to_wallet.save()
-                instance.status = "completed"
-                instance.save()
-
-            recipient_email = None
+def notify_transaction_parties(sender, instance, created, update_fields, **kwargs):
+    """
+    Balances are moved by `wallets.transfers.transfer`; this only tells the
+    parties about a transaction that was just completed or failed.
+    """
 
+    if not created and "status" not in (update_fields or ()):
+        return
+
+    if instance.status not in ("completed", "failed"):
+        return
+
+    from_user = instance.from_wallet.user
+
+    if instance.status == "failed":
+        if from_user:
             Notification.objects.create(
-                title="Transaction Completed",
-                content=f"Transfer of amount {instance.amount} ETB has been completed",
-                user=instance.from_wallet.user,
-            )
-            Notification.objects.create(
-                title="Payment Received",
-                content=f"You have received {instance.amount} ETB from {instance.from_wallet.user.phone_number}",
-                user=instance.to_wallet.user,
-                delivery_method="push",
+                title="Transaction Failed",
+                content=f"Transfer of amount {instance.amount} ETB could not be completed",
+                user=from_user,
             )
 
-        except Exception as e:
-            logger.error(f"Failed to process transaction {instance.id}: {str(e)}")
+        return
+
+    to_user = instance.to_wallet.user if instance.to_wallet else None
+
+    if from_user:
+        Notification.objects.create(
+            title="Transaction Completed",
+            content=f"Transfer of amount {instance.amount} ETB has been completed",
+            user=from_user,
+        )
+
+    if to_user:
+        sender_name = from_user.phone_number if from_user else "a business"
+        Notification.objects.create(
+            title="Payment Received",
+            content=f"You have received {instance.amount} ETB from {sender_name}",
+            user=to_user,
+            delivery_method="push",
+        )
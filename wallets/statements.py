@@ -0,0 +1,106 @@
+import csv
+import json
+
+from django.db.models import F
+from rest_framework.utils.encoders import JSONEncoder
+
+from .ledger import balance_at
+from .models import LedgerEntry
+
+STATEMENT_FIELDS = [
+    "date",
+    "transaction",
+    "type",
+    "amount",
+    "balance",
+    "status",
+    "remarks",
+]
+
+
+def statement_rows(wallet, start=None, end=None, chunk_size=2000):
+    """
+    Yield the ledger entries of `wallet` created in `[start, end)`, oldest
+    first, with the balance after each of them.
+
+    Folding stripes into the main balance moves no money, so its entries are
+    counted in the balance but not listed: the debits of the stripes and
+    the credit of the same total to the main balance that follows them.
+
+    Rows are read through a server-side cursor `chunk_size` at a time, so
+    memory use does not grow with the length of the statement.
+    """
+    entries = LedgerEntry.objects.filter(wallet=wallet)
+
+    if start:
+        entries = entries.filter(created_at__gte=start)
+    if end:
+        entries = entries.filter(created_at__lt=end)
+
+    balance = balance_at(wallet, start) if start else 0
+    # Taken out of the stripes by a fold not yet credited to the main balance
+    folding = 0
+
+    # Ties broken as the ledger numbers entries, with the debits of a fold's
+    # stripes ahead of its credit to the main balance
+    rows = entries.order_by(
+        "created_at", F("stripe").asc(nulls_last=True), "sequence"
+    ).values_list(
+        "created_at",
+        "transaction_id",
+        "stripe",
+        "amount",
+        "transaction__status",
+        "transaction__remarks",
+    )
+
+    for created_at, transaction_id, stripe, amount, status, remarks in rows.iterator(
+        chunk_size=chunk_size
+    ):
+        balance += amount
+
+        if transaction_id is None:
+            if stripe is not None:
+                folding -= amount
+                continue
+
+            if folding and amount == folding:
+                folding = 0
+                continue
+
+        yield {
+            "date": created_at,
+            "transaction": transaction_id,
+            "type": "credit" if amount > 0 else "debit",
+            "amount": abs(amount),
+            "balance": balance,
+            "status": status,
+            "remarks": remarks if transaction_id else "Opening balance",
+        }
+
+
+class _Echo:
+    """File-like object handing back what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def as_csv(rows):
+    writer = csv.DictWriter(_Echo(), fieldnames=STATEMENT_FIELDS)
+
+    yield writer.writeheader()
+
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def as_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder) + "\n"
+
+
+FORMATS = {
+    "csv": (as_csv, "text/csv"),
+    "ndjson": (as_ndjson, "application/x-ndjson"),
+}
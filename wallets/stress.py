@@ -0,0 +1,296 @@
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from bills.models import Billing, Utility, UtilityUser
+from bills.views import PaybillsViewset
+from platform_admin.models import Dispute
+from platform_admin.views import DisputeTransactionViewset
+
+from .models import LedgerEntry, Transaction, Wallet
+from .reconciliation import with_expected_balances
+from .transfers import transfer
+from .views import SendMoneyP2PViewsets
+
+User = get_user_model()
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0
+
+    values = sorted(values)
+
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class StressHarness:
+    """
+    Fire P2P transfers, bill payments and dispute refunds at the money path
+    from many threads at once, through the same views and serializers the
+    API uses, and check the ledger invariants afterwards.
+
+    Every dispute is refunded twice concurrently, so a refund that is not
+    serialized shows up as a double refund. Meant for a throwaway database:
+    `setup` creates its own users, wallets, bills and disputes.
+    """
+
+    def __init__(
+        self,
+        wallets=50,
+        operations=2000,
+        workers=16,
+        balance=10_000,
+        bill_share=0.2,
+        refund_share=0.1,
+        seed=0,
+    ):
+        self.wallet_count = wallets
+        self.operations = operations
+        self.workers = workers
+        self.balance = balance
+        self.bill_share = bill_share
+        self.refund_share = refund_share
+        self.random = random.Random(seed)
+        self.results = []
+        self.elapsed = 0
+
+    def setup(self):
+        self.users = [
+            User.objects.create_user(
+                phone_number=f"97{index:07d}", password=None, first_name="Stress"
+            )
+            for index in range(self.wallet_count)
+        ]
+        self.wallets = [
+            Wallet.objects.create(user=user, balance=self.balance, ledger_sequence=1)
+            for user in self.users
+        ]
+        LedgerEntry.objects.bulk_create(
+            [
+                LedgerEntry(wallet=wallet, amount=self.balance, sequence=1)
+                for wallet in self.wallets
+            ]
+        )
+        self.staff = User.objects.create_user(
+            phone_number="979999999", password=None, first_name="Staff", is_staff=True
+        )
+        self.utility = Utility.objects.create(name="Stress Utility", image="stress.png")
+
+        bills = int(self.operations * self.bill_share)
+        refunds = int(self.operations * self.refund_share) // 2
+
+        self.plan = []
+
+        for number in range(bills):
+            payer = self.random.randrange(self.wallet_count)
+            bill = Billing.objects.create(
+                amount=self.random.randint(10, 200),
+                utility=self.utility,
+                user=UtilityUser.objects.create(
+                    number=900_000 + number, phone_number="979999999"
+                ),
+                due_date=timezone.now() - timedelta(days=1),
+            )
+            self.plan.append(("bill", payer, bill))
+
+        for _ in range(refunds):
+            payer, payee = self.random.sample(range(self.wallet_count), 2)
+            tr = transfer(
+                self.wallets[payer],
+                self.wallets[payee],
+                self.random.randint(10, 100),
+                remarks="stress refund seed",
+            )
+            dispute = Dispute.objects.create(
+                transaction=tr,
+                phone_number="979999999",
+                amount=tr.amount,
+                status="reviewed",
+            )
+            self.plan += [("refund", tr, dispute)] * 2
+
+        while len(self.plan) < self.operations:
+            payer, payee = self.random.sample(range(self.wallet_count), 2)
+            self.plan.append(("p2p", payer, payee, self.random.randint(10, 500)))
+
+        self.random.shuffle(self.plan)
+        self.initial = dict(
+            Wallet.objects.filter(
+                id__in=[wallet.id for wallet in self.wallets]
+            ).values_list("id", "balance")
+        )
+
+    def _request(self, operation):
+        factory = APIRequestFactory()
+        kind = operation[0]
+
+        if kind == "p2p":
+            _, payer, payee, amount = operation
+            request = factory.post(
+                "/",
+                {
+                    "from_wallet": str(self.wallets[payer].id),
+                    "to_wallet": str(self.wallets[payee].id),
+                    "amount": amount,
+                    "remarks": "stress",
+                },
+                format="json",
+            )
+            force_authenticate(request, user=self.users[payer])
+
+            return SendMoneyP2PViewsets.as_view({"post": "create"})(request)
+
+        if kind == "bill":
+            _, payer, bill = operation
+            request = factory.post(
+                "/",
+                {"number": str(bill.user.number), "amount": bill.amount},
+                format="json",
+            )
+            force_authenticate(request, user=self.users[payer])
+
+            return PaybillsViewset.as_view({"post": "create"})(request)
+
+        _, tr, dispute = operation
+        request = factory.patch("/", {}, format="json")
+        force_authenticate(request, user=self.staff)
+
+        return DisputeTransactionViewset.as_view({"patch": "process_refund"})(
+            request, pk=dispute.pk
+        )
+
+    def _deltas(self, operation):
+        kind = operation[0]
+
+        if kind == "p2p":
+            _, payer, payee, amount = operation
+            return [(self.wallets[payer].id, -amount), (self.wallets[payee].id, amount)]
+
+        if kind == "bill":
+            _, payer, bill = operation
+            return [(self.wallets[payer].id, -bill.amount)]
+
+        _, tr, _ = operation
+        return [(tr.to_wallet_id, -tr.amount), (tr.from_wallet_id, tr.amount)]
+
+    def _work(self, operations):
+        try:
+            for operation in operations:
+                started = time.perf_counter()
+
+                try:
+                    response = self._request(operation)
+                    outcome = response.status_code
+                except Exception as e:
+                    outcome = repr(e)
+
+                self.results.append((operation, outcome, time.perf_counter() - started))
+        finally:
+            connection.close()
+
+    def run(self):
+        threads = [
+            threading.Thread(
+                target=self._work, args=(self.plan[index :: self.workers],)
+            )
+            for index in range(self.workers)
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - started
+
+        return self.report()
+
+    def violations(self):
+        """Broken invariants found after the run, as readable messages."""
+        problems = []
+        expected = dict(self.initial)
+        refunded = Counter()
+
+        for operation, outcome, _ in self.results:
+            if not isinstance(outcome, int) or outcome >= 500:
+                problems.append(f"{operation[0]} failed unexpectedly: {outcome}")
+            elif outcome < 300:
+                for wallet_id, delta in self._deltas(operation):
+                    expected[wallet_id] += delta
+
+                if operation[0] == "refund":
+                    refunded[operation[1].id] += 1
+
+        for transaction_id, count in refunded.items():
+            if count > 1:
+                problems.append(f"transaction {transaction_id} refunded {count} times")
+
+        wallets = with_expected_balances(Wallet.objects.filter(id__in=expected))
+
+        for wallet in wallets:
+            if wallet.balance < 0 or wallet.frozen_amount < 0:
+                problems.append(f"wallet {wallet.id} went negative")
+
+            if wallet.stored_balance != expected[wallet.id]:
+                problems.append(
+                    f"wallet {wallet.id} holds {wallet.stored_balance},"
+                    f" {expected[wallet.id]} expected (lost update)"
+                )
+
+            if wallet.stored_balance != wallet.ledger_total:
+                problems.append(
+                    f"wallet {wallet.id} balance {wallet.stored_balance} does not"
+                    f" match its ledger {wallet.ledger_total}"
+                )
+
+        paid_out = (
+            Transaction.objects.filter(
+                from_wallet__in=expected, to_wallet=None, status="completed"
+            ).aggregate(total=Sum("amount"))["total"]
+            or 0
+        )
+        held = sum(wallet.stored_balance for wallet in wallets)
+
+        if held + paid_out != sum(self.initial.values()):
+            problems.append(
+                f"money not conserved: {held} held + {paid_out} paid out"
+                f" != {sum(self.initial.values())}"
+            )
+
+        return problems
+
+    def report(self):
+        outcomes = defaultdict(Counter)
+        latencies = []
+
+        for operation, outcome, elapsed in self.results:
+            kind = operation[0]
+            if isinstance(outcome, int) and outcome < 300:
+                outcomes[kind]["ok"] += 1
+            elif isinstance(outcome, int) and outcome < 500:
+                outcomes[kind]["rejected"] += 1
+            else:
+                outcomes[kind]["error"] += 1
+            latencies.append(elapsed)
+
+        return {
+            "operations": len(self.results),
+            "workers": self.workers,
+            "seconds": round(self.elapsed, 3),
+            "throughput": (
+                round(len(self.results) / self.elapsed, 1) if self.elapsed else 0
+            ),
+            "p50_ms": round(_percentile(latencies, 0.5) * 1000, 1),
+            "p99_ms": round(_percentile(latencies, 0.99) * 1000, 1),
+            "outcomes": {kind: dict(counter) for kind, counter in outcomes.items()},
+            "violations": self.violations(),
+        }
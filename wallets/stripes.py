@@ -0,0 +1,158 @@
+import zlib
+
+from django.db import transaction
+from django.db.models import F
+
+from .dispatch import balance_changed
+from .models import LedgerEntry, Wallet, WalletStripe
+
+
+class StripingChanged(Exception):
+    """The stripes of a wallet changed under a credit that picked one."""
+
+
+def enable_stripes(wallet, count):
+    """
+    Spread incoming credits of `wallet` over `count` sub-balances so that
+    concurrent payers do not all queue on the same wallet row.
+    """
+    with transaction.atomic():
+        WalletStripe.objects.bulk_create(
+            [WalletStripe(wallet=wallet, index=index) for index in range(count)],
+            ignore_conflicts=True,
+        )
+        Wallet.objects.filter(id=wallet.pk).update(
+            balance_stripes=count, version=F("version") + 1
+        )
+        wallet.balance_stripes = count
+
+        balance_changed.send(sender=Wallet, wallet_ids=[wallet.pk])
+
+
+def disable_stripes(wallet):
+    with transaction.atomic():
+        locked = Wallet.objects.select_for_update().get(id=wallet.pk)
+        # Wait for credits already in a stripe, and make later ones find
+        # striping turned off once they get the stripe
+        list(
+            WalletStripe.objects.select_for_update()
+            .filter(wallet_id=wallet.pk)
+            .order_by("index")
+        )
+        fold_stripes(locked)
+        Wallet.objects.filter(id=wallet.pk).update(
+            balance_stripes=0, version=F("version") + 1
+        )
+        wallet.balance_stripes = 0
+
+        balance_changed.send(sender=Wallet, wallet_ids=[wallet.pk])
+
+
+def stripe_for(wallet, payer_id):
+    """Pick the stripe a payer's credits land in by hashing the payer."""
+    return zlib.crc32(str(payer_id).encode()) % wallet.balance_stripes
+
+
+def credit_stripe(wallet, index, amount):
+    """
+    Add `amount` to one stripe of `wallet`, locking only that stripe row.
+    Returns the stripe's new ledger sequence. Must run inside an atomic block.
+
+    `wallet` is not locked, so whether it stripes is checked again once the
+    stripe is: raises StripingChanged when striping was turned off or the
+    stripe is gone, for the caller to roll back and credit the wallet.
+    """
+    stripe = (
+        WalletStripe.objects.select_for_update()
+        .only("id", "ledger_sequence")
+        .filter(wallet_id=wallet.pk, index=index)
+        .first()
+    )
+
+    if (
+        stripe is None
+        or not Wallet.objects.filter(id=wallet.pk, balance_stripes__gt=index).exists()
+    ):
+        raise StripingChanged(f"wallet {wallet.pk} no longer uses stripe {index}")
+
+    WalletStripe.objects.filter(id=stripe.id).update(
+        balance=F("balance") + amount, ledger_sequence=F("ledger_sequence") + 1
+    )
+
+    return stripe.ledger_sequence + 1
+
+
+def fold_stripes(wallet):
+    """
+    Move everything sitting in the stripes of an already locked `wallet` into
+    its main balance. Updates `wallet` in place and returns the folded amount.
+    """
+    stripes = list(
+        WalletStripe.objects.select_for_update()
+        .filter(wallet_id=wallet.pk, balance__gt=0)
+        .order_by("index")
+    )
+
+    if not stripes:
+        return 0
+
+    total = sum(stripe.balance for stripe in stripes)
+
+    entries = [
+        LedgerEntry(
+            wallet_id=wallet.pk,
+            stripe=stripe.index,
+            amount=-stripe.balance,
+            sequence=stripe.ledger_sequence + 1,
+        )
+        for stripe in stripes
+    ]
+    entries.append(
+        LedgerEntry(
+            wallet_id=wallet.pk,
+            amount=total,
+            sequence=wallet.ledger_sequence + 1,
+        )
+    )
+
+    WalletStripe.objects.filter(id__in=[stripe.id for stripe in stripes]).update(
+        balance=0, ledger_sequence=F("ledger_sequence") + 1
+    )
+    Wallet.objects.filter(id=wallet.pk).update(
+        balance=F("balance") + total,
+        ledger_sequence=F("ledger_sequence") + 1,
+        version=F("version") + 1,
+    )
+    LedgerEntry.objects.bulk_create(entries)
+
+    wallet.balance += total
+    wallet.ledger_sequence += 1
+    wallet.version += 1
+
+    balance_changed.send(sender=Wallet, wallet_ids=[wallet.pk])
+
+    return total
+
+
+def consolidate_stripes():
+    """
+    Fold the stripes of every striped wallet that has pending credits, one
+    short transaction per wallet. Returns the number of wallets folded.
+    """
+    wallet_ids = (
+        WalletStripe.objects.filter(balance__gt=0)
+        .order_by()
+        .values_list("wallet_id", flat=True)
+        .distinct()
+    )
+
+    folded = 0
+
+    for wallet_id in list(wallet_ids):
+        with transaction.atomic():
+            wallet = Wallet.objects.select_for_update().get(id=wallet_id)
+
+            if fold_stripes(wallet):
+                folded += 1
+
+    return folded
@@ -1,3 +1,1337 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timedelta
+from unittest import mock
+from uuid import UUID
 
-# Create your tests here.
+import redis
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from accounts.models import Business
+from wallets import balance_cache, daily_stats, velocity
+from wallets.holds import HoldError, authorize, capture, release_expired_holds, void
+from wallets.ledger import ledger_balance, take_snapshots
+from wallets.models import (
+    AuthorizationHold,
+    BalanceDiscrepancy,
+    IdempotencyKey,
+    LedgerEntry,
+    ReconciliationRun,
+    Transaction,
+    Wallet,
+    WalletDailyStats,
+    WalletSnapshot,
+)
+from wallets.partitions import (
+    ensure_transaction_partitions,
+    is_partitioned,
+    next_month,
+)
+from wallets.reconciliation import reconcile, with_expected_balances
+from wallets.settlement import settle
+from wallets.statements import statement_rows
+from wallets.stress import StressHarness
+from wallets.stripes import consolidate_stripes, disable_stripes, enable_stripes
+from wallets.transfer_queue import (
+    apply_pending,
+    enqueue_transfer,
+    time_out_stuck_transactions,
+)
+from wallets.transfers import (
+    InsufficientFunds,
+    TransferError,
+    VelocityLimitExceeded,
+    transfer,
+)
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(
+            phone_number="911111111", password="testpass", first_name="Sender"
+        )
+        self.receiver = User.objects.create_user(
+            phone_number="922222222", password="testpass", first_name="Receiver"
+        )
+        self.from_wallet = Wallet.objects.create(user=self.sender, balance=1000)
+        self.to_wallet = Wallet.objects.create(user=self.receiver, balance=50)
+
+    def test_transfer_moves_balance(self):
+        tr = transfer(self.from_wallet, self.to_wallet, 300, remarks="rent")
+
+        self.from_wallet.refresh_from_db()
+        self.to_wallet.refresh_from_db()
+
+        self.assertEqual(tr.status, "completed")
+        self.assertEqual(self.from_wallet.balance, 700)
+        self.assertEqual(self.to_wallet.balance, 350)
+
+    def test_transfer_respects_frozen_amount(self):
+        self.from_wallet.frozen_amount = 800
+        self.from_wallet.save()
+
+        with self.assertRaises(InsufficientFunds):
+            transfer(self.from_wallet, self.to_wallet, 300)
+
+        self.from_wallet.refresh_from_db()
+        self.assertEqual(self.from_wallet.balance, 1000)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_transfer_out_of_platform(self):
+        transfer(self.from_wallet, None, 200)
+
+        self.from_wallet.refresh_from_db()
+        self.assertEqual(self.from_wallet.balance, 800)
+
+    def test_transfer_to_same_wallet(self):
+        with self.assertRaises(TransferError):
+            transfer(self.from_wallet, self.from_wallet, 10)
+
+
+class SettlementTests(TestCase):
+    def setUp(self):
+        self.wallets = [
+            Wallet.objects.create(
+                user=User.objects.create_user(
+                    phone_number=f"91111112{i}", password="testpass", first_name="S"
+                ),
+                balance=balance,
+            )
+            for i, balance in enumerate([100, 0, 50])
+        ]
+
+    def test_settle_nets_transfers_in_order(self):
+        a, b, c = (wallet.id for wallet in self.wallets)
+
+        results = settle(
+            [
+                (a, b, 100, "first"),
+                (b, c, 80, "funded by the first"),
+                (c, a, 130, "funded by the second"),
+                (a, None, 10, "out of platform"),
+            ]
+        )
+
+        self.assertEqual([r["status"] for r in results], ["completed"] * 4)
+        for wallet, initial, expected in zip(self.wallets, [100, 0, 50], [120, 20, 0]):
+            wallet.refresh_from_db()
+            self.assertEqual(wallet.balance, expected)
+            self.assertEqual(ledger_balance(wallet), expected - initial)
+        self.assertEqual(Transaction.objects.filter(status="completed").count(), 4)
+
+    def test_settle_skips_overdrawing_transfers(self):
+        a, b, c = (wallet.id for wallet in self.wallets)
+
+        results = settle([(b, c, 10, None), (a, b, 60, None), (a, c, 60, None)])
+
+        self.assertEqual(
+            [r["status"] for r in results], ["failed", "completed", "failed"]
+        )
+        self.wallets[0].refresh_from_db()
+        self.assertEqual(self.wallets[0].balance, 40)
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_settle_all_or_nothing(self):
+        a, b, c = (wallet.id for wallet in self.wallets)
+
+        with self.assertRaises(InsufficientFunds):
+            settle([(a, b, 60, None), (a, c, 60, None)], all_or_nothing=True)
+
+        self.wallets[0].refresh_from_db()
+        self.assertEqual(self.wallets[0].balance, 100)
+        self.assertFalse(Transaction.objects.exists())
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(
+            phone_number="911111111", password="testpass", first_name="Sender"
+        )
+        self.receiver = User.objects.create_user(
+            phone_number="922222222", password="testpass", first_name="Receiver"
+        )
+        self.from_wallet = Wallet.objects.create(
+            user=self.sender, balance=1000, ledger_sequence=1
+        )
+        self.to_wallet = Wallet.objects.create(user=self.receiver)
+        LedgerEntry.objects.create(wallet=self.from_wallet, amount=1000, sequence=1)
+
+    def test_transfer_writes_balanced_entries(self):
+        tr = transfer(self.from_wallet, self.to_wallet, 300)
+
+        entries = tr.ledger_entries.all()
+        self.assertEqual(sum(entry.amount for entry in entries), 0)
+        self.assertEqual(entries.get(wallet=self.from_wallet).sequence, 2)
+        self.assertEqual(entries.get(wallet=self.to_wallet).sequence, 1)
+
+    def test_ledger_balance_from_snapshot_and_tail(self):
+        transfer(self.from_wallet, self.to_wallet, 300)
+        self.assertEqual(take_snapshots(), 2)
+
+        transfer(self.from_wallet, self.to_wallet, 100)
+        transfer(self.to_wallet, self.from_wallet, 50)
+
+        self.assertEqual(ledger_balance(self.from_wallet), 650)
+        self.assertEqual(ledger_balance(self.to_wallet), 350)
+        self.assertEqual(WalletSnapshot.objects.count(), 2)
+
+    def test_balance_at_point_in_time(self):
+        before = timezone.now()
+        transfer(self.from_wallet, self.to_wallet, 300)
+        take_snapshots()
+        middle = timezone.now()
+        transfer(self.from_wallet, self.to_wallet, 100)
+        take_snapshots()
+        transfer(self.to_wallet, self.from_wallet, 50)
+
+        self.assertEqual(self.from_wallet.balance_at(before), 1000)
+        self.assertEqual(self.from_wallet.balance_at(middle), 700)
+        self.assertEqual(self.to_wallet.balance_at(middle), 300)
+        self.assertEqual(self.from_wallet.balance_at(timezone.now()), 650)
+
+    def test_entries_are_append_only(self):
+        entry = LedgerEntry.objects.get(wallet=self.from_wallet)
+        entry.amount = 1
+
+        with self.assertRaises(ValueError):
+            entry.save()
+
+
+class DailyStatsTests(TestCase):
+    def setUp(self):
+        self.sender = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="911111161", password="testpass", first_name="Sender"
+            ),
+            balance=1000,
+        )
+        self.receiver = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="911111162", password="testpass", first_name="Receiver"
+            )
+        )
+        self.merchant = Wallet.objects.create(wallet_type="business")
+        enable_stripes(self.merchant, 2)
+
+    def _totals(self):
+        return daily_stats.totals(
+            [self.sender.id, self.receiver.id, self.merchant.id],
+            since=timezone.localdate(),
+        )
+
+    def test_transfers_update_the_rollup(self):
+        transfer(self.sender, self.receiver, 300)
+        transfer(self.receiver, self.sender, 100)
+        transfer(self.sender, self.merchant, 50)
+        settle(
+            [
+                (self.sender.id, self.merchant.id, 20, None),
+                (self.sender.id, None, 30, None),
+            ]
+        )
+
+        totals = self._totals()
+
+        self.assertEqual(
+            totals[self.sender.id],
+            {"in_count": 1, "in_sum": 100, "out_count": 4, "out_sum": 400},
+        )
+        self.assertEqual(totals[self.receiver.id]["in_sum"], 300)
+        self.assertEqual(totals[self.merchant.id]["in_sum"], 70)
+
+    def test_backfill_matches_the_live_rollup(self):
+        transfer(self.sender, self.receiver, 300)
+        transfer(self.sender, self.merchant, 50)
+        transfer(self.receiver, None, 40)
+        live = self._totals()
+
+        WalletDailyStats.objects.all().delete()
+        self.assertEqual(daily_stats.backfill(timezone.localdate()), 3)
+
+        self.assertEqual(self._totals(), live)
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        self.wallets = [
+            Wallet.objects.create(
+                user=User.objects.create_user(
+                    phone_number=f"91111111{i}", password="testpass", first_name="W"
+                ),
+                balance=1000,
+                ledger_sequence=1,
+            )
+            for i in range(5)
+        ]
+        for wallet in self.wallets:
+            LedgerEntry.objects.create(wallet=wallet, amount=1000, sequence=1)
+
+        transfer(self.wallets[0], self.wallets[1], 300)
+        transfer(self.wallets[2], None, 100)
+
+    def test_consistent_wallets_have_no_discrepancies(self):
+        run = reconcile(chunk_size=2)
+
+        self.assertEqual(run.status, "completed")
+        self.assertEqual(run.wallets_checked, 5)
+        self.assertEqual(run.discrepancies_found, 0)
+
+    def test_transactions_from_before_the_ledger_are_not_counted_twice(self):
+        payer, payee = (
+            Wallet.objects.create(
+                user=User.objects.create_user(
+                    phone_number=f"92222222{i}", password="testpass", first_name="W"
+                ),
+                balance=balance,
+                ledger_sequence=1,
+            )
+            for i, balance in enumerate([800, 200])
+        )
+        # Paid before the ledger, whose opening entries already include it
+        Transaction.objects.create(
+            from_wallet=payer, to_wallet=payee, amount=200, status="completed"
+        )
+        LedgerEntry.objects.create(wallet=payer, amount=800, sequence=1)
+        LedgerEntry.objects.create(wallet=payee, amount=200, sequence=1)
+        transfer(payer, payee, 100)
+
+        run = reconcile()
+
+        self.assertEqual(run.discrepancies_found, 0)
+        self.assertEqual(
+            with_expected_balances(Wallet.objects.filter(id=payee.id))
+            .get()
+            .transaction_total,
+            300,
+        )
+
+    def test_tampered_balance_is_reported(self):
+        Wallet.objects.filter(id=self.wallets[3].id).update(balance=5000)
+
+        run = reconcile(chunk_size=2)
+
+        discrepancy = BalanceDiscrepancy.objects.get(run=run)
+        self.assertEqual(discrepancy.wallet_id, self.wallets[3].id)
+        self.assertEqual(discrepancy.balance, 5000)
+        self.assertEqual(discrepancy.ledger_balance, 1000)
+        self.assertEqual(discrepancy.transaction_balance, 1000)
+
+    def test_unfinished_run_resumes_from_checkpoint(self):
+        first, second, *_ = sorted(wallet.id for wallet in self.wallets)
+        Wallet.objects.filter(id=first).update(balance=1)
+        run = ReconciliationRun.objects.create(checkpoint=second, wallets_checked=2)
+
+        resumed = reconcile(chunk_size=2)
+
+        self.assertEqual(resumed.id, run.id)
+        self.assertEqual(resumed.wallets_checked, 5)
+        self.assertEqual(resumed.discrepancies_found, 0)
+
+
+class TransferQueueTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(
+            phone_number="911111111", password="testpass", first_name="Sender"
+        )
+        self.receiver = User.objects.create_user(
+            phone_number="922222222", password="testpass", first_name="Receiver"
+        )
+        self.from_wallet = Wallet.objects.create(user=self.sender, balance=1000)
+        self.to_wallet = Wallet.objects.create(user=self.receiver)
+
+    def test_pending_transfers_apply_in_order(self):
+        first = enqueue_transfer(self.from_wallet, self.to_wallet, 600)
+        second = enqueue_transfer(self.from_wallet, self.to_wallet, 600)
+        third = enqueue_transfer(self.from_wallet, self.to_wallet, 400)
+
+        self.assertEqual(apply_pending(self.from_wallet.id), 3)
+
+        for tr in (first, second, third):
+            tr.refresh_from_db()
+
+        self.assertEqual(first.status, "completed")
+        self.assertEqual(second.status, "failed")
+        self.assertEqual(third.status, "completed")
+        self.assertIsNotNone(first.processing_at)
+        self.assertIsNotNone(first.completed_at)
+        self.assertIsNotNone(second.failed_at)
+
+        self.from_wallet.refresh_from_db()
+        self.assertEqual(self.from_wallet.balance, 0)
+        self.assertTrue(
+            self.sender.notifications.filter(title="Transaction Failed").exists()
+        )
+
+    def test_nothing_pending(self):
+        self.assertEqual(apply_pending(self.from_wallet.id), 0)
+
+    def test_stuck_transactions_time_out(self):
+        stuck = enqueue_transfer(self.from_wallet, self.to_wallet, 100)
+        fresh = enqueue_transfer(self.from_wallet, self.to_wallet, 100)
+        Transaction.objects.filter(id=stuck.id).update(
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+
+        self.assertEqual(time_out_stuck_transactions(batch_size=1), 1)
+
+        stuck.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stuck.status, "failed")
+        self.assertEqual(fresh.status, "pending")
+        self.assertTrue(
+            self.sender.notifications.filter(title="Transaction Failed").exists()
+        )
+
+    def test_invalid_transition_is_rejected(self):
+        tr = transfer(self.from_wallet, self.to_wallet, 100)
+
+        with self.assertRaises(ValueError):
+            tr.transition_to("pending")
+
+        tr.transition_to("reversed")
+        self.assertIsNotNone(tr.reversed_at)
+
+
+class StripedWalletTests(TestCase):
+    def setUp(self):
+        self.payers = [
+            Wallet.objects.create(
+                user=User.objects.create_user(
+                    phone_number=f"91111111{i}", password="testpass", first_name="P"
+                ),
+                balance=1000,
+            )
+            for i in range(4)
+        ]
+        self.merchant = Wallet.objects.create(wallet_type="business")
+        enable_stripes(self.merchant, 4)
+
+    def test_credits_land_in_stripes(self):
+        for payer in self.payers:
+            transfer(payer, self.merchant, 100)
+
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance, 0)
+        self.assertEqual(self.merchant.total_balance, 400)
+
+    def test_consolidation_folds_stripes(self):
+        for payer in self.payers:
+            transfer(payer, self.merchant, 100)
+
+        self.assertEqual(consolidate_stripes(), 1)
+
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance, 400)
+        self.assertEqual(self.merchant.total_balance, 400)
+        self.assertEqual(ledger_balance(self.merchant), 400)
+
+    def test_balance_at_counts_unfolded_stripe_credits(self):
+        for payer in self.payers[:2]:
+            transfer(payer, self.merchant, 100)
+        unfolded = timezone.now()
+        consolidate_stripes()
+        transfer(self.payers[2], self.merchant, 100)
+
+        self.assertEqual(self.merchant.balance_at(unfolded), 200)
+        self.assertEqual(self.merchant.balance_at(timezone.now()), 300)
+
+    def test_debit_folds_stripes_when_needed(self):
+        transfer(self.payers[0], self.merchant, 300)
+
+        transfer(self.merchant, self.payers[1], 250)
+
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.total_balance, 50)
+
+    def test_credit_after_striping_is_turned_off_goes_to_the_wallet(self):
+        transfer(self.payers[0], self.merchant, 100)
+        # Another instance, as another request would have
+        disable_stripes(Wallet.objects.get(pk=self.merchant.pk))
+
+        # `self.merchant` still says it stripes
+        tr = transfer(self.payers[1], self.merchant, 100)
+
+        self.merchant.refresh_from_db()
+        self.assertEqual(self.merchant.balance_stripes, 0)
+        self.assertEqual(self.merchant.balance, 200)
+        self.assertEqual(self.merchant.total_balance, 200)
+        self.assertEqual(ledger_balance(self.merchant), 200)
+        self.assertIsNone(tr.ledger_entries.get(wallet=self.merchant).stripe)
+
+
+class PartitionTests(TestCase):
+    def setUp(self):
+        self.from_wallet = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="911111111", password="testpass", first_name="Sender"
+            ),
+            balance=1000,
+        )
+        self.to_wallet = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="922222222", password="testpass", first_name="Receiver"
+            )
+        )
+
+    def _partition_of(self, tr):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM wallets_transaction"
+                " WHERE id = %s",
+                [tr.id],
+            )
+            return cursor.fetchone()[0]
+
+    def test_transaction_table_is_partitioned(self):
+        self.assertTrue(is_partitioned())
+
+        tr = transfer(self.from_wallet, self.to_wallet, 100)
+
+        self.assertEqual(
+            self._partition_of(tr), f"wallets_transaction_y{tr.created_at:%Ym%m}"
+        )
+
+    def test_existing_partitions_are_kept(self):
+        self.assertEqual(ensure_transaction_partitions(), [])
+
+    def test_rows_in_the_default_partition_move_to_their_new_partition(self):
+        month = timezone.now().date().replace(day=1)
+        for _ in range(6):
+            month = next_month(month)
+        tr = transfer(self.from_wallet, self.to_wallet, 100)
+        Transaction.objects.filter(id=tr.id).update(
+            created_at=timezone.make_aware(datetime(month.year, month.month, 2))
+        )
+        self.assertEqual(self._partition_of(tr), "wallets_transaction_default")
+
+        created = ensure_transaction_partitions(months_ahead=6)
+
+        name = f"wallets_transaction_y{month:%Ym%m}"
+        self.assertIn(name, created)
+        self.assertEqual(self._partition_of(tr), name)
+        self.assertEqual(Transaction.objects.get(id=tr.id).amount, 100)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT partdefid::regclass::text FROM pg_partitioned_table"
+                " WHERE partrelid = 'wallets_transaction'::regclass"
+            )
+            self.assertEqual(cursor.fetchone()[0], "wallets_transaction_default")
+
+
+class ConcurrencyTests(TransactionTestCase):
+    def test_concurrent_money_movements_keep_ledger_invariants(self):
+        harness = StressHarness(wallets=8, operations=150, workers=6, balance=2000)
+        harness.setup()
+
+        report = harness.run()
+
+        self.assertEqual(report["operations"], 150)
+        self.assertEqual(report["violations"], [])
+
+
+TEST_WALLET_CACHE_URL = f"{settings.CELERY_BROKER_URL}/15"
+
+
+def _redis_available():
+    try:
+        return redis.Redis.from_url(TEST_WALLET_CACHE_URL).ping()
+    except redis.RedisError:
+        return False
+
+
+@override_settings(WALLET_CACHE_URL=TEST_WALLET_CACHE_URL)
+class WalletCacheTests(APITestCase):
+    def setUp(self):
+        if not _redis_available():
+            self.skipTest("Redis is not reachable")
+
+        redis.Redis.from_url(TEST_WALLET_CACHE_URL).flushdb()
+        self.addCleanup(setattr, balance_cache, "_skip_until", 0.0)
+
+        self.sender = User.objects.create_user(
+            phone_number="911111111", password="testpass", first_name="Sender"
+        )
+        self.receiver = User.objects.create_user(
+            phone_number="922222222", password="testpass", first_name="Receiver"
+        )
+        self.from_wallet = Wallet.objects.create(user=self.sender, balance=1000)
+        self.to_wallet = Wallet.objects.create(user=self.receiver)
+        self.client.force_authenticate(user=self.sender)
+        self.url = reverse("wallet-detail", args=[self.sender.id])
+
+    def test_retrieve_is_served_from_cache_after_a_miss(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Internal counters stay internal
+        for field in ["version", "ledger_sequence", "balance_stripes"]:
+            self.assertNotIn(field, response.json())
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["balance"], 1000)
+
+    def test_transfer_writes_through_on_commit(self):
+        self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transfer(self.from_wallet, self.to_wallet, 300)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.json()["balance"], 700)
+
+    def test_stale_write_does_not_replace_newer_document(self):
+        version, document = balance_cache.load([self.from_wallet.id])[
+            self.from_wallet.id
+        ]
+
+        balance_cache.store(
+            {self.from_wallet.id: (version + 1, {**document, "balance": 5})}
+        )
+        balance_cache.store({self.from_wallet.id: (version, document)})
+
+        cached = balance_cache.cached_wallet_of_user(self.sender.id)
+        self.assertEqual(cached["balance"], 5)
+
+    @override_settings(WALLET_CACHE_URL="redis://localhost:1/0")
+    def test_unreachable_cache_falls_back_to_database(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["balance"], 1000)
+
+        # Not tried again until WALLET_CACHE_RETRY_AFTER has passed
+        with mock.patch.object(balance_cache, "_client") as client:
+            response = self.client.get(self.url)
+
+        client.assert_not_called()
+        self.assertEqual(response.json()["balance"], 1000)
+
+
+@override_settings(
+    VELOCITY_CACHE_URL=TEST_WALLET_CACHE_URL,
+    WALLET_VELOCITY_LIMITS={
+        "user": {"hour": 500, "day": 800},
+        "business:high": {"hour": 5000},
+    },
+)
+class VelocityLimitTests(TransactionTestCase):
+    def setUp(self):
+        if not _redis_available():
+            self.skipTest("Redis is not reachable")
+
+        redis.Redis.from_url(TEST_WALLET_CACHE_URL).flushdb()
+
+        self.sender = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="911111151", password="testpass", first_name="Sender"
+            ),
+            balance=10000,
+        )
+        self.receiver = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="911111152", password="testpass", first_name="Receiver"
+            )
+        )
+
+    def test_debits_beyond_the_hourly_limit_are_rejected(self):
+        transfer(self.sender, self.receiver, 300)
+        transfer(self.sender, self.receiver, 200)
+
+        with self.assertRaises(VelocityLimitExceeded):
+            transfer(self.sender, self.receiver, 10)
+
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, 9500)
+
+        transfer(self.receiver, self.sender, 10)
+        transfer(self.sender, self.receiver, 10, check_limits=False)
+
+    def test_rolled_back_debits_are_not_counted(self):
+        with self.assertRaises(TransferError):
+            with transaction.atomic():
+                transfer(self.sender, self.receiver, 300)
+                raise TransferError("rolled back")
+
+        self.assertEqual(velocity.wallet_allowance(self.sender), 500)
+
+    def test_sliding_window_weighs_the_previous_bucket(self):
+        hour = velocity.WINDOWS["hour"]
+        start = 1000 * hour
+
+        velocity.record("test", ["hour"], 400, now=start + hour / 2)
+
+        self.assertEqual(
+            velocity.usage("test", ["hour"], now=start + hour * 1.25)["hour"], 300
+        )
+        self.assertEqual(
+            velocity.usage("test", ["hour"], now=start + hour * 2), {"hour": 0}
+        )
+
+    def test_limits_follow_business_trust_level(self):
+        business = Business.objects.create(
+            name="Shop",
+            owner=self.sender.user,
+            contact_email="shop@test.com",
+            trust_level="high",
+        )
+
+        self.assertEqual(velocity.wallet_limits(business.wallet), {"hour": 5000})
+        self.assertEqual(velocity.wallet_limits(self.sender), {"hour": 500, "day": 800})
+
+    def test_settle_fails_rows_over_the_limit(self):
+        results = settle(
+            [
+                (self.sender.id, self.receiver.id, 400, None),
+                (self.sender.id, self.receiver.id, 200, None),
+                (self.sender.id, None, 100, None),
+            ]
+        )
+
+        self.assertEqual(
+            [r["status"] for r in results], ["completed", "failed", "completed"]
+        )
+        self.assertEqual(velocity.wallet_allowance(self.sender), 0)
+
+    def test_holds_count_when_authorized_not_when_captured(self):
+        merchant = self.receiver
+
+        with self.assertRaises(VelocityLimitExceeded):
+            authorize(self.sender, merchant, 600)
+
+        hold = authorize(self.sender, merchant, 400)
+        self.assertEqual(velocity.wallet_allowance(self.sender), 100)
+
+        capture(hold)
+
+        self.assertEqual(velocity.wallet_allowance(self.sender), 100)
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, 9600)
+
+    @override_settings(VELOCITY_CACHE_URL="redis://localhost:1/0")
+    def test_limits_fail_open_without_redis(self):
+        transfer(self.sender, self.receiver, 600)
+
+        self.sender.refresh_from_db()
+        self.assertEqual(self.sender.balance, 9400)
+
+
+class SendMoneyP2PViewsetTests(APITestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(
+            phone_number="911111111", password="testpass", first_name="Sender"
+        )
+        self.receiver = User.objects.create_user(
+            phone_number="922222222", password="testpass", first_name="Receiver"
+        )
+        self.from_wallet = Wallet.objects.create(user=self.sender, balance=1000)
+        self.to_wallet = Wallet.objects.create(user=self.receiver)
+        self.client.force_authenticate(user=self.sender)
+        self.url = reverse("send-p2p-list")
+
+    def test_send_money(self):
+        data = {
+            "from_wallet": str(self.from_wallet.id),
+            "to_wallet": str(self.to_wallet.id),
+            "amount": 100,
+            "remarks": "lunch",
+        }
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.to_wallet.refresh_from_db()
+        self.assertEqual(self.to_wallet.balance, 100)
+
+    def test_send_money_async_is_accepted_pending(self):
+        data = {
+            "from_wallet": str(self.from_wallet.id),
+            "to_wallet": str(self.to_wallet.id),
+            "amount": 100,
+            "remarks": "lunch",
+            "mode": "async",
+        }
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], "pending")
+        self.to_wallet.refresh_from_db()
+        self.assertEqual(self.to_wallet.balance, 0)
+
+        apply_pending(self.from_wallet.id)
+
+        tr = Transaction.objects.get(id=response.data["id"])
+        self.to_wallet.refresh_from_db()
+        self.assertEqual(tr.status, "completed")
+        self.assertEqual(self.to_wallet.balance, 100)
+
+    def test_send_money_insufficient_balance(self):
+        data = {
+            "from_wallet": str(self.from_wallet.id),
+            "to_wallet": str(self.to_wallet.id),
+            "amount": 5000,
+            "remarks": "car",
+        }
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("amount", response.data)
+
+    def test_send_money_spends_credits_still_in_stripes(self):
+        Wallet.objects.filter(id=self.from_wallet.id).update(balance=0)
+        enable_stripes(self.from_wallet, 2)
+        payer = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="933333333", password="testpass", first_name="Payer"
+            ),
+            balance=500,
+        )
+        transfer(payer, self.from_wallet, 500)
+
+        data = {
+            "from_wallet": str(self.from_wallet.id),
+            "to_wallet": str(self.to_wallet.id),
+            "amount": 300,
+            "remarks": "lunch",
+        }
+        response = self.client.post(self.url, data)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.from_wallet.refresh_from_db()
+        self.assertEqual(self.from_wallet.total_balance, 200)
+
+    def test_send_money_replays_idempotent_retry(self):
+        data = {
+            "from_wallet": str(self.from_wallet.id),
+            "to_wallet": str(self.to_wallet.id),
+            "amount": 100,
+            "remarks": "lunch",
+        }
+        headers = {"Idempotency-Key": "retry-1"}
+
+        first = self.client.post(self.url, data, headers=headers)
+        second = self.client.post(self.url, data, headers=headers)
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_idempotency_key_reused_for_other_request(self):
+        data = {
+            "from_wallet": str(self.from_wallet.id),
+            "to_wallet": str(self.to_wallet.id),
+            "amount": 100,
+            "remarks": "lunch",
+        }
+        headers = {"Idempotency-Key": "retry-2"}
+
+        self.client.post(self.url, data, headers=headers)
+        response = self.client.post(self.url, {**data, "amount": 200}, headers=headers)
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_retry_takes_over_a_stale_claim(self):
+        data = {
+            "from_wallet": str(self.from_wallet.id),
+            "to_wallet": str(self.to_wallet.id),
+            "amount": 100,
+            "remarks": "lunch",
+        }
+        headers = {"Idempotency-Key": "retry-3"}
+        # Left by a request that died before answering
+        IdempotencyKey.objects.create(
+            owner=f"{self.sender._meta.label_lower}:{self.sender.pk}",
+            key="retry-3",
+            fingerprint="unanswered",
+            expires_at=timezone.now(),
+        )
+
+        response = self.client.post(self.url, data, headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        record = IdempotencyKey.objects.get(key="retry-3")
+        self.assertEqual(record.response_status, status.HTTP_201_CREATED)
+        self.assertGreater(
+            record.expires_at, timezone.now() + settings.IDEMPOTENCY_CLAIM_LEASE
+        )
+
+
+class TransactionFeedTests(APITestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(
+            phone_number="911111111", password="testpass", first_name="Sender"
+        )
+        self.receiver = User.objects.create_user(
+            phone_number="922222222", password="testpass", first_name="Receiver"
+        )
+        self.from_wallet = Wallet.objects.create(user=self.sender, balance=1000)
+        self.to_wallet = Wallet.objects.create(user=self.receiver, balance=1000)
+        self.url = reverse("transactions-list")
+
+    def test_wallet_history_is_paginated_newest_first(self):
+        for amount in range(10, 15):
+            transfer(self.from_wallet, self.to_wallet, amount)
+        transfer(self.to_wallet, self.from_wallet, 99)
+
+        response = self.client.get(
+            self.url, {"wallet": str(self.from_wallet.id), "page_size": 4}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data["results"]
+        self.assertEqual([tr["amount"] for tr in results], [99, 14, 13, 12])
+        self.assertEqual(results[0]["direction"], "in")
+        self.assertEqual(results[1]["direction"], "out")
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual([tr["amount"] for tr in response.data["results"]], [11, 10])
+        self.assertIsNone(response.data["next"])
+
+    def test_history_page_renders_in_constant_queries(self):
+        business = Business.objects.create(
+            name="My Shop", owner=self.receiver, contact_email="shop@test.com"
+        )
+        for i in range(10):
+            recipient = Wallet.objects.create(
+                user=User.objects.create_user(
+                    phone_number=f"94444444{i}", password="testpass", first_name="R"
+                )
+            )
+            transfer(self.from_wallet, recipient, 10)
+            transfer(self.from_wallet, business.wallet, 10)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"wallet": str(self.from_wallet.id)})
+
+        self.assertEqual(len(response.data["results"]), 20)
+        self.assertEqual(response.data["results"][0]["to_business"]["name"], "My Shop")
+
+
+class StatementViewsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number="911111131", password="testpass", first_name="Holder"
+        )
+        self.wallet = Wallet.objects.create(user=self.user, ledger_sequence=1)
+        Wallet.objects.filter(pk=self.wallet.pk).update(balance=500)
+        LedgerEntry.objects.create(wallet=self.wallet, amount=500, sequence=1)
+        self.other = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="911111132", password="testpass", first_name="Other"
+            )
+        )
+        self.wallet.refresh_from_db()
+        transfer(self.wallet, self.other, 200, remarks="rent")
+        transfer(self.other, self.wallet, 50, remarks="change")
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("statements-list")
+
+    def _lines(self, response):
+        return b"".join(response.streaming_content).decode().splitlines()
+
+    def test_csv_statement_with_running_balance(self):
+        response = self.client.get(self.url, {"wallet": str(self.wallet.id)})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        lines = self._lines(response)
+        self.assertEqual(
+            lines[0], "date,transaction,type,amount,balance,status,remarks"
+        )
+        self.assertEqual(
+            [line.split(",")[2:5] for line in lines[1:]],
+            [
+                ["credit", "500", "500"],
+                ["debit", "200", "300"],
+                ["credit", "50", "350"],
+            ],
+        )
+
+    def test_ndjson_statement_starts_from_opening_balance(self):
+        start = LedgerEntry.objects.get(wallet=self.wallet, sequence=2).created_at
+        response = self.client.get(
+            self.url,
+            {
+                "wallet": str(self.wallet.id),
+                "start": start.isoformat(),
+                "file_format": "ndjson",
+            },
+        )
+
+        rows = [json.loads(line) for line in self._lines(response)]
+        self.assertEqual([row["balance"] for row in rows], [300, 350])
+        self.assertEqual(rows[0]["remarks"], "rent")
+
+    def test_folding_stripes_is_not_listed(self):
+        enable_stripes(self.wallet, 2)
+        transfer(self.other, self.wallet, 100, remarks="tip")
+        transfer(self.other, self.wallet, 30, remarks="tip")
+        disable_stripes(self.wallet)
+
+        rows = list(statement_rows(self.wallet))
+
+        self.assertEqual(
+            [(row["type"], row["amount"], row["balance"]) for row in rows],
+            [
+                ("credit", 500, 500),
+                ("debit", 200, 300),
+                ("credit", 50, 350),
+                ("credit", 100, 450),
+                ("credit", 30, 480),
+            ],
+        )
+        self.assertEqual(
+            [row["remarks"] for row in rows if row["transaction"] is None],
+            ["Opening balance"],
+        )
+
+    def test_fold_entries_with_one_timestamp_are_not_listed(self):
+        enable_stripes(self.wallet, 2)
+        transfer(self.other, self.wallet, 100, remarks="tip")
+        disable_stripes(self.wallet)
+        fold = LedgerEntry.objects.filter(
+            wallet=self.wallet, transaction__isnull=True
+        ).exclude(stripe__isnull=True, sequence=1)
+        fold.update(created_at=timezone.now())
+        # The credit to the main balance sorts first by id
+        fold.filter(stripe__isnull=True).update(id=UUID(int=0))
+
+        rows = list(statement_rows(self.wallet))
+
+        self.assertEqual(
+            [(row["type"], row["amount"], row["balance"]) for row in rows],
+            [
+                ("credit", 500, 500),
+                ("debit", 200, 300),
+                ("credit", 50, 350),
+                ("credit", 100, 450),
+            ],
+        )
+
+    def test_statement_of_foreign_wallet(self):
+        response = self.client.get(self.url, {"wallet": str(self.other.id)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BalanceAtViewsetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number="911111141", password="testpass", first_name="Holder"
+        )
+        self.wallet = Wallet.objects.create(
+            user=self.user, balance=300, ledger_sequence=1
+        )
+        LedgerEntry.objects.create(wallet=self.wallet, amount=300, sequence=1)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse("balances-list")
+
+    def test_balance_at(self):
+        at = timezone.now()
+        transfer(self.wallet, None, 100)
+
+        response = self.client.get(
+            self.url, {"wallet": str(self.wallet.id), "at": at.isoformat()}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["balance"], 300)
+
+        response = self.client.get(self.url, {"wallet": str(self.wallet.id)})
+        self.assertEqual(response.data["balance"], 200)
+
+    def test_balance_of_foreign_wallet(self):
+        other = User.objects.create_user(
+            phone_number="911111142", password="testpass", first_name="Other"
+        )
+        self.client.force_authenticate(user=other)
+
+        response = self.client.get(self.url, {"wallet": str(self.wallet.id)})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class DisbursementViewsetTests(APITestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            phone_number="933333333", password="testpass", first_name="Owner"
+        )
+        self.business = Business.objects.create(
+            name="My Shop", owner=self.owner, contact_email="shop@test.com"
+        )
+        self.source = self.business.wallet
+        self.source.balance = 1000
+        self.source.ledger_sequence = 1
+        self.source.save()
+        LedgerEntry.objects.create(wallet=self.source, amount=1000, sequence=1)
+        self.recipients = [
+            Wallet.objects.create(
+                user=User.objects.create_user(
+                    phone_number=f"94444444{i}", password="testpass", first_name="R"
+                )
+            )
+            for i in range(3)
+        ]
+        self.client.force_authenticate(user=self.owner)
+        self.url = reverse("send-bulk-list")
+
+    def test_disburse_reports_per_row_results(self):
+        data = {
+            "from_wallet": str(self.source.id),
+            "remarks": "payroll",
+            "recipients": [
+                {"recipient": str(self.recipients[0].id), "amount": 100},
+                {"recipient": "944444441", "amount": 200},
+                {"recipient": "+251944444442", "amount": 300},
+                {"recipient": "955555555", "amount": 100},
+                {"recipient": str(self.recipients[0].id), "amount": 0},
+            ],
+        }
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["completed"], 3)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]],
+            ["completed", "completed", "completed", "failed", "failed"],
+        )
+
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.balance, 400)
+        for wallet, expected in zip(self.recipients, [100, 200, 300]):
+            wallet.refresh_from_db()
+            self.assertEqual(wallet.balance, expected)
+        self.assertEqual(ledger_balance(self.source), 400)
+
+    def test_disburse_from_csv_file(self):
+        file = SimpleUploadedFile(
+            "payroll.csv",
+            b"recipient,amount\n944444440,100\n944444441,100\n",
+            content_type="text/csv",
+        )
+        data = {"from_wallet": str(self.source.id), "file": file}
+        response = self.client.post(self.url, data, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["completed"], 2)
+
+    @override_settings(DISBURSEMENT_MAX_ROWS=2)
+    def test_csv_file_over_the_row_limit_is_rejected(self):
+        file = SimpleUploadedFile(
+            "payroll.csv",
+            b"recipient,amount\n944444440,100\n944444441,100\n944444442,100\n",
+            content_type="text/csv",
+        )
+        data = {"from_wallet": str(self.source.id), "file": file}
+        response = self.client.post(self.url, data, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file", response.data)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_disburse_ten_thousand_rows_from_csv_file(self):
+        Wallet.objects.filter(id=self.source.id).update(balance=10_000)
+        LedgerEntry.objects.create(wallet=self.source, amount=9_000, sequence=2)
+        Wallet.objects.filter(id=self.source.id).update(ledger_sequence=2)
+        rows = "".join(f"94444444{i % 3},1\n" for i in range(10_000))
+        file = SimpleUploadedFile(
+            "payroll.csv",
+            f"recipient,amount\n{rows}".encode(),
+            content_type="text/csv",
+        )
+        data = {"from_wallet": str(self.source.id), "file": file}
+        response = self.client.post(self.url, data, format="multipart")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["completed"], 10_000)
+
+        self.source.refresh_from_db()
+        self.assertEqual(self.source.balance, 0)
+        self.assertEqual(ledger_balance(self.source), 0)
+
+    def test_same_key_for_another_csv_file_is_rejected(self):
+        headers = {"Idempotency-Key": "payroll"}
+
+        for content, expected in [
+            (b"recipient,amount\n944444440,100\n", status.HTTP_201_CREATED),
+            (
+                b"recipient,amount\n944444440,900\n",
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+            ),
+        ]:
+            file = SimpleUploadedFile("payroll.csv", content, content_type="text/csv")
+            data = {"from_wallet": str(self.source.id), "file": file}
+            response = self.client.post(
+                self.url, data, format="multipart", headers=headers
+            )
+
+            self.assertEqual(response.status_code, expected)
+
+    def test_disburse_insufficient_balance(self):
+        data = {
+            "from_wallet": str(self.source.id),
+            "recipients": [{"recipient": "944444440", "amount": 5000}],
+        }
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_disburse_from_foreign_wallet(self):
+        self.client.force_authenticate(user=self.recipients[0].user)
+        data = {
+            "from_wallet": str(self.source.id),
+            "recipients": [{"recipient": "944444440", "amount": 10}],
+        }
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("from_wallet", response.data)
+
+    def test_disburse_from_user_wallet(self):
+        wallet = self.recipients[0]
+        Wallet.objects.filter(id=wallet.id).update(balance=1000)
+        self.client.force_authenticate(user=wallet.user)
+        data = {
+            "from_wallet": str(wallet.id),
+            "recipients": [{"recipient": "944444441", "amount": 10}],
+        }
+        response = self.client.post(self.url, data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("from_wallet", response.data)
+        self.assertFalse(Transaction.objects.exists())
+
+
+class AuthorizationHoldTests(APITestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            phone_number="911111111", password="testpass", first_name="Customer"
+        )
+        self.owner = User.objects.create_user(
+            phone_number="933333333", password="testpass", first_name="Owner"
+        )
+        self.wallet = Wallet.objects.create(user=self.customer, balance=1000)
+        self.merchant = Business.objects.create(
+            name="My Hotel", owner=self.owner, contact_email="hotel@test.com"
+        ).wallet
+        self.url = reverse("holds-list")
+
+    def test_hold_reserves_funds(self):
+        authorize(self.wallet, self.merchant, 800)
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.frozen_amount, 800)
+
+        with self.assertRaises(InsufficientFunds):
+            transfer(self.wallet, self.merchant, 300)
+
+    def test_partial_capture_releases_the_rest(self):
+        hold = capture(authorize(self.wallet, self.merchant, 800), 500)
+
+        self.wallet.refresh_from_db()
+        self.merchant.refresh_from_db()
+        self.assertEqual(hold.status, "captured")
+        self.assertEqual(hold.transaction.amount, 500)
+        self.assertEqual(self.wallet.balance, 500)
+        self.assertEqual(self.wallet.frozen_amount, 0)
+        self.assertEqual(self.merchant.balance, 500)
+
+    def test_void_releases_funds(self):
+        hold = void(authorize(self.wallet, self.merchant, 800))
+
+        self.wallet.refresh_from_db()
+        self.assertEqual(hold.status, "voided")
+        self.assertEqual(self.wallet.frozen_amount, 0)
+
+        with self.assertRaises(HoldError):
+            capture(hold)
+
+    def test_expired_holds_are_released_in_bulk(self):
+        expired = timezone.now() - timedelta(minutes=1)
+        authorize(self.wallet, self.merchant, 100, expires_at=expired)
+        authorize(self.wallet, self.merchant, 200, expires_at=expired)
+        live = authorize(self.wallet, self.merchant, 300)
+
+        self.assertEqual(release_expired_holds(batch_size=1), 2)
+
+        self.wallet.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual(self.wallet.frozen_amount, 300)
+        self.assertEqual(live.status, "authorized")
+        self.assertEqual(AuthorizationHold.objects.filter(status="expired").count(), 2)
+
+    def test_customer_authorizes_and_merchant_captures(self):
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post(
+            self.url,
+            {
+                "wallet": str(self.wallet.id),
+                "merchant_wallet": str(self.merchant.id),
+                "amount": 400,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        capture_url = reverse("holds-capture", args=[response.data["id"]])
+
+        denied = self.client.post(capture_url, {"amount": 100})
+        self.assertEqual(denied.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.owner)
+        captured = self.client.post(capture_url, {"amount": 100})
+
+        self.assertEqual(captured.status_code, status.HTTP_200_OK)
+        self.assertEqual(captured.data["captured_amount"], 100)
+
+    def test_hold_on_credits_still_in_stripes(self):
+        Wallet.objects.filter(id=self.wallet.id).update(balance=0)
+        enable_stripes(self.wallet, 2)
+        payer = Wallet.objects.create(
+            user=User.objects.create_user(
+                phone_number="922222222", password="testpass", first_name="Payer"
+            ),
+            balance=500,
+        )
+        transfer(payer, self.wallet, 500)
+
+        self.client.force_authenticate(user=self.customer)
+        response = self.client.post(
+            self.url,
+            {
+                "wallet": str(self.wallet.id),
+                "merchant_wallet": str(self.merchant.id),
+                "amount": 400,
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.wallet.refresh_from_db()
+        self.assertEqual(self.wallet.frozen_amount, 400)
+
+    def test_cannot_hold_funds_of_another_wallet(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.post(
+            self.url,
+            {
+                "wallet": str(self.wallet.id),
+                "merchant_wallet": str(self.merchant.id),
+                "amount": 400,
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("wallet", response.data)
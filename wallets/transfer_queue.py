@@ -0,0 +1,138 @@
+import zlib
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.delivery import deliver
+from notifications.models import Notification
+
+from .models import Transaction
+from .transfers import TransferError, transfer
+
+
+def queue_for(wallet_id):
+    """
+    Name of the Celery queue the transfers out of a wallet are applied from.
+
+    Each of the `TRANSFER_QUEUE_PARTITIONS` queues is meant to be consumed by
+    one single-threaded worker (`celery -A tasks_handler worker -Q transfers.0
+    --concurrency 1`), so a wallet's transfers are applied one after another
+    while different wallets proceed on different workers.
+    """
+    partition = zlib.crc32(str(wallet_id).encode()) % settings.TRANSFER_QUEUE_PARTITIONS
+
+    return f"transfers.{partition}"
+
+
+def enqueue_transfer(from_wallet, to_wallet, amount, remarks=None):
+    """
+    Record a pending transfer and schedule it to be applied once the
+    surrounding transaction commits. Returns the pending Transaction.
+    """
+    from tasks_handler.tasks import apply_pending_transfers
+
+    tr = Transaction.objects.create(
+        from_wallet=from_wallet,
+        to_wallet=to_wallet,
+        amount=amount,
+        remarks=remarks,
+        status="pending",
+    )
+
+    transaction.on_commit(
+        lambda: apply_pending_transfers.apply_async(
+            args=[str(from_wallet.pk)], queue=queue_for(from_wallet.pk)
+        )
+    )
+
+    return tr
+
+
+def apply_pending(wallet_id, limit=100):
+    """
+    Apply up to `limit` pending transfers out of a wallet, oldest first, each
+    in its own DB transaction. The oldest pending row is locked before it is
+    applied, so even two workers draining the same wallet keep the order.
+    Transfers that cannot be applied are marked failed. Returns the number of
+    transfers processed.
+    """
+    pending = Transaction.objects.filter(from_wallet_id=wallet_id, status="pending")
+    queue = (
+        pending.select_for_update(of=("self",))
+        .select_related("from_wallet", "to_wallet")
+        .order_by("created_at", "id")
+    )
+
+    processed = 0
+
+    while processed < limit:
+        with transaction.atomic():
+            tr = queue.first()
+
+            if tr is None:
+                # The row we waited on may have been applied by another
+                # worker; look again unless nothing is left.
+                if pending.exists():
+                    continue
+
+                return processed
+
+            tr.transition_to("processing")
+
+            try:
+                transfer(
+                    tr.from_wallet, tr.to_wallet, tr.amount, tr.remarks, pending=tr
+                )
+            except TransferError:
+                tr.transition_to("failed")
+
+        processed += 1
+
+    return processed
+
+
+def time_out_stuck_transactions(batch_size=1000):
+    """
+    Fail transactions left pending or processing for longer than
+    `TRANSACTION_TIMEOUT`, `batch_size` per DB transaction, and tell their
+    senders. No money has moved for them since a transfer is completed in
+    the same DB transaction that moves it. Returns the number timed out.
+    """
+    timed_out = 0
+
+    while True:
+        now = timezone.now()
+
+        with transaction.atomic():
+            stuck = list(
+                Transaction.objects.select_for_update(of=("self",), skip_locked=True)
+                .filter(
+                    status__in=["pending", "processing"],
+                    created_at__lt=now - settings.TRANSACTION_TIMEOUT,
+                )
+                .values_list("id", "from_wallet__user", "amount")[:batch_size]
+            )
+
+            if not stuck:
+                return timed_out
+
+            Transaction.objects.filter(id__in=[id for id, *_ in stuck]).update(
+                status="failed", failed_at=now, updated_at=now
+            )
+            deliver(
+                Notification.objects.bulk_create(
+                    Notification(
+                        title="Transaction Failed",
+                        content=f"Transfer of amount {amount} ETB could not be completed",
+                        user_id=user_id,
+                    )
+                    for _, user_id, amount in stuck
+                    if user_id
+                )
+            )
+
+        timed_out += len(stuck)
+
+        if len(stuck) < batch_size:
+            return timed_out
@@ -0,0 +1,176 @@
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import daily_stats, velocity
+from .dispatch import balance_changed, transactions_completed
+from .models import LedgerEntry, Transaction, Wallet, WalletFeedEntry
+from .stripes import StripingChanged, credit_stripe, fold_stripes, stripe_for
+
+
+class TransferError(Exception):
+    pass
+
+
+class InsufficientFunds(TransferError):
+    pass
+
+
+class VelocityLimitExceeded(TransferError):
+    pass
+
+
+def lock_wallets(*wallet_ids):
+    """
+    Lock the given wallet rows with SELECT ... FOR UPDATE.
+
+    Rows are always locked in primary key order so that two transfers touching
+    the same pair of wallets in opposite directions can never deadlock.
+    Stripe rows are only ever locked after wallet rows. Must be called inside
+    an atomic block.
+    """
+    ids = sorted({wallet_id for wallet_id in wallet_ids if wallet_id is not None})
+
+    wallets = Wallet.objects.select_for_update().filter(id__in=ids).order_by("id")
+
+    return {wallet.id: wallet for wallet in wallets}
+
+
+def apply_balance_deltas(deltas, batch_size=1000):
+    """
+    Apply `{wallet_id: (amount, entries)}` to wallet balances and ledger
+    sequences with one UPDATE ... FROM (VALUES ...) statement per batch.
+    The wallets must already be locked and the caller sends `balance_changed`.
+    """
+    table = connection.ops.quote_name(Wallet._meta.db_table)
+    items = list(deltas.items())
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(items), batch_size):
+            batch = items[start : start + batch_size]
+
+            values = ", ".join(["(%s::uuid, %s::bigint, %s::bigint)"] * len(batch))
+            params = [
+                param
+                for wallet_id, (amount, entries) in batch
+                for param in (str(wallet_id), amount, entries)
+            ]
+
+            cursor.execute(
+                f"UPDATE {table} AS w"
+                " SET balance = w.balance + v.amount,"
+                " ledger_sequence = w.ledger_sequence + v.entries,"
+                " version = w.version + 1"
+                f" FROM (VALUES {values}) AS v(id, amount, entries)"
+                " WHERE w.id = v.id",
+                params,
+            )
+
+
+def _transfer(from_wallet, to_wallet, amount, remarks, pending, check_limits):
+    if amount <= 0:
+        raise TransferError("amount must be positive")
+
+    to_wallet_id = to_wallet.pk if to_wallet else None
+
+    if from_wallet.pk == to_wallet_id:
+        raise TransferError("cannot transfer to the same wallet")
+
+    striped = bool(to_wallet and to_wallet.balance_stripes)
+    # Read before locking; Redis is not waited on while the lock is held
+    allowed = velocity.wallet_allowance(from_wallet) if check_limits else None
+
+    with transaction.atomic():
+        locked = lock_wallets(from_wallet.pk, None if striped else to_wallet_id)
+
+        source = locked[from_wallet.pk]
+
+        if source.balance - source.frozen_amount < amount and source.balance_stripes:
+            fold_stripes(source)
+
+        if source.balance - source.frozen_amount < amount:
+            raise InsufficientFunds("not enough amount in the wallet")
+
+        if allowed is not None and allowed < amount:
+            raise VelocityLimitExceeded("wallet has reached its spending limit")
+
+        Wallet.objects.filter(id=source.id).update(
+            balance=F("balance") - amount,
+            ledger_sequence=F("ledger_sequence") + 1,
+            version=F("version") + 1,
+        )
+        from_wallet.balance = source.balance - amount
+
+        credit = LedgerEntry(wallet_id=to_wallet_id, amount=amount, sequence=0)
+
+        if striped:
+            credit.stripe = stripe_for(to_wallet, from_wallet.pk)
+            credit.sequence = credit_stripe(to_wallet, credit.stripe, amount)
+        elif to_wallet:
+            target = locked[to_wallet_id]
+            Wallet.objects.filter(id=to_wallet_id).update(
+                balance=F("balance") + amount,
+                ledger_sequence=F("ledger_sequence") + 1,
+                version=F("version") + 1,
+            )
+            to_wallet.balance = target.balance + amount
+            credit.sequence = target.ledger_sequence + 1
+
+        if pending:
+            tr = pending
+            tr.transition_to("completed")
+        else:
+            tr = Transaction.objects.create(
+                from_wallet=from_wallet,
+                to_wallet=to_wallet,
+                amount=amount,
+                remarks=remarks,
+                status="completed",
+                completed_at=timezone.now(),
+            )
+
+        debit = LedgerEntry(
+            wallet_id=source.id, amount=-amount, sequence=source.ledger_sequence + 1
+        )
+        debit.transaction = credit.transaction = tr
+
+        LedgerEntry.objects.bulk_create([debit, credit])
+        WalletFeedEntry.objects.bulk_create(WalletFeedEntry.for_transaction(tr))
+        daily_stats.record(
+            tr.completed_at,
+            [
+                (source.id, None, -amount),
+                (to_wallet_id, credit.stripe, amount),
+            ],
+        )
+
+        if check_limits:
+            velocity.record_debit(source, amount)
+
+        balance_changed.send(sender=Wallet, wallet_ids=[source.id, to_wallet_id])
+        transactions_completed.send(sender=Transaction, transactions=[tr])
+
+        return tr
+
+
+def transfer(
+    from_wallet, to_wallet, amount, remarks=None, pending=None, check_limits=True
+):
+    """
+    Move `amount` from `from_wallet` to `to_wallet` in a single DB transaction.
+
+    `to_wallet` may be None for payments leaving the platform (e.g. bills), in
+    which case only the debit is applied. Credits to a striped wallet land in
+    one of its stripes without locking the wallet row. `pending` is an already
+    recorded Transaction in processing to complete instead of creating one.
+    The debit is checked against the payer's spending limits unless
+    `check_limits` is False (e.g. refunds). Returns the completed Transaction.
+    """
+    try:
+        return _transfer(from_wallet, to_wallet, amount, remarks, pending, check_limits)
+    except StripingChanged:
+        # Striping was turned off while this transfer was deciding where
+        # to credit; everything it did was rolled back
+        to_wallet.refresh_from_db(fields=["balance_stripes"])
+
+        return _transfer(from_wallet, to_wallet, amount, remarks, pending, check_limits)
@@ -8,6 +8,10 @@ router = DefaultRouter()
 router.register("wallets/public", WalletPublicViewset, basename="wallets-public")
 router.register("wallets", WalletViewsets)
 router.register("transactions", TransactionViewsets, basename="transactions")
+router.register("balances", BalanceAtViewsets, basename="balances")
+router.register("statements", StatementViewsets, basename="statements")
 router.register("send/p2p", SendMoneyP2PViewsets, basename="send-p2p")
+router.register("send/bulk", DisbursementViewsets, basename="send-bulk")
+router.register("holds", AuthorizationHoldViewsets, basename="holds")
 
 urlpatterns = router.urls + []
@@ -0,0 +1,147 @@
+import logging
+import time
+from functools import cache, partial
+
+import redis
+from django.conf import settings
+from django.db import transaction
+
+from accounts.models import Business
+
+logger = logging.getLogger(__name__)
+
+WINDOWS = {"hour": 3600, "day": 86400}
+
+
+@cache
+def _client(url):
+    return redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+
+def _buckets(scope, window, now):
+    """Keys of the current and previous fixed buckets of `window`, and how
+    far into the current bucket `now` is, from 0 to 1."""
+    size = WINDOWS[window]
+    bucket = int(now // size)
+
+    return (
+        f"velocity:{scope}:{window}:{bucket}",
+        f"velocity:{scope}:{window}:{bucket - 1}",
+        now % size / size,
+    )
+
+
+def usage(scope, windows, now=None):
+    """
+    Amount spent by `scope` over each sliding window, estimated from two
+    fixed buckets: all of the current one and the part of the previous one
+    still inside the window. Two reads per window whatever the traffic.
+    """
+    now = time.time() if now is None else now
+    buckets = [_buckets(scope, window, now) for window in windows]
+
+    values = _client(settings.VELOCITY_CACHE_URL).mget(
+        [key for current, previous, _ in buckets for key in (current, previous)]
+    )
+
+    return {
+        window: int(values[2 * index] or 0)
+        + int(values[2 * index + 1] or 0) * (1 - elapsed)
+        for index, (window, (_, _, elapsed)) in enumerate(zip(windows, buckets))
+    }
+
+
+def record(scope, windows, amount, now=None):
+    now = time.time() if now is None else now
+
+    with _client(settings.VELOCITY_CACHE_URL).pipeline(transaction=False) as pipe:
+        for window in windows:
+            current, _, _ = _buckets(scope, window, now)
+            pipe.incrby(current, amount)
+            pipe.expire(current, 2 * WINDOWS[window])
+
+        pipe.execute()
+
+
+def allowance(scope, limits):
+    """
+    How much `scope` may still spend under `{window: limit}`, or None when
+    it is not limited. Fails open, returning None, when Redis cannot be
+    reached.
+    """
+    limits = {window: limit for window, limit in limits.items() if limit is not None}
+
+    if not limits:
+        return None
+
+    try:
+        spent = usage(scope, list(limits))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read spending of {scope}: {e}")
+        return None
+
+    return max(0, int(min(limit - spent[window] for window, limit in limits.items())))
+
+
+def _consume(scope, windows, amount):
+    try:
+        record(scope, windows, amount)
+    except redis.RedisError as e:
+        logger.warning(f"Could not record spending of {scope}: {e}")
+
+
+def consume(scope, limits, amount):
+    """
+    Count `amount` against the limits of `scope` once the surrounding DB
+    transaction commits, so that no Redis round trip is made while it holds
+    locks and spending that is rolled back is not counted.
+    """
+    if not any(limit is not None for limit in limits.values()):
+        return
+
+    transaction.on_commit(partial(_consume, scope, list(limits), amount))
+
+
+def wallet_limits(wallet):
+    """
+    Spending limits of a wallet from `WALLET_VELOCITY_LIMITS`, looked up by
+    `business:<trust level>` for business wallets and by wallet type
+    otherwise.
+    """
+    limits = settings.WALLET_VELOCITY_LIMITS
+
+    if wallet.business_id:
+        trust_level = Business.objects.values_list("trust_level", flat=True).get(
+            pk=wallet.business_id
+        )
+
+        if f"business:{trust_level}" in limits:
+            return limits[f"business:{trust_level}"]
+
+    return limits.get(wallet.wallet_type, {})
+
+
+def wallet_allowance(wallet):
+    return allowance(f"wallet:{wallet.pk}", wallet_limits(wallet))
+
+
+def record_debit(wallet, amount):
+    """
+    Count a debit of `wallet` against its limits when the surrounding DB
+    transaction commits. Debits checked against `wallet_allowance` at the
+    same time may both pass on the same headroom, overshooting a limit by
+    at most the debits in flight.
+    """
+    consume(f"wallet:{wallet.pk}", wallet_limits(wallet), amount)
+
+
+def grant_limits(grant):
+    return {settings.GRANT_VELOCITY_WINDOW: grant.max_amount}
+
+
+def grant_allowance(grant):
+    return allowance(f"grant:{grant.pk}", grant_limits(grant))
+
+
+def record_grant_use(grant, amount):
+    consume(f"grant:{grant.pk}", grant_limits(grant), amount)
@@ -1,12 +1,21 @@
 from django.db.models import Q
-from django.shortcuts import render
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import exceptions, status
+from rest_framework.decorators import action
 from rest_framework.mixins import CreateModelMixin, ListModelMixin, RetrieveModelMixin
+from rest_framework.pagination import CursorPagination
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 
-from wallets.models import Wallet
+from wallets import balance_cache, holds, statements
+from wallets.idempotency import IDEMPOTENCY_KEY_PARAMETER, idempotent
+from wallets.models import AuthorizationHold, Wallet, WalletFeedEntry
+from wallets.permissions import controls_wallet
 from wallets.serializers import *
 
 
@@ -29,6 +38,23 @@ class WalletViewsets(RetrieveModelMixin, ListModelMixin, GenericViewSet):
 
         return queryset
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Served from the wallet cache, which transfers keep current on commit.
+        Falls back to the database on a miss, when the cache is unreachable
+        or when filters are given.
+        """
+        if not request.query_params:
+            document = balance_cache.cached_wallet_of_user(kwargs[self.lookup_field])
+
+            if document and not document["is_restricted"] and not document["business"]:
+                return Response(document)
+
+        response = super().retrieve(request, *args, **kwargs)
+        balance_cache.fill([response.data["id"]])
+
+        return response
+
 
 class WalletPublicViewset(ListModelMixin, GenericViewSet):
     serializer_class = WalletPublicSerializer
@@ -59,20 +85,18 @@ class WalletPublicViewset(ListModelMixin, GenericViewSet):
         return super().list(request, *args, **kwargs)
 
 
+class TransactionFeedPagination(CursorPagination):
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+
 class TransactionViewsets(ListModelMixin, RetrieveModelMixin, GenericViewSet):
     serializer_class = TransactionSerializer
     permission_classes = []
-    queryset = Transaction.objects.all()
-
-    def get_queryset(self):
-        queryset = super().get_queryset()
-
-        wallet = self.request.query_params.get("wallet")
-
-        if wallet:
-            queryset = queryset.filter(Q(from_wallet=wallet) | Q(to_wallet=wallet))
-
-        return queryset
+    queryset = Transaction.objects.select_related(*TransactionSerializer.related_fields)
+    pagination_class = TransactionFeedPagination
 
     @extend_schema(
         parameters=[
@@ -80,13 +104,187 @@ class TransactionViewsets(ListModelMixin, RetrieveModelMixin, GenericViewSet):
         ]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        wallet = request.query_params.get("wallet")
+
+        if not wallet:
+            return super().list(request, *args, **kwargs)
+
+        feed = WalletFeedEntry.objects.filter(wallet=wallet).select_related(
+            *(f"transaction__{field}" for field in TransactionSerializer.related_fields)
+        )
+        page = self.paginate_queryset(feed)
+
+        transactions = []
+        for entry in page:
+            entry.transaction.direction = entry.direction
+            transactions.append(entry.transaction)
+
+        serializer = self.get_serializer(transactions, many=True)
+
+        return self.get_paginated_response(serializer.data)
+
+
+class BalanceAtViewsets(GenericViewSet):
+    """
+    Balance of a wallet as of a point in time (by default now), computed
+    from the nearest balance snapshot and the ledger entries after it.
+    """
+
+    serializer_class = BalanceAtSerializer
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(parameters=[BalanceAtSerializer], responses=BalanceAtSerializer)
+    def list(self, request, *args, **kwargs):
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        wallet = query.validated_data["wallet"]
+        at = query.validated_data.get("at", timezone.now())
+        serializer = self.get_serializer(
+            {"wallet": wallet, "at": at, "balance": wallet.balance_at(at)}
+        )
+
+        return Response(serializer.data)
+
+
+class StatementViewsets(GenericViewSet):
+    """
+    Statement of a wallet the caller controls, streamed as CSV or NDJSON
+    with the running balance after every ledger entry.
+    """
+
+    serializer_class = StatementQuerySerializer
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(parameters=[StatementQuerySerializer], responses=OpenApiTypes.STR)
+    def list(self, request, *args, **kwargs):
+        query = self.get_serializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        wallet = query.validated_data["wallet"]
+        render, content_type = statements.FORMATS[query.validated_data["file_format"]]
+        rows = statements.statement_rows(
+            wallet,
+            start=query.validated_data.get("start"),
+            end=query.validated_data.get("end"),
+        )
+
+        response = StreamingHttpResponse(render(rows), content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="statement-{wallet.id}.'
+            f'{query.validated_data["file_format"]}"'
+        )
+
+        return response
 
 
 class SendMoneyP2PViewsets(CreateModelMixin, GenericViewSet):
     serializer_class = SendMoneyP2PSerializer
     permission_classes = [IsAuthenticated]
 
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+
+        if response.data["status"] == "pending":
+            response.status_code = status.HTTP_202_ACCEPTED
+
+        return response
+
 
 class SendMoneyExternalViewsets(CreateModelMixin, GenericViewSet):
     serializer_class = None
+
+
+class DisbursementViewsets(CreateModelMixin, GenericViewSet):
+    serializer_class = DisbursementSerializer
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+
+class AuthorizationHoldViewsets(
+    CreateModelMixin, ListModelMixin, RetrieveModelMixin, GenericViewSet
+):
+    """
+    Reserve funds of a wallet for a merchant and later capture or void them.
+    Holds are placed on wallets the caller controls or, for enterprises, on
+    wallets of users with an active grant; only the merchant side captures or
+    voids.
+    """
+
+    serializer_class = AuthorizationHoldSerializer
+    permission_classes = [IsAuthenticated]
+    queryset = AuthorizationHold.objects.select_related(
+        "wallet__business", "merchant_wallet__business"
+    )
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+
+        if getattr(user, "is_enterprise", False):
+            return queryset.filter(
+                Q(wallet__enterprise=user) | Q(merchant_wallet__enterprise=user)
+            )
+
+        return queryset.filter(
+            Q(wallet__user=user)
+            | Q(wallet__business__owner=user)
+            | Q(merchant_wallet__user=user)
+            | Q(merchant_wallet__business__owner=user)
+        )
+
+    def get_serializer_class(self):
+        if self.action == "capture":
+            return AuthorizationHoldCaptureSerializer
+        return super().get_serializer_class()
+
+    def get_merchant_hold(self):
+        hold = self.get_object()
+
+        if not controls_wallet(self.request.user, hold.merchant_wallet):
+            raise exceptions.PermissionDenied("only the merchant can settle a hold")
+
+        return hold
+
+    @extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER])
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @extend_schema(
+        parameters=[IDEMPOTENCY_KEY_PARAMETER],
+        responses=AuthorizationHoldSerializer,
+    )
+    @action(detail=True, methods=["post"])
+    @idempotent
+    def capture(self, request, pk=None):
+        hold = self.get_merchant_hold()
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            hold = holds.capture(hold, serializer.validated_data.get("amount"))
+        except TransferError as e:
+            raise exceptions.ValidationError({"amount": [str(e)]})
+
+        return Response(AuthorizationHoldSerializer(hold).data)
+
+    @extend_schema(request=None, responses=AuthorizationHoldSerializer)
+    @action(detail=True, methods=["post"])
+    def void(self, request, pk=None):
+        hold = self.get_merchant_hold()
+
+        try:
+            hold = holds.void(hold)
+        except TransferError as e:
+            raise exceptions.ValidationError({"detail": [str(e)]})
+
+        return Response(AuthorizationHoldSerializer(hold).data)